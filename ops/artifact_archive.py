@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Archives d'artefacts en flux : regroupe de nombreux petits fichiers (htmlcov,
+playwright-report, logs) dans un zip généré à la volée, sans copie temporaire
+sur disque, et produit un index des offsets pour extraire un membre isolé
+"""
+
+import struct
+import zlib
+import zipfile
+
+# Taille des blocs lus sur disque et émis vers le flux d'upload
+CHUNK_SIZE = 1024 * 1024
+# En-tête local zip : signature, version, flags, méthode, heure, date, crc, tailles, longueurs
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+LOCAL_HEADER_SIGNATURE = 0x04034b50
+
+class _StreamBuffer:
+    """Tampon en écriture seule (non seekable) vidé au fil de la génération du zip"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def pack_name_for(entry, packs):
+    """
+    Retourne l'archive dans laquelle ranger un artefact : son type s'il est
+    demandé, sinon le premier dossier de son chemin qui porte un nom demandé
+    """
+    if entry['kind'] in packs:
+        return entry['kind']
+    for part in entry['rel_path'].split('/')[:-1]:
+        if part in packs:
+            return part
+    return None
+
+def stream_zip(entries, index, compresslevel=6):
+    """
+    Générateur d'octets d'un zip contenant les fichiers des entrées du manifeste.
+    Le dictionnaire index est rempli au fil de l'eau avec, pour chaque membre,
+    l'offset de son en-tête local et ses tailles (complet à la fin du flux).
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zf:
+        for entry in entries:
+            info = zipfile.ZipInfo.from_file(entry['filepath'], entry['rel_path'])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(entry['filepath'], 'rb') as src, zf.open(info, 'w') as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    dst.write(chunk)
+                    if buffer.chunks:
+                        yield buffer.drain()
+            index[entry['rel_path']] = {
+                'offset': info.header_offset,
+                'compressed_size': info.compress_size,
+                'size': info.file_size,
+                'crc': info.CRC
+            }
+            yield buffer.drain()
+    # Répertoire central écrit à la fermeture
+    yield buffer.drain()
+
+def member_range(member, header_extra=1024):
+    """
+    Plage d'octets (début, fin inclusive) à lire pour extraire un membre :
+    en-tête local + nom + champ extra (borné) + données compressées
+    """
+    start = member['offset']
+    return start, start + LOCAL_HEADER.size + header_extra + member['compressed_size'] - 1
+
+def extract_member(read_range, member):
+    """
+    Extrait un membre de l'archive à partir de son entrée d'index.
+    read_range(start, end) doit retourner les octets de la plage (requête HTTP Range).
+    """
+    start, end = member_range(member)
+    data = read_range(start, end)
+    header = LOCAL_HEADER.unpack_from(data)
+    if header[0] != LOCAL_HEADER_SIGNATURE:
+        raise ValueError("En-tête local zip invalide")
+    method, name_len, extra_len = header[3], header[9], header[10]
+
+    data_start = LOCAL_HEADER.size + name_len + extra_len
+    payload = data[data_start:data_start + member['compressed_size']]
+    if len(payload) < member['compressed_size']:
+        # Champ extra plus long que prévu : relire la plage exacte
+        payload = read_range(start + data_start, start + data_start + member['compressed_size'] - 1)
+
+    if method == zipfile.ZIP_DEFLATED:
+        content = zlib.decompress(payload, -zlib.MAX_WBITS)
+    elif method == zipfile.ZIP_STORED:
+        content = payload
+    else:
+        raise ValueError(f"Méthode de compression non supportée: {method}")
+
+    if zlib.crc32(content) != member['crc']:
+        raise ValueError("CRC invalide pour le membre extrait")
+    return content
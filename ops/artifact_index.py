@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Index des artefacts : un seul parcours os.scandir de artifacts/ qui classe
+chaque fichier dans un type (junit, coverage, ...) via un matcher compilé
+"""
+
+import os
+import re
+import sys
+import json
+
+# Types d'artefacts et motifs glob associés, par ordre de priorité :
+# un fichier qui correspond à plusieurs motifs est classé dans le premier type
+ARTIFACT_PATTERNS = {
+    'junit': ['**/junit*.xml', '**/test-results.xml', '**/pytest.xml'],
+    'coverage': ['**/coverage*.xml', '**/coverage*.json', '**/htmlcov/**'],
+    'lighthouse': ['**/lighthouse*.json', '**/lh-*.json'],
+    'playwright': ['**/playwright-report/**', '**/playwright-results.json', '**/playwright-junit.xml'],
+    'logs': ['**/logs/**', '**/*.log']
+}
+
+def glob_to_regex(pattern):
+    """Traduit un motif glob récursif (**, *, ?) en expression régulière sur chemin posix"""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == len(pattern):
+            regex += '/.*'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+def compile_patterns(patterns=None):
+    """
+    Compile tous les motifs en une seule expression régulière, avec un groupe
+    nommé par type ; l'alternance respecte l'ordre de priorité des types
+    """
+    patterns = patterns or ARTIFACT_PATTERNS
+    groups = []
+    for kind, globs in patterns.items():
+        alternatives = '|'.join(glob_to_regex(g) for g in globs)
+        groups.append(f"(?P<{kind}>{alternatives})")
+    return re.compile('|'.join(groups))
+
+class ArtifactMatcher:
+    """Classe un chemin relatif (posix) dans un type d'artefact"""
+
+    def __init__(self, patterns=None):
+        self.regex = compile_patterns(patterns)
+
+    def classify(self, rel_path):
+        match = self.regex.fullmatch(rel_path)
+        if not match:
+            return None
+        return match.lastgroup
+
+def scan_artifacts(artifacts_dir, matcher=None):
+    """
+    Parcourt artifacts_dir une seule fois et retourne le manifeste des fichiers
+    classés : une entrée par fichier (filepath, rel_path, kind, size, mtime).
+    Les fichiers et dossiers cachés (.uploads, ...) sont ignorés.
+    """
+    matcher = matcher or ArtifactMatcher()
+    artifacts_dir = str(artifacts_dir)
+    manifest = []
+    stack = ['']
+
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            it = os.scandir(os.path.join(artifacts_dir, rel_dir))
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                # Fichiers internes des scripts ops (états de reprise, manifestes...)
+                if entry.name.startswith('.'):
+                    continue
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(rel_path)
+                    continue
+                if not entry.is_file():
+                    continue
+
+                kind = matcher.classify(rel_path)
+                if kind is None:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                manifest.append({
+                    'filepath': entry.path,
+                    'rel_path': rel_path,
+                    'kind': kind,
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime_ns
+                })
+
+    manifest.sort(key=lambda e: e['rel_path'])
+    return manifest
+
+def plan_uploads(artifacts_dir, run_id, packs=()):
+    """
+    Construit la liste des uploads du run : un fichier par entrée, sauf les
+    fichiers des groupes demandés (packs) réunis en une entrée d'archive
+    """
+    from artifact_archive import pack_name_for
+
+    entries = scan_artifacts(artifacts_dir)
+    for entry in entries:
+        entry['storage_path'] = f"reports/{run_id}/{entry['kind']}/{entry['rel_path']}"
+    if not packs:
+        return entries
+
+    loose, grouped = [], {}
+    for entry in entries:
+        pack = pack_name_for(entry, packs)
+        if pack:
+            grouped.setdefault(pack, []).append(entry)
+        else:
+            loose.append(entry)
+    for pack, members in sorted(grouped.items()):
+        loose.append({
+            'rel_path': f"{pack}.zip",
+            'kind': pack,
+            'storage_path': f"reports/{run_id}/archives/{pack}.zip",
+            'size': sum(m['size'] for m in members),
+            'members': members
+        })
+    return loose
+
+if __name__ == '__main__':
+    # Affiche le manifeste (utile pour vérifier la classification)
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'artifacts'
+    print(json.dumps(scan_artifacts(directory), indent=2))
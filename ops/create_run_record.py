@@ -7,7 +7,152 @@ et définir les variables d'environnement GitHub Actions
 import os
 import json
 import uuid
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
+from events import emit
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+RUN_CONTEXT_FILE = 'artifacts/run_context.json'
+
+# Spec et critères DoD utilisés quand aucune spec/sprint n'existe encore
+DEFAULT_SPEC = {
+    'repo': 'ljniox/ai-continuous-delivery',
+    'branch': 'main',
+    'storage_path': 'specs/default-test.yaml',
+    'created_by': 'github-actions-test'
+}
+DEFAULT_DOD = {
+    'coverage_min': 0.80,
+    'e2e_pass': True,
+    'lighthouse_min': 85
+}
+
+def is_missing_function(error):
+    """Fonction SQL absente (schéma pas encore migré) : code PostgREST PGRST202"""
+    return 'PGRST202' in str(error)
+
+def create_run(supabase: 'Client', spec_id=None, github_run_id=None, sprint_id=None):
+    """
+    Crée (ou récupère) la spec et le sprint, puis le run et son événement PLANNING,
+    en un seul aller-retour via la fonction SQL create_run (transactionnelle).
+    sprint_id désigne le sprint attribué par ops/scheduler.py (sinon premier sprint de la spec).
+    Retourne le contexte du run (ids, label et critères DoD du sprint).
+    """
+    github_run_id = github_run_id or str(uuid.uuid4())
+
+    params = {
+        'p_ci_run_id': github_run_id,
+        'p_spec_id': spec_id or None,
+        'p_default_spec': DEFAULT_SPEC,
+        'p_default_dod': DEFAULT_DOD
+    }
+    if sprint_id:
+        params['p_sprint_id'] = sprint_id
+    try:
+        result = supabase.rpc('create_run', params).execute()
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+        print("⚠️  Fonction create_run absente du schéma, création en plusieurs requêtes")
+        return _create_run_legacy(supabase, spec_id, github_run_id, sprint_id)
+
+    context = dict(result.data)
+    context['ci_run_id'] = github_run_id
+    print(f"📋 Spec: {context['spec_id']}")
+    print(f"📊 Sprint: {context['sprint_id']}")
+    print(f"✅ Run créé: {context['run_id']}")
+    return context
+
+def _create_run_legacy(supabase: 'Client', spec_id, github_run_id, sprint_id=None):
+    """Création requête par requête, pour un schéma sans la fonction create_run"""
+    if sprint_id:
+        sprint = supabase.table('sprints').select('*').eq('id', sprint_id).single().execute().data
+        spec_id = sprint['spec_id']
+    # Si pas de spec_id, créer une spec de test par défaut
+    if not spec_id:
+        specs = supabase.table('specs').select('*').order('created_at', desc=True).limit(1).execute()
+        if specs.data:
+            spec_id = specs.data[0]['id']
+            print(f"📋 Utilisation de la spec existante: {spec_id}")
+        else:
+            # Créer une spec de test par défaut
+            print("📝 Création d'une spec de test par défaut...")
+            spec_result = supabase.table('specs').insert(DEFAULT_SPEC).execute()
+            if not spec_result.data:
+                raise RuntimeError("Échec création de la spec de test")
+            spec_id = spec_result.data[0]['id']
+            print(f"✅ Spec de test créée: {spec_id}")
+    
+    # Créer ou récupérer le sprint associé
+    if sprint_id:
+        print(f"📊 Sprint attribué: {sprint['id']}")
+    else:
+        sprints = supabase.table('sprints').select('*').eq('spec_id', spec_id).execute()
+        
+        if not sprints.data:
+            # Créer un sprint par défaut
+            sprint_data = {
+                'spec_id': spec_id,
+                'label': 'S1',
+                'dod_json': DEFAULT_DOD
+            }
+            sprint = supabase.table('sprints').insert(sprint_data).execute().data[0]
+            print(f"📊 Sprint créé: {sprint['id']}")
+        else:
+            sprint = sprints.data[0]
+            print(f"📊 Sprint existant: {sprint['id']}")
+    
+    # Créer l'enregistrement de run
+    run_data = {
+        'sprint_id': sprint['id'],
+        'ci_run_id': github_run_id,
+        'started_at': 'now()',
+        'result': None,
+        'summary_json': {'status': 'STARTED'}
+    }
+    
+    run = supabase.table('runs').insert(run_data).execute()
+    run_id = run.data[0]['id']
+    
+    # Enregistrer un événement de statut
+    emit(supabase, run_id, 'PLANNING', f'Démarrage du run {github_run_id}')
+    
+    print(f"✅ Run créé: {run_id}")
+    
+    return {
+        'run_id': run_id,
+        'sprint_id': sprint['id'],
+        'spec_id': spec_id,
+        'ci_run_id': github_run_id,
+        'sprint_label': sprint['label'],
+        'dod_json': sprint['dod_json']
+    }
+
+def write_context(context):
+    """Publie le contexte : sorties GitHub Actions et artifacts/run_context.json"""
+    # Définir les variables de sortie pour GitHub Actions
+    github_output = os.getenv('GITHUB_OUTPUT')
+    if github_output:
+        with open(github_output, 'a') as f:
+            f.write(f"run_id={context['run_id']}\n")
+            f.write(f"sprint_id={context['sprint_id']}\n")
+            f.write(f"spec_id={context['spec_id']}\n")
+    
+    # Créer aussi un fichier local pour les autres scripts
+    os.makedirs('artifacts', exist_ok=True)
+    with open(RUN_CONTEXT_FILE, 'w') as f:
+        json.dump(context, f, indent=2)
+    
+    print(f"📝 Contexte sauvé dans {RUN_CONTEXT_FILE}")
+
+def load_context():
+    """Relit le contexte du run sauvegardé par une étape précédente"""
+    try:
+        with open(RUN_CONTEXT_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
 def main():
     # Variables d'environnement
@@ -20,99 +165,15 @@ def main():
         print("❌ Variables SUPABASE_URL ou SUPABASE_SERVICE_KEY manquantes")
         exit(1)
     
-    # Connexion Supabase
-    supabase: Client = create_client(supabase_url, supabase_key)
+    # Connexion Supabase (session partagée keep-alive, retry sur 429/5xx)
+    from ops_client import get_client
+    supabase = get_client(supabase_url, supabase_key)
     
     try:
-        # Si pas de spec_id, créer une spec de test par défaut
-        if not spec_id:
-            specs = supabase.table('specs').select('*').order('created_at', desc=True).limit(1).execute()
-            if specs.data:
-                spec_id = specs.data[0]['id']
-                print(f"📋 Utilisation de la spec existante: {spec_id}")
-            else:
-                # Créer une spec de test par défaut
-                print("📝 Création d'une spec de test par défaut...")
-                default_spec = {
-                    'repo': 'ljniox/ai-continuous-delivery',
-                    'branch': 'main',
-                    'storage_path': 'specs/default-test.yaml',
-                    'created_by': 'github-actions-test'
-                }
-                
-                spec_result = supabase.table('specs').insert(default_spec).execute()
-                if spec_result.data:
-                    spec_id = spec_result.data[0]['id']
-                    print(f"✅ Spec de test créée: {spec_id}")
-                else:
-                    print("❌ Échec création de la spec de test")
-                    exit(1)
-        
-        # Créer ou récupérer le sprint associé
-        sprints = supabase.table('sprints').select('*').eq('spec_id', spec_id).execute()
-        
-        if not sprints.data:
-            # Créer un sprint par défaut
-            sprint_data = {
-                'spec_id': spec_id,
-                'label': 'S1',
-                'dod_json': {
-                    'coverage_min': 0.80,
-                    'e2e_pass': True,
-                    'lighthouse_min': 85
-                }
-            }
-            sprint = supabase.table('sprints').insert(sprint_data).execute()
-            sprint_id = sprint.data[0]['id']
-            print(f"📊 Sprint créé: {sprint_id}")
-        else:
-            sprint_id = sprints.data[0]['id']
-            print(f"📊 Sprint existant: {sprint_id}")
-        
-        # Créer l'enregistrement de run
-        run_data = {
-            'sprint_id': sprint_id,
-            'ci_run_id': github_run_id,
-            'started_at': 'now()',
-            'result': None,
-            'summary_json': {'status': 'STARTED'}
-        }
-        
-        run = supabase.table('runs').insert(run_data).execute()
-        run_id = run.data[0]['id']
-        
-        # Enregistrer un événement de statut
-        supabase.table('status_events').insert({
-            'run_id': run_id,
-            'phase': 'PLANNING',
-            'message': f'Démarrage du run {github_run_id}'
-        }).execute()
-        
-        print(f"✅ Run créé: {run_id}")
-        
-        # Définir les variables de sortie pour GitHub Actions
-        github_output = os.getenv('GITHUB_OUTPUT')
-        if github_output:
-            with open(github_output, 'a') as f:
-                f.write(f"run_id={run_id}\n")
-                f.write(f"sprint_id={sprint_id}\n")
-                f.write(f"spec_id={spec_id}\n")
-        
-        # Créer aussi un fichier local pour les autres scripts
-        os.makedirs('artifacts', exist_ok=True)
-        with open('artifacts/run_context.json', 'w') as f:
-            json.dump({
-                'run_id': run_id,
-                'sprint_id': sprint_id,
-                'spec_id': spec_id,
-                'ci_run_id': github_run_id
-            }, f, indent=2)
-        
-        print(f"📝 Contexte sauvé dans artifacts/run_context.json")
-        
+        write_context(create_run(supabase, spec_id, github_run_id))
     except Exception as e:
         print(f"❌ Erreur lors de la création du run: {e}")
         exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
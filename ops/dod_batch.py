@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Réévaluation en lot de la DoD sur les runs historiques : les résumés et critères
+de milliers de runs sont chargés en une fois (requêtes paginées) puis évalués
+colonne par colonne avec pandas, règle compilée par règle compilée (dod_rules),
+pour mesurer l'effet d'un changement de seuils
+
+    python ops/dod_batch.py --dod '{"coverage_min": 0.85, "lighthouse_min": 90}'
+    python ops/dod_batch.py --input runs.jsonl --changed-only --json
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import TYPE_CHECKING
+
+from dod_rules import compile_dod, unknown_keys
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Taille des pages PostgREST (limite max-rows par défaut de Supabase)
+PAGE_SIZE = 1000
+
+def _import_pandas():
+    try:
+        import pandas
+    except ImportError:
+        print("❌ Module pandas manquant : pip install pandas")
+        sys.exit(1)
+    return pandas
+
+def summary_keys(dods):
+    """Clés de premier niveau du résumé lues par les règles de ces DoD"""
+    return sorted({rule.path[0] for dod in dods for rule in compile_dod(dod)})
+
+def _paginate(query_for_page, limit=None):
+    rows = []
+    while limit is None or len(rows) < limit:
+        size = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - len(rows))
+        page = query_for_page(len(rows), len(rows) + size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < size:
+            break
+    return rows
+
+def fetch_sprint_dods(supabase: 'Client'):
+    """DoD distinctes des sprints (peu nombreuses) pour connaître les métriques à lire"""
+    rows = _paginate(lambda start, end: supabase.table('sprints').select('dod_json').range(start, end))
+    unique = {json.dumps(row['dod_json'] or {}, sort_keys=True) for row in rows}
+    return [json.loads(dod) for dod in unique]
+
+def fetch_runs(supabase: 'Client', keys, limit=None, since=None):
+    """
+    Charge les runs terminés, page par page ; seules les clés utiles du résumé
+    sont lues (sélection JSON côté PostgREST) pour garder des réponses compactes
+    """
+    columns = ','.join(
+        ['id', 'result', 'started_at']
+        + [f"{key}:summary_json->{key}" for key in keys]
+        + ['sprints(dod_json)']
+    )
+
+    def page(start, end):
+        query = supabase.table('runs').select(columns).not_.is_('result', 'null')
+        if since:
+            query = query.gte('started_at', since)
+        return query.order('started_at', desc=True).range(start, end)
+
+    return [
+        {
+            'run_id': row['id'],
+            'result': row.get('result'),
+            'started_at': row.get('started_at'),
+            'summary': {key: row.get(key) for key in keys},
+            'dod': (row.get('sprints') or {}).get('dod_json') or {}
+        }
+        for row in _paginate(page, limit)
+    ]
+
+def load_runs_file(path):
+    """Runs exportés en JSON Lines : run_id, result, summary_json, dod_json"""
+    runs = []
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            runs.append({
+                'run_id': row.get('run_id') or row.get('id'),
+                'result': row.get('result'),
+                'started_at': row.get('started_at'),
+                'summary': row.get('summary_json') or {},
+                'dod': row.get('dod_json') or {}
+            })
+    return runs
+
+def build_frame(runs, dod_override=None):
+    """Une ligne par run : DoD (JSON) et une colonne s_<clé> par clé du résumé utilisée"""
+    pd = _import_pandas()
+    dods = [dod_override if dod_override is not None else run['dod'] for run in runs]
+    dod_keys = [json.dumps(dod) for dod in dods]
+    frame = pd.DataFrame({
+        'run_id': [run['run_id'] for run in runs],
+        'result': [run['result'] for run in runs],
+        'dod': dod_keys,
+    })
+    distinct = [json.loads(key) for key in dict.fromkeys(dod_keys)]
+    for key in summary_keys(distinct):
+        frame[f's_{key}'] = pd.Series([run['summary'].get(key) for run in runs], dtype=object)
+    return frame
+
+def _rule_column(pd, rule, column):
+    """Résultat d'une règle sur une colonne : extraction, puis prédicat vectorisé"""
+    if len(rule.path) > 1 or rule.agg is not None:
+        values = column.map(rule.extract)
+    elif rule.default is not None:
+        values = column.where(column.notna(), rule.default)
+    else:
+        values = column
+    if rule.numeric:
+        values = pd.to_numeric(values, errors='coerce')
+        return rule.test(values).fillna(False).astype(bool) & values.notna()
+    return rule.test(values.fillna(False).astype(bool))
+
+def evaluate_frame(frame):
+    """
+    Évalue tous les runs d'un coup, groupe de runs partageant la même DoD par
+    groupe. Ajoute par critère les colonnes <critère>_applies / <critère>_ok,
+    puis score, total_criteria et passed ; frame.attrs['criteria'] liste les critères
+    """
+    pd = _import_pandas()
+    score = pd.Series(0, index=frame.index)
+    total = pd.Series(0, index=frame.index)
+    passed = pd.Series(True, index=frame.index)
+    criteria = {}
+
+    for dod_key, index in frame.groupby('dod', sort=False).groups.items():
+        for rule in compile_dod(json.loads(dod_key)):
+            ok = _rule_column(pd, rule, frame.loc[index, f's_{rule.path[0]}'])
+            if rule.name not in criteria:
+                criteria[rule.name] = True
+                frame[f'{rule.name}_applies'] = False
+                frame[f'{rule.name}_ok'] = False
+            frame.loc[index, f'{rule.name}_applies'] = True
+            frame.loc[index, f'{rule.name}_ok'] = ok
+            total.loc[index] += 1
+            score.loc[index] += ok.astype(int)
+            passed.loc[index] &= ok
+
+    frame['score'] = score
+    frame['total_criteria'] = total
+    frame['passed'] = passed
+    frame['new_result'] = passed.map({True: 'PASSED', False: 'FAILED'})
+    frame['changed'] = frame['result'].notna() & (frame['result'] != frame['new_result'])
+    frame.attrs['criteria'] = list(criteria)
+    return frame
+
+def pass_rates(frame):
+    """Taux de réussite par critère, parmi les runs auxquels il s'applique"""
+    rates = {}
+    for name in frame.attrs.get('criteria', []):
+        applies = frame[f'{name}_applies'].astype(bool)
+        count = int(applies.sum())
+        rates[name] = {
+            'runs': count,
+            'pass_rate': float(frame.loc[applies, f'{name}_ok'].astype(bool).mean()) if count else None
+        }
+    rates['overall'] = {
+        'runs': len(frame),
+        'pass_rate': float(frame['passed'].mean()) if len(frame) else None
+    }
+    return rates
+
+def changed_runs(frame):
+    """Runs dont le verdict changerait avec les critères évalués"""
+    changed = frame.loc[frame['changed'], ['run_id', 'result', 'new_result', 'score', 'total_criteria']]
+    return [
+        {
+            'run_id': row.run_id,
+            'old_result': row.result,
+            'new_result': row.new_result,
+            'score': int(row.score),
+            'total_criteria': int(row.total_criteria)
+        }
+        for row in changed.itertuples(index=False)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Réévaluation de la DoD sur les runs historiques")
+    parser.add_argument('--dod', help="Critères DoD JSON appliqués à tous les runs (défaut: DoD du sprint de chaque run)")
+    parser.add_argument('--input', help="Runs exportés en JSON Lines au lieu de Supabase")
+    parser.add_argument('--limit', type=int, help="Nombre maximal de runs (les plus récents)")
+    parser.add_argument('--since', help="Runs démarrés depuis cette date (ISO 8601)")
+    parser.add_argument('--changed-only', action='store_true', help="N'affiche que les verdicts qui changent")
+    parser.add_argument('--json', action='store_true', help="Sortie JSON")
+    args = parser.parse_args()
+
+    dod_override = json.loads(args.dod) if args.dod else None
+    for key in unknown_keys(dod_override):
+        # stderr : la sortie --json reste lisible
+        print(f"⚠️  Clé DoD inconnue ignorée: {key} (suffixes attendus: _min, _max, _pass)", file=sys.stderr)
+    _import_pandas()
+
+    if args.input:
+        runs = load_runs_file(args.input)
+    else:
+        supabase_url = os.getenv('SUPABASE_URL')
+        supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
+        if not supabase_url or not supabase_key:
+            print("❌ Variables SUPABASE_URL ou SUPABASE_SERVICE_KEY manquantes")
+            sys.exit(1)
+        from ops_client import get_client
+        supabase = get_client(supabase_url, supabase_key)
+        dods = [dod_override] if dod_override is not None else fetch_sprint_dods(supabase)
+        runs = fetch_runs(supabase, summary_keys(dods), args.limit, args.since)
+
+    frame = evaluate_frame(build_frame(runs, dod_override))
+    rates = pass_rates(frame)
+    changed = changed_runs(frame)
+
+    if args.json:
+        report = {'changed': changed} if args.changed_only else {'pass_rates': rates, 'changed': changed}
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    if not args.changed_only:
+        print(f"📊 {len(frame)} runs évalués")
+        for name, rate in rates.items():
+            value = f"{rate['pass_rate']:.1%}" if rate['pass_rate'] is not None else '-'
+            print(f"   {name:<24} {value:>7}  ({rate['runs']} runs)")
+    print(f"🔁 {len(changed)} verdicts changeraient")
+    for run in changed:
+        print(f"   {run['run_id']}: {run['old_result']} → {run['new_result']} "
+              f"({run['score']}/{run['total_criteria']})")
+
+if __name__ == '__main__':
+    main()
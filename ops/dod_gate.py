@@ -6,103 +6,62 @@ et décide si le sprint peut être mergé
 
 import os
 import json
-from pathlib import Path
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
+from summary import SUMMARY_FILE, load_summary, save_summary
+from dod_rules import compile_dod, run_rules, unknown_keys
+from regression_gate import check_regressions
+from events import emit
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 def evaluate_dod(summary, dod_criteria):
     """
-    Évalue si les critères DoD sont respectés
+    Évalue si les critères DoD sont respectés (règles compilées, voir dod_rules).
+    Les clés inconnues, qui n'ont produit aucune règle, sont signalées dans warnings
     """
-    results = {
-        'passed': True,
-        'details': [],
-        'score': 0,
-        'total_criteria': 0
-    }
-    
-    # Coverage minimum
-    if 'coverage_min' in dod_criteria:
-        coverage_min = dod_criteria['coverage_min']
-        actual_coverage = summary.get('coverage', 0)
-        
-        if actual_coverage >= coverage_min:
-            results['details'].append(f"✅ Coverage: {actual_coverage:.1%} >= {coverage_min:.1%}")
-            results['score'] += 1
-        else:
-            results['details'].append(f"❌ Coverage: {actual_coverage:.1%} < {coverage_min:.1%}")
-            results['passed'] = False
-        results['total_criteria'] += 1
-    
-    # Tests E2E passent
-    if dod_criteria.get('e2e_pass', False):
-        e2e_pass = summary.get('e2e_pass', False)
-        if e2e_pass:
-            results['details'].append("✅ Tests E2E: Passés")
-            results['score'] += 1
-        else:
-            results['details'].append("❌ Tests E2E: Échecs")
-            results['passed'] = False
-        results['total_criteria'] += 1
-    
-    # Tests unitaires passent
-    unit_pass = summary.get('unit_pass', False)
-    if unit_pass:
-        results['details'].append("✅ Tests unitaires: Passés")
-        results['score'] += 1
-    else:
-        results['details'].append("❌ Tests unitaires: Échecs")
-        results['passed'] = False
-    results['total_criteria'] += 1
-    
-    # Score Lighthouse minimum
-    if 'lighthouse_min' in dod_criteria:
-        lighthouse_min = dod_criteria['lighthouse_min']
-        actual_lighthouse = summary.get('lighthouse', 0)
-        
-        if actual_lighthouse >= lighthouse_min:
-            results['details'].append(f"✅ Lighthouse: {actual_lighthouse} >= {lighthouse_min}")
-            results['score'] += 1
-        else:
-            results['details'].append(f"❌ Lighthouse: {actual_lighthouse} < {lighthouse_min}")
-            results['passed'] = False
-        results['total_criteria'] += 1
-    
-    return results
+    evaluation = run_rules(compile_dod(dod_criteria), summary)
+    ignored = unknown_keys(dod_criteria)
+    if ignored:
+        evaluation['warnings'] = [
+            f"Clé DoD inconnue ignorée: {key} (suffixes attendus: _min, _max, _pass)" for key in ignored
+        ]
+        evaluation['details'].extend(f"⚠️  {warning}" for warning in evaluation['warnings'])
+    return evaluation
 
-def main():
-    # Variables d'environnement
-    supabase_url = os.getenv('SUPABASE_URL')
-    supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
-    run_id = os.getenv('RUN_ID')
-    
-    if not supabase_url or not supabase_key or not run_id:
-        print("❌ Variables SUPABASE_URL, SUPABASE_SERVICE_KEY ou RUN_ID manquantes")
-        exit(1)
-    
-    # Connexion Supabase
-    supabase: Client = create_client(supabase_url, supabase_key)
-    
-    # Charger le résumé des tests
-    summary_file = Path('artifacts/summary.json')
-    if not summary_file.exists():
-        print("❌ Fichier artifacts/summary.json non trouvé")
-        exit(1)
-    
-    with open(summary_file, 'r') as f:
-        summary = json.load(f)
-    
+def gate_regressions(supabase: 'Client', run_id, summary, sprint):
+    """Rapport de régression du run, ou None si la ligne de base est indisponible"""
+    try:
+        report = check_regressions(supabase, run_id, summary, sprint)
+    except Exception as e:
+        print(f"⚠️  Gate de régression ignorée: {e}")
+        return None
+    if report['mode'] == 'off':
+        return report
+
+    print(f"\n📈 Régressions ({report['mode']}, {report['baseline_runs']} runs de référence, "
+          f"périmètre: {report['scope']})")
+    for detail in report['details']:
+        print(f"   {detail}")
+    return report
+
+def run_gate(supabase: 'Client', run_id, summary, sprint=None):
+    """
+    Évalue la DoD du run et met à jour runs, sprints et status_events.
+    sprint (id, label, dod_json) peut être fourni par l'appelant pour éviter
+    de relire le run ; retourne True si la DoD est passée.
+    """
     print(f"🔍 Évaluation DoD pour le run {run_id}")
     
     try:
-        # Récupérer les informations du run et du sprint
-        run_data = supabase.table('runs').select('*, sprints(*)').eq('id', run_id).single().execute()
-        
-        if not run_data.data:
-            print("❌ Run non trouvé")
-            exit(1)
-        
-        run = run_data.data
-        sprint = run['sprints']
+        if sprint is None:
+            # Récupérer les informations du run et du sprint
+            run_data = supabase.table('runs').select('*, sprints(*)').eq('id', run_id).single().execute()
+            
+            if not run_data.data:
+                raise ValueError("Run non trouvé")
+            
+            sprint = run_data.data['sprints']
         dod_criteria = sprint['dod_json']
         
         print(f"📋 Sprint: {sprint['label']}")
@@ -115,13 +74,20 @@ def main():
         for detail in evaluation['details']:
             print(f"   {detail}")
         
+        # Régressions par rapport aux derniers runs réussis (médiane ± k × MAD)
+        regression = gate_regressions(supabase, run_id, summary, sprint)
+        if regression is not None:
+            summary['regression'] = regression
+            if regression['regressions'] and regression['mode'] == 'fail':
+                evaluation['passed'] = False
+                evaluation['details'].append(f"❌ Régressions: {', '.join(regression['regressions'])}")
+        
         # Mettre à jour le résumé
         summary['dod_evaluation'] = evaluation
         summary['result'] = 'PASSED' if evaluation['passed'] else 'FAILED'
         
-        # Sauvegarder le résumé mis à jour
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        # Sauvegarder le résumé mis à jour (compact, le détail des artefacts est à part)
+        save_summary(summary)
         
         # Mettre à jour le run dans la base
         run_update = {
@@ -138,18 +104,14 @@ def main():
         
         # Enregistrer un événement de statut final
         final_phase = 'TESTS_PASSED' if evaluation['passed'] else 'TESTS_FAILED'
-        supabase.table('status_events').insert({
-            'run_id': run_id,
-            'phase': final_phase,
-            'message': f"DoD {summary['result']}: {evaluation['score']}/{evaluation['total_criteria']} critères"
-        }).execute()
+        emit(supabase, run_id, final_phase,
+             f"DoD {summary['result']}: {evaluation['score']}/{evaluation['total_criteria']} critères")
         
         if evaluation['passed']:
             print("\n✅ DoD PASSÉ - Sprint prêt pour merge")
-            exit(0)
         else:
             print("\n❌ DoD ÉCHOUÉ - Corrections nécessaires")
-            exit(1)
+        return evaluation['passed']
             
     except Exception as e:
         print(f"❌ Erreur lors de l'évaluation DoD: {e}")
@@ -158,8 +120,7 @@ def main():
         summary['result'] = 'FAILED'
         summary['error'] = str(e)
         
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        save_summary(summary)
         
         supabase.table('runs').update({
             'finished_at': 'now()',
@@ -167,7 +128,30 @@ def main():
             'summary_json': summary
         }).eq('id', run_id).execute()
         
+        return False
+
+def main():
+    # Variables d'environnement
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
+    run_id = os.getenv('RUN_ID')
+    
+    if not supabase_url or not supabase_key or not run_id:
+        print("❌ Variables SUPABASE_URL, SUPABASE_SERVICE_KEY ou RUN_ID manquantes")
         exit(1)
+    
+    # Charger le résumé des tests
+    if not SUMMARY_FILE.exists():
+        print("❌ Fichier artifacts/summary.json non trouvé")
+        exit(1)
+    
+    summary = load_summary()
+    
+    # Connexion Supabase (session partagée keep-alive, retry sur 429/5xx)
+    from ops_client import get_client
+    supabase = get_client(supabase_url, supabase_key)
+    
+    exit(0 if run_gate(supabase, run_id, summary) else 1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Moteur de règles de la Definition of Done : les critères de dod_json sont
+compilés une seule fois en prédicats (comparaisons, intervalles, agrégations
+par métrique), puis appliqués au résumé du run. Toute métrique du résumé peut
+être contrainte sans modifier le code :
+
+    {"coverage_min": 0.8, "bundle_kb_max": 250, "e2e_pass": true,
+     "rules": [{"metric": "perf.latency_ms", "agg": "p95", "op": "<=", "value": 300},
+               {"metric": "memory_mb", "between": [64, 512]}]}
+
+Conventions des clés : <métrique>_min (>=), <métrique>_max (<=), <métrique>_pass
+(booléen requis si true). unit_pass est requis par défaut ; "unit_pass": false
+le désactive. Toute autre clé (hors "rules" et "regression") est signalée par
+unknown_keys() : une faute de frappe désactiverait le critère sans bruit.
+"""
+
+import json
+import math
+import operator
+import functools
+import statistics
+
+OPERATORS = {
+    '>=': operator.ge,
+    '<=': operator.le,
+    '>': operator.gt,
+    '<': operator.lt,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+NEGATED = {'>=': '<', '<=': '>', '>': '<=', '<': '>=', '==': '!=', '!=': '=='}
+
+def percentile(values, q):
+    """Percentile par interpolation linéaire (même définition que numpy par défaut)"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q / 100
+    low, high = math.floor(position), math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+# Agrégations d'une métrique liste (durées par test, échantillons de latence...) ;
+# pNN est résolu dynamiquement. Extensible via register_aggregation().
+AGGREGATIONS = {
+    'min': min,
+    'max': max,
+    'sum': sum,
+    'count': len,
+    'mean': statistics.fmean,
+    'median': statistics.median,
+}
+
+# Libellé, format et valeur par défaut des métriques historiques du résumé.
+# Extensible via register_metric().
+METRICS = {
+    'coverage': ('Coverage', '{:.1%}', 0),
+    'lighthouse': ('Lighthouse', '{}', 0),
+    'e2e_pass': ('Tests E2E', '{}', False),
+    'unit_pass': ('Tests unitaires', '{}', False),
+}
+
+def register_aggregation(name, func):
+    """Ajoute une agrégation utilisable dans "agg" (func: liste -> nombre)"""
+    AGGREGATIONS[name] = func
+    _compile_cached.cache_clear()
+
+def register_metric(metric, label, fmt='{}', default=None):
+    """Déclare le libellé, le format d'affichage et la valeur par défaut d'une métrique"""
+    METRICS[metric] = (label, fmt, default)
+    _compile_cached.cache_clear()
+
+def _aggregation(name):
+    if name in AGGREGATIONS:
+        return AGGREGATIONS[name]
+    if name.startswith('p') and name[1:].replace('.', '', 1).isdigit() and 0 <= float(name[1:]) <= 100:
+        q = float(name[1:])
+        return lambda values: percentile(values, q)
+    raise ValueError(f"Agrégation DoD inconnue: {name}")
+
+class Compare:
+    """valeur <op> seuil ; fonctionne sur un scalaire ou une colonne pandas"""
+
+    def __init__(self, op, threshold):
+        if op not in OPERATORS:
+            raise ValueError(f"Opérateur DoD inconnu: {op}")
+        self.op = op
+        self.threshold = threshold
+
+    def __call__(self, value):
+        return OPERATORS[self.op](value, self.threshold)
+
+    def describe(self, shown, ok, fmt):
+        op = self.op if ok else NEGATED[self.op]
+        return f"{shown} {op} {fmt.format(self.threshold)}"
+
+class Between:
+    """low <= valeur <= high"""
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def __call__(self, value):
+        return (value >= self.low) & (value <= self.high)
+
+    def describe(self, shown, ok, fmt):
+        where = 'dans' if ok else 'hors de'
+        return f"{shown} {where} [{fmt.format(self.low)}, {fmt.format(self.high)}]"
+
+class Flag:
+    """Booléen attendu (tests passés...)"""
+
+    def __init__(self, expected=True):
+        self.expected = expected
+
+    def __call__(self, value):
+        return value == self.expected
+
+    def describe(self, shown, ok, fmt):
+        return 'Passés' if ok else 'Échecs'
+
+class Rule:
+    """Critère compilé : extraction de la métrique, agrégation éventuelle, prédicat"""
+
+    def __init__(self, name, metric, test, agg=None, label=None):
+        self.name = name
+        self.metric = metric
+        self.path = tuple(metric.split('.'))
+        self.test = test
+        self.agg_name = agg
+        self.agg = _aggregation(agg) if agg else None
+        default_label, self.fmt, self.default = METRICS.get(metric, (metric, '{}', None))
+        if isinstance(test, Flag):
+            self.default = False if self.default is None else self.default
+        self.label = label or (f"{agg} {default_label}" if agg else default_label)
+
+    @property
+    def numeric(self):
+        return not isinstance(self.test, Flag)
+
+    def extract(self, value):
+        """Valeur de la métrique à partir du premier niveau du chemin (déjà extrait)"""
+        for key in self.path[1:]:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is None:
+            return self.default
+        if self.agg is not None:
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            value = [v for v in value if v is not None]
+            return self.agg(value) if value else None
+        return value
+
+    def value(self, summary):
+        return self.extract(summary.get(self.path[0]))
+
+    def evaluate(self, summary):
+        """(respecté, détail lisible) pour un résumé de run"""
+        value = self.value(summary)
+        if value is None:
+            return False, f"❌ {self.label}: absente"
+        if isinstance(self.test, Flag):
+            value = bool(value)
+        try:
+            ok = bool(self.test(value))
+        except TypeError:
+            return False, f"❌ {self.label}: valeur invalide ({value!r})"
+        shown = self.fmt.format(value) if self.numeric else value
+        return ok, f"{'✅' if ok else '❌'} {self.label}: {self.test.describe(shown, ok, self.fmt)}"
+
+def _compile_key(key, value):
+    """Règle d'une clé conventionnelle de dod_json, ou None si la clé n'en est pas une"""
+    if key.endswith('_min'):
+        return Rule(key, key[:-4], Compare('>=', value))
+    if key.endswith('_max'):
+        return Rule(key, key[:-4], Compare('<=', value))
+    if key.endswith('_pass'):
+        return Rule(key, key, Flag()) if value else None
+    return None
+
+def _compile_explicit(spec, index):
+    """Règle explicite de la liste "rules" """
+    if not isinstance(spec, dict) or 'metric' not in spec:
+        raise ValueError(f"Règle DoD #{index} invalide: {spec!r}")
+    metric = spec['metric']
+    agg = spec.get('agg')
+    if 'between' in spec:
+        low, high = spec['between']
+        test, suffix = Between(low, high), 'between'
+    elif 'op' in spec:
+        test, suffix = Compare(spec['op'], spec['value']), spec['op']
+    elif 'min' in spec:
+        test, suffix = Compare('>=', spec['min']), 'min'
+    elif 'max' in spec:
+        test, suffix = Compare('<=', spec['max']), 'max'
+    elif 'pass' in spec:
+        test, suffix = Flag(bool(spec['pass'])), 'pass'
+    else:
+        raise ValueError(f"Règle DoD #{index} sans condition: {spec!r}")
+    name = spec.get('name') or '_'.join(part for part in (agg, metric, suffix) if part)
+    return Rule(name, metric, test, agg=agg, label=spec.get('label'))
+
+# Clés de dod_json qui ne sont pas des critères (lues par regression_gate pour "regression")
+RESERVED_KEYS = ('rules', 'regression')
+KEY_SUFFIXES = ('_min', '_max', '_pass')
+
+def unknown_keys(dod_criteria):
+    """Clés de dod_json sans convention reconnue, donc sans règle (ex: lighthouse_minimum)"""
+    return [key for key in (dod_criteria or {})
+            if key not in RESERVED_KEYS and not key.endswith(KEY_SUFFIXES)]
+
+# Critères historiques, évalués en premier et dans cet ordre
+LEGACY_ORDER = ('coverage_min', 'e2e_pass', 'unit_pass', 'lighthouse_min')
+
+@functools.lru_cache(maxsize=256)
+def _compile_cached(dod_key):
+    dod = json.loads(dod_key)
+    # unit_pass est requis sauf désactivation explicite
+    dod.setdefault('unit_pass', True)
+    keys = [key for key in LEGACY_ORDER if key in dod]
+    keys += [key for key in dod if key not in LEGACY_ORDER and key != 'rules']
+
+    rules = []
+    for key in keys:
+        rule = _compile_key(key, dod[key])
+        if rule is not None:
+            rules.append(rule)
+    for index, spec in enumerate(dod.get('rules') or []):
+        rules.append(_compile_explicit(spec, index))
+    return tuple(rules)
+
+def compile_dod(dod_criteria):
+    """Compile dod_json en règles (résultat mis en cache par contenu de la DoD)"""
+    return _compile_cached(json.dumps(dod_criteria or {}))
+
+def run_rules(rules, summary):
+    """Applique des règles compilées ; même structure de résultat que evaluate_dod"""
+    results = {'passed': True, 'details': [], 'score': 0, 'total_criteria': 0}
+    for rule in rules:
+        ok, detail = rule.evaluate(summary)
+        results['details'].append(detail)
+        results['total_criteria'] += 1
+        if ok:
+            results['score'] += 1
+        else:
+            results['passed'] = False
+    return results
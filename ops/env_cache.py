@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Cache local des environnements de test du runner : venv Python, node_modules et
+navigateurs Playwright, chacun indexé par l'empreinte de ce qui le détermine
+(requirements.txt / pyproject.toml, package-lock.json, version de Playwright,
+version de Python ou de Node, architecture). Une entrée présente est réutilisée
+au lieu de relancer pip, npm et playwright install ; les entrées les moins
+récemment utilisées sont supprimées au-delà du budget disque.
+
+Le venv et les navigateurs sont utilisés en place (un venv n'est pas déplaçable),
+node_modules est restauré par liens physiques. La sortie standard contient les
+variables à exporter :
+
+    eval "$(python ops/env_cache.py setup)"            # ENV_CACHE_VENV=hit|built|failed...
+    eval "$(python ops/env_cache.py setup --github)"   # + étapes suivantes (GITHUB_ENV/GITHUB_PATH)
+    python ops/env_cache.py status
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import shutil
+import fcntl
+import hashlib
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+CACHE_DIR = Path(os.getenv('ENV_CACHE_DIR', '~/.cache/ai-cd/env')).expanduser()
+BUDGET_GB = float(os.getenv('ENV_CACHE_BUDGET_GB', '10'))
+# Entrées utilisées récemment jamais évincées : un autre run peut s'en servir
+EVICT_GRACE_SECONDS = int(os.getenv('ENV_CACHE_GRACE_SECONDS', '3600'))
+# Entrées incomplètes (build interrompu) supprimées après ce délai
+STALE_BUILD_SECONDS = 24 * 3600
+
+COMPONENTS = ('venv', 'node', 'browsers')
+# Plugins pytest installés par qwen_run_tests.sh
+TEST_PACKAGES = ['pytest', 'pytest-cov', 'pytest-html', 'pytest-xvfb']
+MARKER = '.complete'
+NODE_MODULES_KEY = '.env-cache-key'
+# Écrit par Playwright dans le répertoire d'un navigateur une fois son téléchargement terminé
+PLAYWRIGHT_MARKER = 'INSTALLATION_COMPLETE'
+
+def log(message):
+    # stdout est réservé aux variables exportées (eval dans qwen_run_tests.sh)
+    print(message, file=sys.stderr)
+
+def cache_key(*parts):
+    """Empreinte courte de parties hétérogènes (octets, texte, None)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b'\0'
+        elif isinstance(part, str):
+            part = part.encode()
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()[:16]
+
+def _read(path):
+    try:
+        return Path(path).read_bytes()
+    except OSError:
+        return None
+
+def _command_output(*cmd):
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def venv_key(root='.'):
+    """Python (version, installation de base), architecture, dépendances déclarées"""
+    root = Path(root)
+    requirements = _read(root / 'requirements.txt')
+    pyproject = _read(root / 'pyproject.toml')
+    if requirements is None and pyproject is None:
+        return None
+    # Sans requirements.txt, le projet est installé en mode éditable : chemin inclus
+    editable = str(root.resolve()) if requirements is None else None
+    return cache_key('venv', platform.python_version(), sys.base_prefix, platform.machine(),
+                     requirements, pyproject if requirements is None else None, editable,
+                     ' '.join(TEST_PACKAGES))
+
+def node_key(root='.'):
+    """Node (version), architecture et lockfile (package.json à défaut)"""
+    root = Path(root)
+    lock = _read(root / 'package-lock.json')
+    manifest = _read(root / 'package.json')
+    node_version = _command_output('node', '--version')
+    if manifest is None or node_version is None:
+        return None
+    return cache_key('node', node_version, platform.machine(), lock if lock is not None else manifest)
+
+def playwright_version(root='.'):
+    """Version de Playwright verrouillée (package-lock.json) ou installée (node_modules)"""
+    root = Path(root)
+    try:
+        packages = json.loads(_read(root / 'package-lock.json') or b'{}').get('packages', {})
+    except ValueError:
+        packages = {}
+    for name in ('node_modules/playwright-core', 'node_modules/@playwright/test', 'node_modules/playwright'):
+        version = (packages.get(name) or {}).get('version')
+        if version:
+            return version
+    try:
+        return json.loads(_read(root / 'node_modules/playwright-core/package.json') or b'')['version']
+    except (ValueError, KeyError):
+        return None
+
+def browsers_key(root='.'):
+    version = playwright_version(root)
+    if version is None:
+        return None
+    return cache_key('browsers', version, platform.machine())
+
+def entry_dir(component, key, cache_dir=None):
+    return Path(cache_dir or CACHE_DIR) / component / key
+
+def is_complete(entry):
+    return (entry / MARKER).exists()
+
+def touch(entry):
+    """Marque l'entrée comme utilisée (ordre LRU)"""
+    os.utime(entry / MARKER)
+
+def _size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+def mark_complete(entry):
+    info = {'created_at': datetime.now(timezone.utc).isoformat(), 'bytes': _size(entry)}
+    (entry / MARKER).write_text(json.dumps(info))
+    return info
+
+@contextmanager
+def _locked(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def link_tree(src, dst):
+    """Copie d'arborescence par liens physiques (copie simple entre systèmes de fichiers)"""
+    shutil.copytree(src, dst, symlinks=True, copy_function=_link_or_copy)
+
+def _run(cmd, **kwargs):
+    log(f"   $ {' '.join(map(str, cmd))}")
+    return subprocess.run(cmd, stdout=sys.stderr, stderr=sys.stderr, **kwargs).returncode == 0
+
+def build_venv(entry, root='.'):
+    python = entry / 'bin' / 'python'
+    if not _run([sys.executable, '-m', 'venv', str(entry)]):
+        return False
+    _run([python, '-m', 'pip', 'install', '--upgrade', 'pip'])
+    if (Path(root) / 'requirements.txt').exists():
+        install = [python, '-m', 'pip', 'install', '-r', str(Path(root) / 'requirements.txt')]
+    else:
+        install = [python, '-m', 'pip', 'install', '-e', str(Path(root).resolve())]
+    return _run(install) and _run([python, '-m', 'pip', 'install', *TEST_PACKAGES])
+
+def build_node(entry, root='.'):
+    root = Path(root)
+    installed = (root / 'package-lock.json').exists() and _run(['npm', 'ci'], cwd=root)
+    if not installed and not _run(['npm', 'install'], cwd=root):
+        return False
+    if not (root / 'node_modules').is_dir():
+        return False
+    link_tree(root / 'node_modules', entry / 'node_modules')
+    (root / 'node_modules' / NODE_MODULES_KEY).write_text(entry.name)
+    return True
+
+def build_browsers(entry, root='.'):
+    entry.mkdir(parents=True, exist_ok=True)
+    env = {**os.environ, 'PLAYWRIGHT_BROWSERS_PATH': str(entry)}
+    return _run(['npx', 'playwright', 'install', '--with-deps'], cwd=root, env=env) and browsers_complete(entry)
+
+def _subdirs(entry):
+    return [p for p in entry.iterdir() if p.is_dir() and not p.name.startswith('.')]
+
+def browsers_complete(entry):
+    """Chaque navigateur téléchargé porte le marqueur de Playwright (téléchargement interrompu sinon)"""
+    browsers = _subdirs(entry)
+    return bool(browsers) and all((browser / PLAYWRIGHT_MARKER).exists() for browser in browsers)
+
+BUILDERS = {'venv': build_venv, 'node': build_node, 'browsers': build_browsers}
+KEYS = {'venv': venv_key, 'node': node_key, 'browsers': browsers_key}
+# Validation d'une entrée installée par l'appelant (commit)
+VALIDATORS = {'browsers': browsers_complete}
+
+def restore_node_modules(entry, root='.'):
+    """node_modules du cache dans le workspace, sauf s'il en provient déjà"""
+    target = Path(root) / 'node_modules'
+    if (_read(target / NODE_MODULES_KEY) or b'').decode() == entry.name:
+        return
+    if target.is_symlink() or target.is_file():
+        target.unlink()
+    elif target.exists():
+        shutil.rmtree(target)
+    link_tree(entry / 'node_modules', target)
+    (target / NODE_MODULES_KEY).write_text(entry.name)
+
+def ensure(component, root='.', cache_dir=None, defer=False):
+    """
+    Entrée du composant : réutilisée si complète, sinon construite sous verrou
+    (ou laissée à construire par l'appelant si defer). Retourne (statut, entrée)
+    """
+    key = KEYS[component](root)
+    if key is None:
+        return 'off', None
+    entry = entry_dir(component, key, cache_dir)
+    if is_complete(entry):
+        touch(entry)
+        return 'hit', entry
+    if defer:
+        entry.mkdir(parents=True, exist_ok=True)
+        return 'pending', entry
+
+    with _locked(entry.with_name(f'{key}.lock')):
+        if is_complete(entry):  # construite par un run concurrent pendant l'attente
+            touch(entry)
+            return 'hit', entry
+        if entry.exists():
+            shutil.rmtree(entry)
+        log(f"📦 Construction du cache {component} ({key})...")
+        started = time.monotonic()
+        try:
+            ok = BUILDERS[component](entry, root)
+        except OSError as e:
+            log(f"⚠️  {e}")
+            ok = False
+        if not ok:
+            shutil.rmtree(entry, ignore_errors=True)
+            log(f"⚠️  Cache {component} non construit")
+            return 'failed', None
+        info = mark_complete(entry)
+        log(f"✅ Cache {component} construit en {time.monotonic() - started:.0f}s "
+            f"({info['bytes'] / 1e6:.0f} Mo)")
+    return 'built', entry
+
+def commit(component, root='.', cache_dir=None):
+    """Valide une entrée construite par l'appelant (navigateurs installés pendant les tests)"""
+    key = KEYS[component](root)
+    if key is None:
+        return False
+    entry = entry_dir(component, key, cache_dir)
+    if is_complete(entry):
+        return True
+    if not entry.is_dir() or not _subdirs(entry):
+        log(f"⚠️  Cache {component} vide, non validé")
+        return False
+    validate = VALIDATORS.get(component)
+    if validate is not None and not validate(entry):
+        log(f"⚠️  Cache {component} incomplet (installation interrompue ?), non validé")
+        return False
+    info = mark_complete(entry)
+    log(f"✅ Cache {component} enregistré ({info['bytes'] / 1e6:.0f} Mo)")
+    return True
+
+def list_entries(cache_dir=None):
+    """Entrées du cache : composant, clé, taille, dernière utilisation, état"""
+    entries = []
+    for component in COMPONENTS:
+        base = Path(cache_dir or CACHE_DIR) / component
+        if not base.is_dir():
+            continue
+        for entry in base.iterdir():
+            if not entry.is_dir():
+                continue
+            marker = entry / MARKER
+            if marker.exists():
+                try:
+                    size = json.loads(marker.read_text())['bytes']
+                except (ValueError, KeyError):
+                    size = _size(entry)
+                entries.append({'component': component, 'key': entry.name, 'path': entry,
+                                'bytes': size, 'last_used': marker.stat().st_mtime, 'complete': True})
+            else:
+                entries.append({'component': component, 'key': entry.name, 'path': entry,
+                                'bytes': None, 'last_used': entry.stat().st_mtime, 'complete': False})
+    return entries
+
+def evict(budget_bytes, cache_dir=None, now=None, grace=EVICT_GRACE_SECONDS):
+    """
+    Supprime les entrées les moins récemment utilisées jusqu'à tenir dans le
+    budget (sauf celles utilisées depuis moins de grace secondes), ainsi que les
+    builds interrompus. Retourne les entrées supprimées
+    """
+    now = now or time.time()
+    removed = []
+    with _locked(Path(cache_dir or CACHE_DIR) / '.evict.lock'):
+        entries = list_entries(cache_dir)
+        for entry in entries:
+            if not entry['complete'] and now - entry['last_used'] > STALE_BUILD_SECONDS:
+                shutil.rmtree(entry['path'], ignore_errors=True)
+                removed.append(entry)
+        complete = sorted((e for e in entries if e['complete']), key=lambda e: e['last_used'])
+        total = sum(e['bytes'] for e in complete)
+        for entry in complete:
+            if total <= budget_bytes:
+                break
+            if now - entry['last_used'] < grace:
+                continue
+            shutil.rmtree(entry['path'], ignore_errors=True)
+            total -= entry['bytes']
+            removed.append(entry)
+    for entry in removed:
+        log(f"🧹 Cache {entry['component']} {entry['key']} supprimé")
+    return removed
+
+def exports(statuses):
+    """Variables d'environnement à exporter pour utiliser les entrées disponibles"""
+    variables, paths = {}, []
+    for component, (status, entry) in statuses.items():
+        variables[f'ENV_CACHE_{component.upper()}'] = status
+        if entry is None:
+            continue
+        if component == 'venv' and status in ('hit', 'built'):
+            variables['VIRTUAL_ENV'] = str(entry)
+            paths.append(str(entry / 'bin'))
+        elif component == 'browsers':
+            variables['PLAYWRIGHT_BROWSERS_PATH'] = str(entry)
+    return variables, paths
+
+def cmd_setup(args):
+    components = [c for c in args.components.split(',') if c]
+    statuses = {}
+    for component in COMPONENTS:
+        if component not in components:
+            continue
+        status, entry = ensure(component, args.root, defer=component in args.defer)
+        if component == 'node' and entry is not None:
+            restore_node_modules(entry, args.root)
+        statuses[component] = (status, entry)
+        log(f"💾 Cache {component}: {status}")
+    evict(args.budget_gb * 1e9)
+
+    variables, paths = exports(statuses)
+    for name, value in variables.items():
+        print(f'export {name}={shlex.quote(value)}')
+    if paths:
+        print(f'export PATH={shlex.quote(os.pathsep.join(paths))}:"$PATH"')
+    if args.github:
+        # Étapes suivantes du job
+        with open(os.environ['GITHUB_ENV'], 'a') as f:
+            f.writelines(f'{name}={value}\n' for name, value in variables.items())
+        with open(os.environ['GITHUB_PATH'], 'a') as f:
+            f.writelines(f'{path}\n' for path in paths)
+    return 0
+
+def cmd_commit(args):
+    return 0 if commit(args.component, args.root) else 1
+
+def cmd_status(args):
+    entries = list_entries()
+    total = sum(e['bytes'] or 0 for e in entries)
+    print(f"📦 {CACHE_DIR} : {total / 1e9:.2f} Go / {args.budget_gb:g} Go")
+    for entry in sorted(entries, key=lambda e: e['last_used'], reverse=True):
+        used = datetime.fromtimestamp(entry['last_used']).strftime('%Y-%m-%d %H:%M')
+        size = f"{entry['bytes'] / 1e6:.0f} Mo" if entry['complete'] else 'incomplet'
+        print(f"   {entry['component']:<9} {entry['key']}  {size:>10}  {used}")
+    return 0
+
+def cmd_evict(args):
+    removed = evict(args.budget_gb * 1e9)
+    print(f"🧹 {len(removed)} entrées supprimées")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache local des dépendances de test (venv, node_modules, navigateurs)")
+    parser.add_argument('--root', default='.', help="Projet dont les dépendances sont mises en cache (défaut: .)")
+    parser.add_argument('--budget-gb', type=float, default=BUDGET_GB,
+                        help=f"Budget disque du cache en Go (défaut: {BUDGET_GB:g})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    setup = subparsers.add_parser('setup', help="Réutilise ou construit les environnements, affiche les exports")
+    setup.add_argument('--components', default=','.join(COMPONENTS),
+                       help=f"Composants, séparés par des virgules (défaut: {','.join(COMPONENTS)})")
+    setup.add_argument('--defer', action='append', default=[], choices=COMPONENTS,
+                       help="Composant installé plus tard par l'appelant puis validé par 'commit'")
+    setup.add_argument('--github', action='store_true', help="Exporte aussi vers GITHUB_ENV / GITHUB_PATH")
+    setup.set_defaults(handler=cmd_setup)
+
+    commit_parser = subparsers.add_parser('commit', help="Valide une entrée installée par l'appelant")
+    commit_parser.add_argument('component', choices=COMPONENTS)
+    commit_parser.set_defaults(handler=cmd_commit)
+
+    subparsers.add_parser('status', help="Liste les entrées du cache").set_defaults(handler=cmd_status)
+    subparsers.add_parser('evict', help="Applique le budget disque").set_defaults(handler=cmd_evict)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+if __name__ == '__main__':
+    main()
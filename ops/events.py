@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Émetteur d'événements de statut (status_events) hors du chemin critique :
+les événements sont mis en file en mémoire et dans un fichier spool local,
+envoyés par lots en arrière-plan, et vidés à la sortie du processus. Un
+événement non livré reste dans le spool et sera renvoyé au prochain démarrage.
+"""
+
+import os
+import json
+import atexit
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+SPOOL_FILE = Path(os.getenv('EVENTS_SPOOL_FILE', 'artifacts/.events_spool.jsonl'))
+FLUSH_INTERVAL = float(os.getenv('EVENTS_FLUSH_INTERVAL', '1.0'))
+BATCH_SIZE = int(os.getenv('EVENTS_BATCH_SIZE', '100'))
+# Temps laissé au dernier envoi à la sortie du processus
+CLOSE_TIMEOUT = float(os.getenv('EVENTS_CLOSE_TIMEOUT', '10'))
+
+def make_event(run_id, phase, message):
+    """Événement horodaté côté client (l'ordre et la partition ne dépendent pas de l'envoi)"""
+    return {
+        'run_id': run_id,
+        'phase': phase,
+        'message': message,
+        'ts': datetime.now(timezone.utc).isoformat()
+    }
+
+class EventEmitter:
+    """File d'événements persistée, envoyée par lots par un thread de fond"""
+
+    def __init__(self, supabase, spool_path=SPOOL_FILE, flush_interval=FLUSH_INTERVAL,
+                 batch_size=BATCH_SIZE):
+        self.supabase = supabase
+        self.spool_path = Path(spool_path)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.sent = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        # Événements restés dans le spool d'un processus précédent
+        self._pending = self._read_spool()
+        self._thread = threading.Thread(target=self._run, name='events', daemon=True)
+        self._thread.start()
+
+    def _read_spool(self):
+        events = []
+        try:
+            with open(self.spool_path, 'r') as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        continue  # ligne tronquée par un arrêt brutal
+        except OSError:
+            pass
+        return events
+
+    def _rewrite_spool(self):
+        """Réécrit le spool avec les événements encore en attente (verrou tenu)"""
+        if not self._pending:
+            try:
+                self.spool_path.unlink()
+            except OSError:
+                pass
+            return
+        tmp = self.spool_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            for event in self._pending:
+                f.write(json.dumps(event, separators=(',', ':'), ensure_ascii=False) + '\n')
+        os.replace(tmp, self.spool_path)
+
+    def emit(self, run_id, phase, message):
+        """Met l'événement en file ; ne fait aucun appel réseau"""
+        event = make_event(run_id, phase, message)
+        with self._lock:
+            self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spool_path, 'a') as f:
+                f.write(json.dumps(event, separators=(',', ':'), ensure_ascii=False) + '\n')
+            self._pending.append(event)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        return event
+
+    def flush(self):
+        """Envoie les événements en attente par lots ; retourne False si un envoi échoue"""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.batch_size]
+                if not batch:
+                    return True
+                try:
+                    self.supabase.table('status_events').insert(batch).execute()
+                except Exception as e:
+                    print(f"⚠️  Envoi de {len(batch)} événements de statut reporté: {e}")
+                    return False
+                with self._lock:
+                    # emit() n'ajoute qu'en fin de liste : le lot envoyé est toujours en tête
+                    del self._pending[:len(batch)]
+                    self._rewrite_spool()
+                self.sent += len(batch)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """Arrête le thread de fond et livre les derniers événements"""
+        if self._closed:
+            return self.pending() == 0
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout)
+        delivered = self.flush()
+        if not delivered:
+            print(f"⚠️  {self.pending()} événements conservés dans {self.spool_path} (renvoyés au prochain run)")
+        return delivered
+
+_emitters = {}
+_emitters_lock = threading.Lock()
+
+def get_emitter(supabase: 'Client'):
+    """Émetteur du processus pour ce client, vidé automatiquement à la sortie"""
+    with _emitters_lock:
+        emitter = _emitters.get(id(supabase))
+        if emitter is None:
+            emitter = EventEmitter(supabase)
+            _emitters[id(supabase)] = emitter
+            atexit.register(emitter.close)
+        return emitter
+
+def emit(supabase: 'Client', run_id, phase, message):
+    """Enregistre un événement de statut sans bloquer le pipeline"""
+    return get_emitter(supabase).emit(run_id, phase, message)
+
+def close_all():
+    """Vide tous les émetteurs du processus (appelé aussi par atexit)"""
+    with _emitters_lock:
+        emitters = list(_emitters.values())
+    return all([emitter.close() for emitter in emitters])
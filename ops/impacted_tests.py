@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Sélection des tests impactés par le diff d'un sprint : une carte fichier source ->
+tests qui l'exécutent est construite à partir des contextes de coverage lors d'un
+run complet (pytest --cov-context=test), stockée par repo dans Supabase B et en
+artefact, puis croisée avec le diff git de la branche de feature.
+
+Un run complet est forcé si la carte manque ou est périmée (âge, nombre de
+commits), sur déclenchement planifié, si la configuration des tests change,
+si un fichier modifié est absent de la carte ou si la DoD fixe coverage_min.
+
+    python ops/impacted_tests.py select --base origin/main   # affiche full|impacted|none
+    python ops/impacted_tests.py build --coverage-file .coverage --publish
+"""
+
+import os
+import sys
+import json
+import fnmatch
+import argparse
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+MAP_FILE = Path('artifacts/test_impact_map.json')
+SELECTION_FILE = Path('artifacts/test_impact.json')
+TESTS_FILE = Path('artifacts/test_impact_tests.txt')
+
+# Au-delà, la carte est jugée périmée et un run complet la reconstruit
+MAX_AGE_DAYS = float(os.getenv('TEST_IMPACT_MAX_AGE_DAYS', '7'))
+MAX_COMMITS = int(os.getenv('TEST_IMPACT_MAX_COMMITS', '200'))
+
+# Fichiers dont la modification peut changer n'importe quel test : run complet
+FULL_RUN_PATTERNS = [
+    'conftest.py', '*/conftest.py', 'requirements*.txt', 'pyproject.toml', 'setup.py',
+    'setup.cfg', 'pytest.ini', 'tox.ini', '.coveragerc', 'tests/*', 'ops/impacted_tests.py',
+]
+# Fichiers sans effet sur les tests Python
+IGNORED_PATTERNS = ['*.md', 'docs/*', 'artifacts/*', 'logs/*', 'e2e/*', '.github/*']
+
+def log(message):
+    # stdout est réservé au mode sélectionné (lu par qwen_run_tests.sh)
+    print(message, file=sys.stderr)
+
+def _git(*args):
+    result = subprocess.run(['git', *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+def _matches(path, patterns):
+    return any(fnmatch.fnmatch(path, pattern) for pattern in patterns)
+
+def is_test_file(path):
+    name = Path(path).name
+    return path.endswith('.py') and (name.startswith('test_') or name.endswith('_test.py'))
+
+def context_test_id(context):
+    """Contexte coverage 'tests/test_x.py::test_a|run' -> identifiant pytest"""
+    return context.rsplit('|', 1)[0] if context else None
+
+def build_map(coverage_file='.coverage', root='.'):
+    """Carte fichier source -> tests, à partir d'un fichier .coverage avec contextes"""
+    from coverage import CoverageData
+
+    data = CoverageData(basename=coverage_file)
+    data.read()
+    root = Path(root).resolve()
+    files, import_only, all_tests = {}, [], set()
+    for measured in data.measured_files():
+        try:
+            rel = Path(measured).resolve().relative_to(root).as_posix()
+        except ValueError:
+            continue  # fichier hors du dépôt (site-packages...)
+        tests = set()
+        for contexts in (data.contexts_by_lineno(measured) or {}).values():
+            tests.update(filter(None, (context_test_id(c) for c in contexts)))
+        if tests:
+            files[rel] = sorted(tests)
+            all_tests.update(tests)
+        else:
+            # Exécuté seulement à l'import (collecte pytest) : aucun test attribuable
+            import_only.append(rel)
+    if not all_tests:
+        raise ValueError("Aucun contexte de test dans les données coverage (pytest --cov-context=test ?)")
+    return {
+        'version': 1,
+        'commit': _git('rev-parse', 'HEAD'),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'files': files,
+        'import_only': sorted(import_only),
+        'tests': sorted(all_tests),
+    }
+
+def changed_files(base):
+    """Fichiers modifiés depuis le point de divergence avec base (commités, en cours, nouveaux)"""
+    merge_base = _git('merge-base', base, 'HEAD')
+    if merge_base is None:
+        return None
+    diff = _git('diff', '--name-only', merge_base)
+    untracked = _git('ls-files', '--others', '--exclude-standard')
+    if diff is None or untracked is None:
+        return None
+    return sorted({path for path in (diff + '\n' + untracked).splitlines() if path})
+
+def commits_since(commit):
+    """Nombre de commits entre la carte et HEAD (None si le commit est inconnu)"""
+    if not commit:
+        return None
+    count = _git('rev-list', '--count', f'{commit}..HEAD')
+    return int(count) if count is not None and count.isdigit() else None
+
+def select_tests(impact_map, changed, commits_since_map=None, force_full=None, now=None, dod=None):
+    """
+    Décision de sélection : mode full (run complet), impacted (tests listés)
+    ou none (aucun test Python concerné), avec la raison et les tests retenus
+    """
+    decision = {'mode': 'full', 'reason': None, 'tests': [], 'changed': changed or [],
+                'baseline_coverage': (impact_map or {}).get('coverage')}
+    if force_full:
+        decision['reason'] = force_full
+        return decision
+    if (dod or {}).get('coverage_min') is not None:
+        # La coverage d'un sous-ensemble n'est pas comparable au seuil, et celle du
+        # dernier run complet ignorerait le code ajouté par le sprint
+        decision['reason'] = 'critère DoD coverage_min'
+        return decision
+    if impact_map is None:
+        decision['reason'] = 'carte absente'
+        return decision
+    if changed is None:
+        decision['reason'] = 'diff git indisponible'
+        return decision
+
+    now = now or datetime.now(timezone.utc)
+    age_days = (now - datetime.fromisoformat(impact_map['created_at'])).total_seconds() / 86400
+    if age_days > MAX_AGE_DAYS:
+        decision['reason'] = f'carte de {age_days:.1f} jours (max {MAX_AGE_DAYS:g})'
+        return decision
+    if commits_since_map is None or commits_since_map > MAX_COMMITS:
+        decision['reason'] = f'carte périmée ({commits_since_map if commits_since_map is not None else "?"} commits)'
+        return decision
+
+    files = impact_map['files']
+    known_tests = impact_map['tests']
+    selected, unmapped = set(), []
+    for path in changed:
+        if is_test_file(path):
+            matching = [t for t in known_tests if t.split('::', 1)[0] == path]
+            if matching:
+                selected.update(matching)
+            elif Path(path).exists():
+                selected.add(path)  # nouveau fichier de test
+            continue
+        if _matches(path, FULL_RUN_PATTERNS):
+            decision['reason'] = f'{path} modifié'
+            return decision
+        if _matches(path, IGNORED_PATTERNS):
+            continue
+        if path in files:
+            selected.update(files[path])
+        elif path in impact_map.get('import_only', ()):
+            decision['reason'] = f'{path} modifié (code exécuté à l\'import)'
+            return decision
+        else:
+            # Module jamais exécuté, ou fichier non Python (template, fixture, SQL...)
+            # dont aucun test connu ne dépend dans la carte
+            unmapped.append(path)
+
+    decision['unmapped'] = unmapped
+    if unmapped:
+        # Aucune sélection ne garantit que ces fichiers soient exercés par les tests
+        decision['reason'] = f'{len(unmapped)} fichiers hors carte ({unmapped[0]})'
+        return decision
+    decision['mode'] = 'impacted' if selected else 'none'
+    decision['reason'] = f'{len(changed)} fichiers modifiés'
+    decision['tests'] = sorted(selected)
+    return decision
+
+def fetch_map(supabase: 'Client', repo):
+    result = supabase.table('test_impact_maps').select('map_json').eq('repo', repo).limit(1).execute()
+    return result.data[0]['map_json'] if result.data else None
+
+def publish_map(supabase: 'Client', repo, impact_map):
+    supabase.table('test_impact_maps').upsert({
+        'repo': repo,
+        'commit_sha': impact_map.get('commit'),
+        'map_json': impact_map,
+        'updated_at': impact_map['created_at'],
+    }, on_conflict='repo').execute()
+
+def _coverage_rate(path='artifacts/coverage.xml'):
+    """line-rate du rapport coverage XML du run complet (None si absent)"""
+    try:
+        import xml.etree.ElementTree as ET
+        return float(ET.parse(path).getroot().attrib['line-rate'])
+    except (OSError, KeyError, ValueError, SyntaxError):
+        return None
+
+def _supabase():
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
+    if not supabase_url or not supabase_key:
+        return None
+    from ops_client import get_client
+    return get_client(supabase_url, supabase_key)
+
+def _repo():
+    return os.getenv('TARGET_REPO') or os.getenv('GITHUB_REPOSITORY') or Path.cwd().name
+
+def cmd_build(args):
+    try:
+        impact_map = build_map(args.coverage_file)
+    except Exception as e:
+        log(f"❌ Carte d'impact non construite: {e}")
+        return 1
+    impact_map['coverage'] = _coverage_rate()
+    MAP_FILE.parent.mkdir(parents=True, exist_ok=True)
+    MAP_FILE.write_text(json.dumps(impact_map, separators=(',', ':')))
+    log(f"🗺️  Carte d'impact: {len(impact_map['files'])} fichiers, {len(impact_map['tests'])} tests")
+
+    supabase = _supabase() if args.publish else None
+    if supabase is not None:
+        try:
+            publish_map(supabase, _repo(), impact_map)
+            log(f"☁️  Carte publiée pour {_repo()}")
+        except Exception as e:
+            log(f"⚠️  Publication de la carte impossible: {e}")
+    return 0
+
+def _load_map(args):
+    supabase = _supabase() if args.fetch else None
+    if supabase is not None:
+        try:
+            impact_map = fetch_map(supabase, _repo())
+            if impact_map:
+                return impact_map
+        except Exception as e:
+            log(f"⚠️  Lecture de la carte dans Supabase impossible: {e}")
+    try:
+        return json.loads(MAP_FILE.read_text())
+    except (OSError, ValueError):
+        return None
+
+def cmd_select(args):
+    force_full = None
+    if args.full or os.getenv('TEST_IMPACT') == '0':
+        force_full = 'run complet demandé'
+    elif os.getenv('GITHUB_EVENT_NAME') == 'schedule':
+        force_full = 'déclenchement planifié'
+
+    impact_map = None if force_full else _load_map(args)
+    changed = None if force_full else changed_files(args.base)
+    commits = commits_since(impact_map.get('commit')) if impact_map else None
+    from create_run_record import load_context
+    dod = load_context().get('dod_json')
+    decision = select_tests(impact_map, changed, commits, force_full, dod=dod)
+    decision['base'] = args.base
+
+    SELECTION_FILE.parent.mkdir(parents=True, exist_ok=True)
+    SELECTION_FILE.write_text(json.dumps(decision, indent=2, ensure_ascii=False))
+    TESTS_FILE.write_text(''.join(f'{test}\n' for test in decision['tests']))
+
+    if decision['mode'] == 'full':
+        log(f"🧪 Sélection des tests: run complet ({decision['reason']})")
+    else:
+        log(f"🎯 Sélection des tests: {len(decision['tests'])} tests impactés ({decision['reason']})")
+        if decision.get('unmapped'):
+            log(f"   ℹ️  Fichiers non couverts par la carte: {', '.join(decision['unmapped'])}")
+    print(decision['mode'])
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Sélection des tests impactés par un diff")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Construit la carte d'impact depuis les contextes coverage")
+    build.add_argument('--coverage-file', default='.coverage', help="Données coverage (défaut: .coverage)")
+    build.add_argument('--publish', action='store_true', help="Publie la carte dans Supabase B (table test_impact_maps)")
+    build.set_defaults(handler=cmd_build)
+
+    select = subparsers.add_parser('select', help="Sélectionne les tests impactés (affiche full|impacted|none)")
+    select.add_argument('--base', default='origin/main', help="Référence de comparaison (défaut: origin/main)")
+    select.add_argument('--full', action='store_true', help="Force un run complet")
+    select.add_argument('--fetch', action='store_true', help="Lit la carte du repo dans Supabase B")
+    select.set_defaults(handler=cmd_select)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+if __name__ == '__main__':
+    main()
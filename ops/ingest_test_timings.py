@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Ingestion des résultats par test (nom, suite, durée, statut, tentatives) depuis
+les rapports JUnit XML (pytest) et JSON Playwright vers la table test_results.
+Les rapports sont lus en streaming (iterparse, ijson si installé) et les lignes
+insérées par lots, pour suivre les tests les plus lents et les plus instables.
+
+    python ops/ingest_test_timings.py --junit artifacts/junit.xml \\
+        --playwright artifacts/playwright-results.json
+"""
+
+import os
+import sys
+import json
+import heapq
+import argparse
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+DEFAULT_JUNIT = 'artifacts/junit.xml'
+DEFAULT_PLAYWRIGHT = 'artifacts/playwright-results.json'
+DEFAULT_BATCH_SIZE = int(os.getenv('TEST_RESULTS_BATCH_SIZE', '1000'))
+
+# Statuts JUnit : premier élément enfant significatif d'un <testcase>
+JUNIT_STATUSES = {'failure': 'failed', 'error': 'error', 'skipped': 'skipped'}
+# Relances pytest-rerunfailures
+JUNIT_RERUNS = {'rerunFailure', 'rerunError', 'flakyFailure', 'flakyError'}
+# Verdict final d'un test Playwright (toutes tentatives confondues)
+PLAYWRIGHT_STATUSES = {'expected': 'passed', 'unexpected': 'failed', 'flaky': 'flaky', 'skipped': 'skipped'}
+
+def _local(tag):
+    """Nom de balise sans espace de noms"""
+    return tag.rsplit('}', 1)[-1]
+
+def parse_junit(path):
+    """
+    Parcourt un rapport JUnit XML sans le charger entièrement : un <testcase>
+    est émis puis libéré dès sa balise fermante
+    """
+    context = ET.iterparse(path, events=('start', 'end'))
+    _, root = next(context)
+    # pytest récent : <testsuites><testsuite> ; ancien : <testsuite> racine
+    suites = [root.get('name') or ''] if _local(root.tag) == 'testsuite' else []
+    for event, elem in context:
+        tag = _local(elem.tag)
+        if tag == 'testsuite':
+            if event == 'start':
+                suites.append(elem.get('name') or '')
+            elif elem is not root:
+                suites.pop()
+                root.clear()
+            continue
+        if tag != 'testcase' or event != 'end':
+            continue
+
+        status, retries = 'passed', 0
+        for child in elem:
+            child_tag = _local(child.tag)
+            if child_tag in JUNIT_RERUNS:
+                retries += 1
+            elif child_tag in JUNIT_STATUSES and status == 'passed':
+                status = JUNIT_STATUSES[child_tag]
+        if retries and status == 'passed':
+            status = 'flaky'
+
+        classname = elem.get('classname') or ''
+        yield {
+            'source': 'junit',
+            'suite': classname or (suites[-1] if suites else ''),
+            'name': elem.get('name') or '',
+            'file': elem.get('file'),
+            'status': status,
+            'duration_ms': round(float(elem.get('time') or 0) * 1000),
+            'retries': retries,
+        }
+        elem.clear()
+
+def _iter_playwright_suites(f):
+    """Suites de premier niveau, une à la fois (ijson) ou depuis le document complet"""
+    try:
+        import ijson
+    except ImportError:
+        yield from json.load(f).get('suites', [])
+        return
+    yield from ijson.items(f, 'suites.item', use_float=True)
+
+def _playwright_tests(suite, titles):
+    titles = titles + [suite['title']] if suite.get('title') else titles
+    for spec in suite.get('specs', []):
+        for test in spec.get('tests', []):
+            yield titles, spec, test
+    for child in suite.get('suites', []):
+        yield from _playwright_tests(child, titles)
+
+def parse_playwright(path):
+    """Résultats d'un rapport JSON Playwright (reporter json), un test par projet"""
+    with open(path, 'rb') as f:
+        for top in _iter_playwright_suites(f):
+            for titles, spec, test in _playwright_tests(top, []):
+                results = test.get('results') or []
+                suite = ' › '.join(titles[1:] if len(titles) > 1 else titles)
+                if test.get('projectName'):
+                    suite = f"[{test['projectName']}] {suite}".strip()
+                yield {
+                    'source': 'playwright',
+                    'suite': suite,
+                    'name': spec.get('title') or '',
+                    'file': spec.get('file') or top.get('file'),
+                    'status': PLAYWRIGHT_STATUSES.get(test.get('status'), test.get('status') or 'unknown'),
+                    'duration_ms': round(sum(float(r.get('duration') or 0) for r in results)),
+                    'retries': max([int(r.get('retry') or 0) for r in results] or [0]),
+                }
+
+def iter_test_results(junit_paths=(), playwright_paths=()):
+    """Tous les résultats des rapports présents (les fichiers absents sont ignorés)"""
+    for path in junit_paths:
+        if Path(path).exists():
+            yield from parse_junit(path)
+    for path in playwright_paths:
+        if Path(path).exists():
+            yield from parse_playwright(path)
+
+def ingest(supabase: 'Client', run_id, results, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insère les résultats par lots multi-lignes. Les lignes existantes du run
+    sont d'abord supprimées : une étape relancée ne crée pas de doublons.
+    Retourne des statistiques (lignes, requêtes, tests les plus lents)
+    """
+    supabase.table('test_results').delete().eq('run_id', run_id).execute()
+
+    stats = {'tests': 0, 'requests': 0, 'failed': 0, 'flaky': 0}
+    batch = []
+    slowest = []  # tas des 5 tests les plus lents, sans garder tous les résultats
+
+    def flush():
+        if batch:
+            supabase.table('test_results').insert(batch, returning='minimal').execute()
+            stats['requests'] += 1
+            batch.clear()
+
+    for result in results:
+        batch.append(dict(result, run_id=run_id))
+        stats['tests'] += 1
+        if result['status'] in ('failed', 'error'):
+            stats['failed'] += 1
+        elif result['status'] == 'flaky':
+            stats['flaky'] += 1
+        entry = (result['duration_ms'], stats['tests'], result['suite'], result['name'])
+        if len(slowest) < 5:
+            heapq.heappush(slowest, entry)
+        else:
+            heapq.heappushpop(slowest, entry)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    stats['slowest'] = [
+        {'suite': suite, 'name': name, 'duration_ms': duration}
+        for duration, _, suite, name in sorted(slowest, reverse=True)
+    ]
+    return stats
+
+def add_arguments(parser):
+    """Options de l'ingestion (partagées avec la sous-commande ops.py ingest-tests)"""
+    parser.add_argument('--junit', action='append',
+                        help=f"Rapport JUnit XML (répétable, défaut: {DEFAULT_JUNIT})")
+    parser.add_argument('--playwright', action='append',
+                        help=f"Rapport JSON Playwright (répétable, défaut: {DEFAULT_PLAYWRIGHT})")
+
+def report_paths(args):
+    return args.junit or [DEFAULT_JUNIT], args.playwright or [DEFAULT_PLAYWRIGHT]
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion des durées par test vers Supabase B")
+    add_arguments(parser)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Lignes par insertion groupée (défaut: {DEFAULT_BATCH_SIZE})")
+    args = parser.parse_args()
+
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
+    run_id = os.getenv('RUN_ID')
+    if not supabase_url or not supabase_key or not run_id:
+        print("❌ Variables SUPABASE_URL, SUPABASE_SERVICE_KEY ou RUN_ID manquantes")
+        sys.exit(1)
+
+    from ops_client import get_client
+    supabase = get_client(supabase_url, supabase_key)
+
+    junit, playwright = report_paths(args)
+    try:
+        stats = ingest(supabase, run_id, iter_test_results(junit, playwright), args.batch_size)
+    except Exception as e:
+        print(f"❌ Erreur lors de l'ingestion des résultats de tests: {e}")
+        sys.exit(1)
+
+    print(f"✅ {stats['tests']} résultats de tests enregistrés en {stats['requests']} requêtes "
+          f"({stats['failed']} échecs, {stats['flaky']} instables)")
+    for test in stats['slowest']:
+        print(f"   🐢 {test['duration_ms'] / 1000:.2f}s  {test['suite']} › {test['name']}")
+
+if __name__ == '__main__':
+    main()
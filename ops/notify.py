@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script d'envoi du rapport de fin de run à la fonction Edge notify_report
+"""
+
+import os
+import json
+from summary import SUMMARY_FILE, load_summary
+
+def send_report(supabase_url, supabase_key, summary):
+    """POST du résumé (compact) vers notify_report via la session partagée"""
+    from ops_client import get_http
+
+    response = get_http().post(
+        f"{supabase_url}/functions/v1/notify_report",
+        content=json.dumps(summary, separators=(',', ':')),
+        headers={
+            'Authorization': f'Bearer {supabase_key}',
+            'Content-Type': 'application/json'
+        }
+    )
+    response.raise_for_status()
+    print(f"📧 Rapport envoyé (HTTP {response.status_code})")
+    return True
+
+def main():
+    # Variables d'environnement
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
+
+    if not supabase_url or not supabase_key:
+        print("❌ Variables SUPABASE_URL ou SUPABASE_SERVICE_KEY manquantes")
+        exit(1)
+
+    if not SUMMARY_FILE.exists():
+        print("❌ Fichier artifacts/summary.json non trouvé")
+        exit(1)
+
+    try:
+        send_report(supabase_url, supabase_key, load_summary())
+    except Exception as e:
+        print(f"❌ Erreur lors de l'envoi du rapport: {e}")
+        exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Point d'entrée unique des scripts ops : création du run, upload des artefacts,
+DoD gate et notification dans un seul processus, avec un état partagé en
+mémoire (contexte du run, résumé) et des imports différés pour un démarrage rapide
+
+    python ops/ops.py create-run
+    python ops/ops.py all            # upload + ingest-tests + gate + notify (create-run si aucun run)
+    python ops/ops.py --dry-run all  # sans accès réseau
+"""
+
+import os
+import sys
+import json
+import argparse
+
+class OpsContext:
+    """État partagé entre les sous-commandes d'une même invocation"""
+
+    def __init__(self, args):
+        from create_run_record import load_context
+
+        self.args = args
+        self.dry_run = args.dry_run
+        self.run = load_context()
+        self.run_id = args.run_id or os.getenv('RUN_ID') or self.run.get('run_id')
+        if self.run.get('run_id') != self.run_id:
+            # Contexte sauvegardé d'un autre run : inutilisable
+            self.run = {}
+        self.summary = None
+        self._client = None
+
+    def credentials(self):
+        supabase_url = os.getenv('SUPABASE_URL')
+        supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
+        if not supabase_url or not supabase_key:
+            print("❌ Variables SUPABASE_URL ou SUPABASE_SERVICE_KEY manquantes")
+            sys.exit(1)
+        return supabase_url, supabase_key
+
+    def client(self):
+        """Client Supabase construit à la première utilisation (import différé du SDK)"""
+        if self._client is None:
+            from ops_client import get_client
+            self._client = get_client(*self.credentials())
+        return self._client
+
+    def require_run_id(self):
+        if not self.run_id:
+            print("❌ RUN_ID manquant (--run-id, variable RUN_ID ou artifacts/run_context.json)")
+            sys.exit(1)
+        return self.run_id
+
+    def load_summary(self):
+        if self.summary is None:
+            from summary import load_summary
+            self.summary = load_summary()
+        return self.summary
+
+def cmd_create_run(ctx):
+    spec_id = ctx.args.spec_id or os.getenv('SPEC_ID')
+    sprint_id = ctx.args.sprint_id or os.getenv('SPRINT_ID')
+    github_run_id = os.getenv('GITHUB_RUN_ID')
+    if ctx.dry_run:
+        print(f"🧪 [dry-run] Création d'un run (spec: {spec_id or 'dernière spec'}, CI: {github_run_id or 'uuid'})")
+        return 0
+
+    from create_run_record import create_run, write_context
+    try:
+        ctx.run = create_run(ctx.client(), spec_id, github_run_id, sprint_id)
+    except Exception as e:
+        print(f"❌ Erreur lors de la création du run: {e}")
+        return 1
+    write_context(ctx.run)
+    ctx.run_id = ctx.run['run_id']
+    return 0
+
+def cmd_upload(ctx):
+    if ctx.dry_run:
+        from artifact_index import plan_uploads
+        from upload_artifacts import parse_packs
+        entries = plan_uploads('artifacts', ctx.run_id or '<run_id>', parse_packs(ctx.args.pack))
+        for entry in entries:
+            print(f"  📤 [dry-run] {entry['rel_path']} ({entry['kind']}, {entry['size']} octets)")
+        print(f"🧪 [dry-run] {len(entries)} uploads prévus")
+        return 0
+
+    from upload_artifacts import upload_artifacts
+    summary = upload_artifacts(ctx.client(), ctx.require_run_id(), ctx.args)
+    if summary is not None:
+        ctx.summary = summary
+        # Métadonnées perdues malgré les nouvelles tentatives : étape en échec
+        if summary['upload_stats']['failed_rows']:
+            return 1
+    return 0
+
+def cmd_ingest_tests(ctx):
+    from ingest_test_timings import iter_test_results, report_paths
+    junit, playwright = report_paths(ctx.args)
+    if ctx.dry_run:
+        count = sum(1 for _ in iter_test_results(junit, playwright))
+        print(f"🧪 [dry-run] {count} résultats de tests à enregistrer")
+        return 0
+
+    from ingest_test_timings import ingest
+    try:
+        stats = ingest(ctx.client(), ctx.require_run_id(), iter_test_results(junit, playwright))
+    except Exception as e:
+        print(f"❌ Erreur lors de l'ingestion des résultats de tests: {e}")
+        return 1
+    print(f"✅ {stats['tests']} résultats de tests enregistrés ({stats['failed']} échecs, {stats['flaky']} instables)")
+    return 0
+
+def cmd_gate(ctx):
+    from summary import SUMMARY_FILE
+    if ctx.summary is None and not SUMMARY_FILE.exists():
+        print("❌ Fichier artifacts/summary.json non trouvé")
+        return 1
+    summary = ctx.load_summary()
+
+    # Sprint connu en mémoire (create-run) : pas besoin de relire le run
+    sprint = None
+    if ctx.run.get('dod_json') is not None:
+        sprint = {
+            'id': ctx.run['sprint_id'],
+            'spec_id': ctx.run.get('spec_id'),
+            'label': ctx.run.get('sprint_label', ''),
+            'dod_json': ctx.run['dod_json']
+        }
+
+    if ctx.dry_run:
+        from dod_gate import evaluate_dod
+        dod = json.loads(ctx.args.dod) if ctx.args.dod else (sprint or {}).get('dod_json', {})
+        evaluation = evaluate_dod(dict(summary), dod)
+        print(f"🧪 [dry-run] DoD: {evaluation['score']}/{evaluation['total_criteria']}")
+        for detail in evaluation['details']:
+            print(f"   {detail}")
+        return 0 if evaluation['passed'] else 1
+
+    from dod_gate import run_gate
+    return 0 if run_gate(ctx.client(), ctx.require_run_id(), summary, sprint) else 1
+
+def cmd_notify(ctx):
+    from summary import SUMMARY_FILE
+    if ctx.summary is None and not SUMMARY_FILE.exists():
+        print("❌ Fichier artifacts/summary.json non trouvé")
+        return 1
+    summary = ctx.load_summary()
+
+    if ctx.dry_run:
+        payload = json.dumps(summary, separators=(',', ':'))
+        print(f"🧪 [dry-run] Rapport notify_report: {len(payload)} octets")
+        return 0
+
+    from notify import send_report
+    try:
+        send_report(*ctx.credentials(), summary)
+    except Exception as e:
+        print(f"❌ Erreur lors de l'envoi du rapport: {e}")
+        return 1
+    return 0
+
+def cmd_maintain_events(ctx):
+    keep_months = ctx.args.keep_months
+    if ctx.dry_run:
+        print(f"🧪 [dry-run] Maintenance status_events (rétention: {keep_months} mois)")
+        return 0
+
+    try:
+        result = ctx.client().rpc('maintain_status_events', {
+            'p_keep_months': keep_months,
+            'p_months_ahead': ctx.args.months_ahead
+        }).execute()
+    except Exception as e:
+        print(f"❌ Erreur lors de la maintenance des partitions: {e}")
+        return 1
+    counts = result.data or {}
+    print(f"🗂️  Partitions status_events: {counts.get('created', 0)} créées, "
+          f"{counts.get('dropped', 0)} supprimées (rétention: {keep_months} mois)")
+    return 0
+
+def cmd_overview(ctx):
+    if ctx.dry_run:
+        refresh = ' après rafraîchissement' if ctx.args.refresh else ''
+        print(f"🧪 [dry-run] Lecture de run_overview{refresh} (limite: {ctx.args.limit})")
+        return 0
+
+    from run_overview import fetch_overview, format_overview, refresh_overview
+    if ctx.args.refresh:
+        refresh_overview(ctx.client())
+    try:
+        rows = fetch_overview(ctx.client(), ctx.args.limit, ctx.args.repo)
+    except Exception as e:
+        print(f"❌ Erreur lors de la lecture de run_overview: {e}")
+        return 1
+    print('\n'.join(format_overview(rows)))
+    return 0
+
+def cmd_all(ctx):
+    if not ctx.run_id:
+        code = cmd_create_run(ctx)
+        if code:
+            return code
+    try:
+        # Métadonnées d'artefacts incomplètes : la DoD gate est évaluée, mais l'étape échoue
+        upload_code = cmd_upload(ctx)
+        # Télémétrie des tests : un échec n'empêche pas la DoD gate
+        cmd_ingest_tests(ctx)
+        return cmd_gate(ctx) or upload_code
+    finally:
+        # Le rapport part toujours, même si l'upload ou la DoD échoue
+        cmd_notify(ctx)
+
+COMMANDS = {
+    'create-run': (cmd_create_run, "Crée le run (spec, sprint, run, événement PLANNING)"),
+    'upload': (cmd_upload, "Upload les artefacts et enregistre leurs métadonnées"),
+    'ingest-tests': (cmd_ingest_tests, "Enregistre durées et statuts par test (JUnit, Playwright)"),
+    'gate': (cmd_gate, "Évalue la Definition of Done et met à jour le run"),
+    'notify': (cmd_notify, "Envoie le rapport à notify_report"),
+    'maintain-events': (cmd_maintain_events, "Crée les partitions mensuelles de status_events et applique la rétention"),
+    'overview': (cmd_overview, "Affiche les derniers runs depuis la vue run_overview"),
+    'all': (cmd_all, "upload + ingest-tests + gate + notify (et create-run si aucun run n'est connu)"),
+}
+
+def build_parser():
+    from upload_artifacts import add_arguments as add_upload_arguments
+    from ingest_test_timings import add_arguments as add_ingest_arguments
+
+    parser = argparse.ArgumentParser(description="Commandes ops du Sprint Runner")
+    parser.add_argument('--run-id', help="Run cible (défaut: RUN_ID ou artifacts/run_context.json)")
+    parser.add_argument('--dry-run', action='store_true', help="N'effectue aucun appel réseau")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, (handler, help_text) in COMMANDS.items():
+        sub = subparsers.add_parser(name, help=help_text, description=help_text)
+        sub.set_defaults(handler=handler)
+        if name in ('create-run', 'all'):
+            sub.add_argument('--spec-id', help="Spec à utiliser (défaut: SPEC_ID ou dernière spec)")
+            sub.add_argument('--sprint-id',
+                             help="Sprint attribué par le scheduler (défaut: SPRINT_ID ou premier sprint de la spec)")
+        if name in ('upload', 'all'):
+            add_upload_arguments(sub)
+        if name in ('ingest-tests', 'all'):
+            add_ingest_arguments(sub)
+        if name in ('gate', 'all'):
+            sub.add_argument('--dod', help="Critères DoD JSON pour --dry-run (défaut: sprint du contexte)")
+        if name == 'overview':
+            sub.add_argument('--limit', type=int, default=20, help="Nombre de runs affichés (défaut: 20)")
+            sub.add_argument('--repo', help="Filtre sur le dépôt (org/repo)")
+            sub.add_argument('--refresh', action='store_true',
+                             help="Rafraîchit la vue avant la lecture (sinon pg_cron toutes les 5 min)")
+        if name == 'maintain-events':
+            sub.add_argument('--keep-months', type=int,
+                             default=int(os.getenv('STATUS_EVENTS_KEEP_MONTHS', '12')),
+                             help="Mois d'événements conservés (défaut: STATUS_EVENTS_KEEP_MONTHS ou 12)")
+            sub.add_argument('--months-ahead', type=int, default=3,
+                             help="Partitions mensuelles créées à l'avance (défaut: 3)")
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    sys.exit(args.handler(OpsContext(args)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Client Supabase partagé par les scripts ops : une seule session HTTP keep-alive
+(HTTP/2 si disponible), pool de connexions dimensionné, timeouts, et nouvelles
+tentatives avec backoff sur 429/5xx
+"""
+
+import os
+import time
+import random
+import functools
+import email.utils
+import httpx
+
+# Réglages du pool (surchargeables par variables d'environnement)
+POOL_SIZE = int(os.getenv('OPS_HTTP_POOL', '20'))
+TIMEOUT = float(os.getenv('OPS_HTTP_TIMEOUT', '30'))
+CONNECT_TIMEOUT = float(os.getenv('OPS_HTTP_CONNECT_TIMEOUT', '10'))
+MAX_RETRIES = int(os.getenv('OPS_HTTP_RETRIES', '4'))
+BACKOFF_BASE = float(os.getenv('OPS_HTTP_BACKOFF', '0.5'))
+HTTP2_ENABLED = os.getenv('OPS_HTTP2', '1') != '0'
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+def http2_available():
+    """HTTP/2 nécessite le paquet h2 (extra httpx[http2])"""
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _retry_after(response, attempt):
+    """Délai avant nouvel essai : en-tête Retry-After, sinon backoff exponentiel avec jitter"""
+    header = response.headers.get('Retry-After') if response is not None else None
+    if header:
+        try:
+            return min(float(header), 60.0)
+        except ValueError:
+            try:
+                parsed = email.utils.parsedate_to_datetime(header)
+                return max(0.0, min(parsed.timestamp() - time.time(), 60.0))
+            except (TypeError, ValueError):
+                pass
+    return BACKOFF_BASE * (2 ** attempt) * (0.5 + random.random())
+
+class RetryTransport(httpx.HTTPTransport):
+    """
+    Transport httpx qui réessaie les réponses 429/5xx. Les requêtes non
+    idempotentes (POST, PATCH) ne sont réessayées que sur 429, où le serveur
+    n'a pas traité la requête ; les corps streamés ne sont jamais rejoués.
+    """
+
+    def __init__(self, max_retries=MAX_RETRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.max_retries = max_retries
+
+    def _can_retry(self, request, status):
+        if not isinstance(request.stream, httpx.ByteStream):
+            return False
+        if request.method in IDEMPOTENT_METHODS:
+            return status in RETRY_STATUSES
+        return status == 429
+
+    def handle_request(self, request):
+        attempt = 0
+        while True:
+            response = super().handle_request(request)
+            if attempt >= self.max_retries or not self._can_retry(request, response.status_code):
+                return response
+            delay = _retry_after(response, attempt)
+            response.close()
+            attempt += 1
+            time.sleep(delay)
+
+@functools.lru_cache(maxsize=None)
+def get_http():
+    """Session HTTP partagée du processus (thread-safe)"""
+    http2 = http2_available()
+    transport = RetryTransport(
+        http2=http2,
+        retries=2,  # nouvelles tentatives de connexion (erreurs réseau)
+        limits=httpx.Limits(
+            max_connections=POOL_SIZE,
+            max_keepalive_connections=POOL_SIZE,
+            keepalive_expiry=60
+        )
+    )
+    return httpx.Client(
+        transport=transport,
+        timeout=httpx.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT),
+        http2=http2
+    )
+
+@functools.lru_cache(maxsize=None)
+def get_client(supabase_url, supabase_key):
+    """Client Supabase du processus, construit une seule fois sur la session partagée"""
+    from supabase import create_client, ClientOptions
+
+    try:
+        # supabase-py récent : injection directe de la session httpx
+        options = ClientOptions(httpx_client=get_http())
+    except TypeError:
+        # Versions plus anciennes : seuls les timeouts sont réglables
+        options = ClientOptions(
+            postgrest_client_timeout=TIMEOUT,
+            storage_client_timeout=int(TIMEOUT)
+        )
+    return create_client(supabase_url, supabase_key, options=options)
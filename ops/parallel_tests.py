@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Exécution parallèle des tests sur les cœurs du runner : les fichiers de tests
+pytest sont répartis en N shards équilibrés d'après leurs durées historiques
+(bin packing LPT, le plus long d'abord), lancés chacun dans son propre processus
+en même temps que les shards Playwright, puis les rapports JUnit, coverage et
+JSON sont fusionnés et le résultat écrit dans artifacts/summary.json.
+
+Durées historiques : vue test_stats de Supabase B (--fetch), sinon le fichier
+artifacts/test_durations.json et le dernier artifacts/junit.xml.
+
+Pendant que pytest tourne, le serveur de l'application démarre et les navigateurs
+Playwright s'installent ; les shards E2E partent dès que l'application répond
+(sonde HTTP avec backoff), et la phase de test dure ~max(unitaires, E2E).
+
+    python ops/parallel_tests.py --workers 8 --e2e-shards 2 --fetch \\
+        --app-cmd "python -m uvicorn src.main:app --port 8000" --app-url http://localhost:8000 --install-browsers
+    python ops/parallel_tests.py --tests-file artifacts/test_impact_tests.txt --no-e2e
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import heapq
+import argparse
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from impacted_tests import is_test_file
+from ingest_test_timings import parse_junit
+from summary import load_summary, save_summary
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+SHARD_DIR = Path('artifacts/shards')
+JUNIT_FILE = Path('artifacts/junit.xml')
+PLAYWRIGHT_FILE = Path('artifacts/playwright-results.json')
+COVERAGE_XML = Path('artifacts/coverage.xml')
+COVERAGE_HTML = Path('artifacts/htmlcov')
+DURATIONS_FILE = Path('artifacts/test_durations.json')
+
+CPU_COUNT = os.cpu_count() or 1
+DEFAULT_E2E_SHARDS = int(os.getenv('E2E_SHARDS', str(max(1, CPU_COUNT // 4))))
+# 0 = tous les cœurs non utilisés par les shards Playwright
+DEFAULT_WORKERS = int(os.getenv('TEST_WORKERS', '0'))
+# Durée supposée d'un fichier sans historique, faute de mieux
+DEFAULT_FILE_SECONDS = 1.0
+# Attente maximale de l'application avant les E2E, et bornes du backoff de la sonde
+READY_TIMEOUT = float(os.getenv('APP_READY_TIMEOUT', '60'))
+READY_INITIAL_DELAY = 0.1
+READY_MAX_DELAY = 2.0
+PAGE_SIZE = 1000
+
+def _find_test_files(paths):
+    files = []
+    for path in map(Path, paths):
+        if path.is_file():
+            files.append(path.as_posix())
+        elif path.is_dir():
+            files.extend(p.as_posix() for p in path.rglob('*.py') if is_test_file(p.as_posix()))
+    return sorted(set(files))
+
+def junit_node_id(classname, name, exists=os.path.exists):
+    """
+    classname JUnit de pytest ('tests.test_api.TestX') + nom -> identifiant
+    pytest ('tests/test_api.py::TestX::test_a'), ou None si le fichier est introuvable
+    """
+    parts = classname.split('.') if classname else []
+    for cut in range(len(parts), 0, -1):
+        path = '/'.join(parts[:cut]) + '.py'
+        if exists(path):
+            return '::'.join([path, *parts[cut:], name])
+    return None
+
+def durations_from_records(records, exists=os.path.exists):
+    """Durées en secondes par identifiant pytest, depuis des résultats (suite, name, duration_ms)"""
+    durations = {}
+    resolved = {}
+    for record in records:
+        suite = record.get('suite') or ''
+        if suite not in resolved:
+            resolved[suite] = junit_node_id(suite, '', exists)
+        prefix = resolved[suite]
+        if prefix is not None:
+            durations[prefix + record['name']] = float(record['duration_ms'] or 0) / 1000
+    return durations
+
+def load_durations(path=DURATIONS_FILE, junit=JUNIT_FILE):
+    """Durées locales : fichier de durées, complété par le rapport JUnit précédent"""
+    durations = {}
+    try:
+        durations.update(json.loads(Path(path).read_text()))
+    except (OSError, ValueError):
+        pass
+    if Path(junit).exists():
+        try:
+            durations.update(durations_from_records(parse_junit(junit)))
+        except ET.ParseError:
+            pass
+    return durations
+
+def fetch_durations(supabase: 'Client'):
+    """
+    Durées moyennes des 30 derniers jours (vue test_stats). La vue n'est pas
+    filtrée par repo : seuls les tests dont le fichier existe ici sont retenus
+    """
+    rows = []
+    while True:
+        page = (supabase.table('test_stats').select('suite,name,avg_ms').eq('source', 'junit')
+                .range(len(rows), len(rows) + PAGE_SIZE - 1).execute().data or [])
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            break
+    return durations_from_records({'suite': r['suite'], 'name': r['name'], 'duration_ms': r['avg_ms']}
+                                  for r in rows)
+
+def plan_units(test_files=(), test_ids=(), durations=None):
+    """
+    Unités de répartition : un fichier de tests (les fixtures de module restent
+    dans un seul processus) avec ses arguments pytest et son poids en secondes.
+    Les fichiers sans historique reçoivent la durée médiane des fichiers connus
+    """
+    durations = durations or {}
+    by_file = {}
+    for test_id in durations:
+        path = test_id.split('::', 1)[0]
+        by_file[path] = by_file.get(path, 0.0) + durations[test_id]
+
+    units = {}
+    if test_ids:
+        for test_id in test_ids:
+            path = test_id.split('::', 1)[0]
+            unit = units.setdefault(path, {'args': [], 'weight': 0.0, 'known': False})
+            unit['args'].append(test_id)
+            if test_id in durations:
+                unit['weight'] += durations[test_id]
+                unit['known'] = True
+            elif '::' not in test_id and path in by_file:
+                unit['weight'] += by_file[path]
+                unit['known'] = True
+    else:
+        for path in test_files:
+            units[path] = {'args': [path], 'weight': by_file.get(path, 0.0), 'known': path in by_file}
+
+    known = [unit['weight'] for unit in units.values() if unit['known']]
+    fallback = statistics.median(known) if known else DEFAULT_FILE_SECONDS
+    for unit in units.values():
+        if not unit['known']:
+            unit['weight'] = fallback
+    return {path: (unit['args'], unit['weight']) for path, unit in units.items()}
+
+def lpt_shards(weights, workers):
+    """
+    Longest Processing Time : unités triées par poids décroissant, chacune
+    affectée au shard le moins chargé. Retourne [(charge, [unités])] non vides
+    """
+    workers = max(1, min(workers, len(weights)))
+    heap = [(0.0, index) for index in range(workers)]
+    shards = [[] for _ in range(workers)]
+    loads = [0.0] * workers
+    for unit, weight in sorted(weights.items(), key=lambda item: (-item[1], item[0])):
+        load, index = heapq.heappop(heap)
+        shards[index].append(unit)
+        loads[index] = load + weight
+        heapq.heappush(heap, (loads[index], index))
+    return [(loads[i], shards[i]) for i in range(workers) if shards[i]]
+
+def merge_junit(paths, output=JUNIT_FILE):
+    """Fusionne les rapports JUnit des shards sous une racine <testsuites> ; retourne les totaux"""
+    root = ET.Element('testsuites', name='pytest tests')
+    totals = {'tests': 0, 'errors': 0, 'failures': 0, 'skipped': 0}
+    elapsed = 0.0
+    for path in paths:
+        if not Path(path).exists():
+            continue
+        shard_root = ET.parse(path).getroot()
+        suites = [shard_root] if shard_root.tag == 'testsuite' else list(shard_root)
+        for suite in suites:
+            for key in totals:
+                totals[key] += int(suite.get(key) or 0)
+            elapsed += float(suite.get('time') or 0)
+            root.append(suite)
+    for key, value in totals.items():
+        root.set(key, str(value))
+    root.set('time', f'{elapsed:.3f}')
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    ET.ElementTree(root).write(output, encoding='utf-8', xml_declaration=True)
+    return totals
+
+def merge_playwright(paths, output=PLAYWRIGHT_FILE):
+    """Fusionne les rapports JSON Playwright des shards (suites concaténées, stats cumulées)"""
+    merged = None
+    for path in paths:
+        try:
+            report = json.loads(Path(path).read_text())
+        except (OSError, ValueError):
+            continue
+        if merged is None:
+            merged = {'config': report.get('config', {}), 'suites': [], 'errors': [], 'stats': {}}
+        merged['suites'].extend(report.get('suites', []))
+        merged['errors'].extend(report.get('errors', []))
+        stats = merged['stats']
+        for key, value in (report.get('stats') or {}).items():
+            if key == 'duration':
+                stats[key] = max(stats.get(key, 0), value)  # shards simultanés
+            elif key == 'startTime':
+                stats[key] = min(stats.get(key, value), value)
+            elif isinstance(value, (int, float)):
+                stats[key] = stats.get(key, 0) + value
+    if merged is not None:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(json.dumps(merged))
+    return merged
+
+def combine_coverage(data_files, sources, xml=COVERAGE_XML, html=COVERAGE_HTML):
+    """
+    Combine les données coverage des shards dans .coverage (contextes conservés
+    pour ops/impacted_tests.py build) et écrit les rapports XML et HTML.
+    Retourne le taux de lignes couvertes, ou None sans données
+    """
+    from coverage import Coverage
+
+    data_files = [str(path) for path in data_files if Path(path).exists()]
+    if not data_files:
+        return None
+    cov = Coverage(data_file='.coverage', source=sources or None)
+    cov.combine(data_files)
+    cov.save()
+    percent = cov.xml_report(outfile=str(xml))
+    try:
+        cov.html_report(directory=str(html))
+    except Exception as e:
+        print(f"⚠️  Rapport coverage HTML non généré: {e}")
+    return round(percent / 100, 4)
+
+def _launch(cmd, log_path, env=None):
+    log_file = open(log_path, 'w')
+    process = subprocess.Popen(cmd, stdout=log_file, stderr=subprocess.STDOUT,
+                               env={**os.environ, **(env or {})})
+    return {'process': process, 'log': log_path, 'log_file': log_file, 'started': time.monotonic()}
+
+def _wait(job):
+    job['exit_code'] = job['process'].wait()
+    job['log_file'].close()
+    job['seconds'] = round(time.monotonic() - job['started'], 1)
+    return job
+
+def _first_failure(codes):
+    return next((code for code in codes if code), 0)
+
+def wait_ready(url, timeout=READY_TIMEOUT, process=None):
+    """
+    Sonde HTTP avec backoff exponentiel : True dès que l'URL répond (code < 500),
+    False si le délai expire ou si le processus de l'application s'arrête
+    """
+    deadline = time.monotonic() + timeout
+    delay = READY_INITIAL_DELAY
+    while True:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=5):
+                return True
+        except urllib.error.HTTPError as e:
+            if e.code < 500:
+                return True
+        except (urllib.error.URLError, OSError):
+            pass
+        if time.monotonic() + delay > deadline:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, READY_MAX_DELAY)
+
+def prepare_e2e(args):
+    """
+    Démarre l'application et installe les navigateurs Playwright pendant que les
+    shards pytest tournent, puis attend que l'application réponde
+    """
+    started = time.monotonic()
+    app = _launch(shlex.split(args.app_cmd), SHARD_DIR / 'app.log') if args.app_cmd else None
+    install = None
+    if args.install_browsers:
+        install = _launch(['npx', 'playwright', 'install', '--with-deps'], SHARD_DIR / 'playwright-install.log')
+
+    ready = True
+    if app is not None and args.app_url:
+        ready = wait_ready(args.app_url, args.ready_timeout, app['process'])
+        if ready:
+            print(f"🌐 Application prête en {time.monotonic() - started:.1f}s ({args.app_url})")
+        else:
+            print(f"❌ Application non disponible sur {args.app_url} — voir {SHARD_DIR / 'app.log'}")
+    install_exit = None
+    if install is not None:
+        install_exit = _wait(install)['exit_code']
+        if install_exit:
+            print(f"⚠️  Installation Playwright partiellement échouée — voir {install['log']}")
+    return {'ready': ready, 'seconds': round(time.monotonic() - started, 1), 'app': app,
+            'install_exit': install_exit}
+
+def stop_app(app):
+    if app is None:
+        return
+    app['process'].terminate()
+    try:
+        app['process'].wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        app['process'].kill()
+        app['process'].wait()
+    app['log_file'].close()
+
+def run(args):
+    """Planifie, lance et attend tous les shards ; retourne le rapport du run"""
+    started = time.monotonic()
+    SHARD_DIR.mkdir(parents=True, exist_ok=True)
+    for stale in list(SHARD_DIR.glob('*')) + list(Path('.').glob('.coverage.shard*')):
+        stale.unlink()
+
+    durations = load_durations()
+    if args.fetch:
+        supabase = _supabase()
+        if supabase is not None:
+            try:
+                durations.update(fetch_durations(supabase))
+            except Exception as e:
+                print(f"⚠️  Durées historiques indisponibles dans Supabase: {e}")
+
+    test_ids = []
+    if args.tests_file:
+        test_ids = [line.strip() for line in Path(args.tests_file).read_text().splitlines() if line.strip()]
+    units = plan_units(_find_test_files(args.paths) if not test_ids else (), test_ids, durations)
+
+    e2e_shards = 0 if args.no_e2e else max(1, args.e2e_shards)
+    workers = args.workers or max(1, CPU_COUNT - e2e_shards)
+    shards = lpt_shards({path: weight for path, (_, weight) in units.items()}, workers) if units else []
+
+    jobs = []
+    for index, (load, paths) in enumerate(shards):
+        cmd = [sys.executable, '-m', 'pytest', *[a for p in paths for a in units[p][0]],
+               f'--junit-xml={SHARD_DIR}/junit-{index}.xml', *args.pytest_arg]
+        env = {}
+        if args.cov:
+            cmd += [f'--cov={source}' for source in args.cov] + ['--cov-report=']
+            if args.cov_context:
+                cmd.append('--cov-context=test')
+            env['COVERAGE_FILE'] = os.path.abspath(f'.coverage.shard{index}')
+        job = _launch(cmd, SHARD_DIR / f'pytest-{index}.log', env)
+        job.update(kind='pytest', index=index, planned_s=round(load, 1), units=len(paths))
+        jobs.append(job)
+    print(f"🐍 {len(units)} fichiers de tests répartis sur {len(shards)} processus pytest")
+
+    setup = {'ready': True, 'seconds': 0, 'app': None, 'install_exit': None}
+    try:
+        if e2e_shards:
+            setup = prepare_e2e(args)
+        if e2e_shards and setup['ready']:
+            for index in range(1, e2e_shards + 1):
+                cmd = ['npx', 'playwright', 'test', '--reporter=json', *args.e2e_arg]
+                if e2e_shards > 1:
+                    cmd.append(f'--shard={index}/{e2e_shards}')
+                env = {'PLAYWRIGHT_JSON_OUTPUT_NAME': str(SHARD_DIR / f'playwright-{index}.json')}
+                job = _launch(cmd, SHARD_DIR / f'playwright-{index}.log', env)
+                job.update(kind='playwright', index=index)
+                jobs.append(job)
+            print(f"🎭 {e2e_shards} shards Playwright lancés en parallèle")
+
+        for job in jobs:
+            _wait(job)
+            icon = '✅' if job['exit_code'] == 0 else '❌'
+            print(f"   {icon} {job['kind']} #{job['index']} : code {job['exit_code']} en {job['seconds']}s"
+                  + (f" (prévu {job['planned_s']}s)" if job['kind'] == 'pytest' else '')
+                  + ('' if job['exit_code'] == 0 else f" — voir {job['log']}"))
+    finally:
+        stop_app(setup['app'])
+
+    pytest_jobs = [job for job in jobs if job['kind'] == 'pytest']
+    e2e_jobs = [job for job in jobs if job['kind'] == 'playwright']
+    report = {
+        'workers': len(pytest_jobs),
+        'e2e_shards': e2e_shards,
+        'unit_exit': _first_failure(job['exit_code'] for job in pytest_jobs),
+        # Application jamais prête : les E2E n'ont pas pu s'exécuter
+        'e2e_exit': _first_failure(job['exit_code'] for job in e2e_jobs) if setup['ready'] else 1,
+        'unit_s': max([job['seconds'] for job in pytest_jobs] or [0]),
+        'e2e_s': max([job['seconds'] for job in e2e_jobs] or [0]),
+        'e2e_setup_s': setup['seconds'],
+        # Code de sortie de playwright install (None sans --install-browsers), lu avant le commit du cache
+        'browsers_install_exit': setup['install_exit'],
+        'wall_s': round(time.monotonic() - started, 1),
+        'shards': [
+            {key: job.get(key) for key in ('kind', 'index', 'units', 'planned_s', 'seconds', 'exit_code')}
+            for job in jobs
+        ],
+    }
+
+    if pytest_jobs:
+        report['tests'] = merge_junit([SHARD_DIR / f'junit-{job["index"]}.xml' for job in pytest_jobs])
+        _save_durations(durations)
+    if args.cov and pytest_jobs:
+        report['coverage'] = combine_coverage(
+            [f'.coverage.shard{job["index"]}' for job in pytest_jobs], args.cov)
+    if e2e_jobs:
+        merge_playwright([SHARD_DIR / f'playwright-{job["index"]}.json' for job in e2e_jobs])
+    return report
+
+def _save_durations(previous):
+    """Mémorise les durées du run (fichier local, relu au prochain run sans Supabase)"""
+    durations = dict(previous)
+    durations.update(durations_from_records(parse_junit(JUNIT_FILE)))
+    DURATIONS_FILE.write_text(json.dumps(durations, separators=(',', ':'), sort_keys=True))
+
+def update_summary(report):
+    """Reporte les résultats fusionnés dans artifacts/summary.json (lu par dod_gate)"""
+    summary = load_summary()
+    summary['unit_pass'] = report['unit_exit'] == 0
+    if report['e2e_shards']:
+        summary['e2e_pass'] = report['e2e_exit'] == 0
+    if report.get('coverage') is not None:
+        summary['coverage'] = report['coverage']
+    summary.setdefault('durations', {}).update(unit_s=report['unit_s'], e2e_s=report['e2e_s'])
+    summary.setdefault('exit_codes', {}).update(python_tests=report['unit_exit'], e2e_tests=report['e2e_exit'])
+    if 'tests' in report:
+        summary['tests'] = report['tests']
+    summary['parallel'] = {key: report[key] for key in
+                           ('workers', 'e2e_shards', 'e2e_setup_s', 'browsers_install_exit', 'wall_s', 'shards')}
+    save_summary(summary)
+    return summary
+
+def _supabase():
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
+    if not supabase_url or not supabase_key:
+        return None
+    from ops_client import get_client
+    return get_client(supabase_url, supabase_key)
+
+def main():
+    parser = argparse.ArgumentParser(description="Exécution parallèle des tests pytest et Playwright")
+    parser.add_argument('paths', nargs='*', default=['tests'], help="Répertoires ou fichiers de tests (défaut: tests)")
+    parser.add_argument('--tests-file', help="Identifiants pytest à exécuter, un par ligne (tests impactés)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Processus pytest (défaut: cœurs disponibles moins les shards Playwright)")
+    parser.add_argument('--e2e-shards', type=int, default=DEFAULT_E2E_SHARDS,
+                        help=f"Shards Playwright simultanés (défaut: {DEFAULT_E2E_SHARDS})")
+    parser.add_argument('--no-e2e', action='store_true', help="N'exécute pas Playwright")
+    parser.add_argument('--cov', action='append', default=[], help="Source mesurée par coverage (répétable)")
+    parser.add_argument('--cov-context', action='store_true', help="Contextes coverage par test (carte d'impact)")
+    parser.add_argument('--pytest-arg', action='append', default=[], help="Argument pytest supplémentaire (répétable)")
+    parser.add_argument('--e2e-arg', action='append', default=[], help="Argument Playwright supplémentaire (répétable)")
+    parser.add_argument('--fetch', action='store_true', help="Lit les durées historiques dans Supabase B")
+    parser.add_argument('--app-cmd', help="Commande de démarrage de l'application testée en E2E")
+    parser.add_argument('--app-url', default=os.getenv('APP_URL'), help="URL sondée avant les E2E (défaut: $APP_URL)")
+    parser.add_argument('--ready-timeout', type=float, default=READY_TIMEOUT,
+                        help=f"Attente maximale de l'application en secondes (défaut: {READY_TIMEOUT:g})")
+    parser.add_argument('--install-browsers', action='store_true',
+                        help="Installe les navigateurs Playwright pendant les tests unitaires")
+    args = parser.parse_args()
+
+    report = run(args)
+    update_summary(report)
+    print(f"📊 Tests unitaires: {'✅' if report['unit_exit'] == 0 else '❌'} en {report['unit_s']}s"
+          + (f", E2E: {'✅' if report['e2e_exit'] == 0 else '❌'} en {report['e2e_s']}s" if report['e2e_shards'] else ''))
+    sys.exit(1 if report['unit_exit'] or report['e2e_exit'] else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Gate de régression de performance : compare les métriques du run (durées de
+tests, Lighthouse, coverage, benchmarks) à une ligne de base glissante calculée
+sur les N derniers runs réussis du même sprint, ou à défaut du même repo, et de
+même sélection de tests (complet, impacté, aucun) ; les durées ne sont comparées
+qu'entre runs complets.
+La bande de bruit est robuste aux valeurs aberrantes : médiane ± k × MAD.
+
+Configuration dans dod_json (prioritaire) ou par variables d'environnement :
+
+    "regression": {"mode": "fail", "window": 20, "k": 3, "min_runs": 5}
+    REGRESSION_MODE=off|warn|fail  REGRESSION_WINDOW  REGRESSION_K  REGRESSION_MIN_RUNS
+"""
+
+import os
+import statistics
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+DEFAULT_MODE = os.getenv('REGRESSION_MODE', 'warn')
+DEFAULT_WINDOW = int(os.getenv('REGRESSION_WINDOW', '20'))
+DEFAULT_K = float(os.getenv('REGRESSION_K', '3'))
+DEFAULT_MIN_RUNS = int(os.getenv('REGRESSION_MIN_RUNS', '5'))
+# Largeur minimale de la bande, relative à la médiane (MAD nulle si la métrique ne varie pas)
+DEFAULT_MIN_BAND = float(os.getenv('REGRESSION_MIN_BAND', '0.02'))
+# Facteur d'échelle MAD -> écart-type pour une distribution normale
+MAD_SCALE = 1.4826
+
+# Métriques suivies : chemin dans summary.json (".*" = toutes les clés du dictionnaire)
+# et sens de l'amélioration
+METRICS = {
+    'coverage': 'higher',
+    'lighthouse': 'higher',
+    'durations.*': 'lower',
+    'benchmarks.*': 'lower',
+}
+
+def regression_config(dod_criteria):
+    """Réglages effectifs : section "regression" de la DoD, sinon environnement"""
+    config = {
+        'mode': DEFAULT_MODE,
+        'window': DEFAULT_WINDOW,
+        'k': DEFAULT_K,
+        'min_runs': DEFAULT_MIN_RUNS,
+        'min_band': DEFAULT_MIN_BAND,
+        'metrics': METRICS,
+    }
+    config.update((dod_criteria or {}).get('regression') or {})
+    if config['mode'] not in ('off', 'warn', 'fail'):
+        raise ValueError(f"Mode de régression inconnu: {config['mode']}")
+    return config
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+def metric_values(summary, metrics=METRICS):
+    """Valeurs numériques des métriques suivies : {chemin: (valeur, sens)}"""
+    values = {}
+    for path, direction in metrics.items():
+        *parents, leaf = path.split('.')
+        node = summary
+        for key in parents:
+            node = node.get(key) if isinstance(node, dict) else None
+        if not isinstance(node, dict):
+            continue
+        prefix = '.'.join(parents + [''])
+        items = node.items() if leaf == '*' else [(leaf, node.get(leaf))]
+        for key, value in items:
+            number = _number(value)
+            if number is not None:
+                values[prefix + key] = (number, direction)
+    return values
+
+def baseline_bands(history, metrics=METRICS, k=DEFAULT_K, min_runs=DEFAULT_MIN_RUNS,
+                   min_band=DEFAULT_MIN_BAND):
+    """
+    Ligne de base par métrique à partir des résumés des runs précédents :
+    médiane, MAD et bande tolérée (k × MAD normalisée, au moins min_band × |médiane|)
+    """
+    samples = {}
+    for summary in history:
+        for name, (value, direction) in metric_values(summary, metrics).items():
+            samples.setdefault(name, (direction, []))[1].append(value)
+
+    bands = {}
+    for name, (direction, values) in samples.items():
+        if len(values) < min_runs:
+            continue
+        median = statistics.median(values)
+        mad = statistics.median(abs(v - median) for v in values)
+        band = max(k * MAD_SCALE * mad, min_band * abs(median))
+        bands[name] = {
+            'direction': direction,
+            'median': median,
+            'mad': mad,
+            'band': band,
+            'limit': median - band if direction == 'higher' else median + band,
+            'runs': len(values),
+        }
+    return bands
+
+def compare(summary, bands, metrics=METRICS):
+    """Métriques du run comparées à leur bande : liste de résultats par métrique"""
+    results = []
+    for name, (value, _) in sorted(metric_values(summary, metrics).items()):
+        band = bands.get(name)
+        if band is None:
+            continue
+        if band['direction'] == 'higher':
+            regressed = value < band['limit']
+        else:
+            regressed = value > band['limit']
+        results.append({
+            'metric': name,
+            'value': value,
+            'median': band['median'],
+            'limit': band['limit'],
+            'direction': band['direction'],
+            'regressed': regressed,
+        })
+    return results
+
+def run_selection(summary):
+    """Sélection des tests du run (ops/impacted_tests.py) ; runs antérieurs : complets"""
+    return (summary or {}).get('test_selection') or 'full'
+
+def comparable_history(history, selection):
+    """Runs de même sélection que le run courant (un sous-ensemble n'a pas les durées d'un run complet)"""
+    return [summary for summary in history if run_selection(summary) == selection]
+
+def comparable_metrics(metrics, selection):
+    """
+    Durées et coverage comparables seulement entre runs complets : celles d'un run
+    partiel dépendent des tests retenus
+    """
+    if selection == 'full':
+        return metrics
+    return {path: direction for path, direction in metrics.items()
+            if path != 'coverage' and not path.startswith('durations.')}
+
+def _fetch_history(supabase: 'Client', run_id, window, sprint_id=None, repo=None, selection='full'):
+    """Résumés des derniers runs PASSED du sprint (ou du repo) de même sélection, hors run courant"""
+    if sprint_id:
+        query = supabase.table('runs').select('id,summary_json').eq('sprint_id', sprint_id)
+    else:
+        query = (supabase.table('runs')
+                 .select('id,summary_json,sprints!inner(specs!inner(repo))')
+                 .eq('sprints.specs.repo', repo))
+    if selection == 'full':
+        query = query.or_('summary_json->>test_selection.is.null,summary_json->>test_selection.eq.full')
+    else:
+        query = query.eq('summary_json->>test_selection', selection)
+    rows = (query.eq('result', 'PASSED').neq('id', run_id)
+            .order('started_at', desc=True).limit(window).execute().data or [])
+    return comparable_history([row['summary_json'] or {} for row in rows], selection)
+
+def check_regressions(supabase: 'Client', run_id, summary, sprint):
+    """
+    Compare le run à sa ligne de base. Retourne le rapport stocké dans
+    summary['regression'] (mode, scope, métriques, régressions, détails)
+    """
+    config = regression_config(sprint.get('dod_json'))
+    report = {'mode': config['mode'], 'scope': None, 'baseline_runs': 0,
+              'metrics': [], 'regressions': [], 'details': []}
+    if config['mode'] == 'off':
+        return report
+
+    selection = run_selection(summary)
+    report['selection'] = selection
+    metrics = comparable_metrics(config['metrics'], selection)
+    history = _fetch_history(supabase, run_id, config['window'], sprint_id=sprint['id'], selection=selection)
+    report['scope'] = 'sprint'
+    if len(history) < config['min_runs'] and sprint.get('spec_id'):
+        spec = supabase.table('specs').select('repo').eq('id', sprint['spec_id']).single().execute()
+        repo = (spec.data or {}).get('repo')
+        if repo:
+            history = _fetch_history(supabase, run_id, config['window'], repo=repo, selection=selection)
+            report['scope'] = 'repo'
+    report['baseline_runs'] = len(history)
+
+    bands = baseline_bands(history, metrics, config['k'], config['min_runs'], config['min_band'])
+    report['metrics'] = compare(summary, bands, metrics)
+    report['regressions'] = [m['metric'] for m in report['metrics'] if m['regressed']]
+    for m in report['metrics']:
+        icon = '📉' if m['regressed'] else '✅'
+        limit_op = '>=' if m['direction'] == 'higher' else '<='
+        report['details'].append(
+            f"{icon} {m['metric']}: {m['value']:g} (médiane {m['median']:g}, limite {limit_op} {m['limit']:g})"
+        )
+    if not bands:
+        report['details'].append(
+            f"ℹ️  Ligne de base insuffisante ({len(history)} runs, minimum {config['min_runs']})"
+        )
+    return report
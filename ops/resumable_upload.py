@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Upload résumable (protocole TUS) vers Supabase Storage pour les gros artefacts :
+le fichier est envoyé par blocs de taille fixe, la progression est sauvegardée
+localement pour qu'une étape CI relancée reprenne là où elle s'était arrêtée
+"""
+
+import os
+import json
+import base64
+import hashlib
+from pathlib import Path
+
+# Supabase impose des blocs de 6 Mo exactement (sauf le dernier)
+CHUNK_SIZE = 6 * 1024 * 1024
+# Au-delà de ce seuil, les fichiers passent par l'upload résumable
+RESUMABLE_THRESHOLD = int(os.getenv('UPLOAD_RESUMABLE_THRESHOLD', str(CHUNK_SIZE)))
+# Répertoire des états de reprise (ignoré par la découverte des artefacts)
+STATE_DIR = Path(os.getenv('UPLOAD_STATE_DIR', 'artifacts/.uploads'))
+TUS_VERSION = '1.0.0'
+# Timeout d'un bloc (6 Mo sur un lien lent)
+PART_TIMEOUT = float(os.getenv('UPLOAD_TIMEOUT', '300'))
+
+def _encode_metadata(metadata):
+    """Encode l'en-tête Upload-Metadata (clé valeur_base64, séparés par des virgules)"""
+    return ','.join(
+        f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in metadata.items()
+    )
+
+class ResumableUpload:
+    """Upload TUS d'un fichier, avec état de reprise persisté sur disque"""
+
+    def __init__(self, supabase_url, supabase_key, bucket, filepath, storage_path,
+                 chunk_size=CHUNK_SIZE, state_dir=STATE_DIR, upsert=False, http=None):
+        self.endpoint = f"{supabase_url}/storage/v1/upload/resumable"
+        self.headers = {
+            'Authorization': f'Bearer {supabase_key}',
+            'apikey': supabase_key,
+            'Tus-Resumable': TUS_VERSION
+        }
+        self.bucket = bucket
+        self.filepath = filepath
+        self.storage_path = storage_path
+        self.chunk_size = chunk_size
+        self.upsert = upsert
+        if http is None:
+            from ops_client import get_http
+            http = get_http()
+        self.http = http
+
+        stat = os.stat(filepath)
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        key = hashlib.sha1(f"{bucket}/{storage_path}".encode()).hexdigest()
+        self.state_file = Path(state_dir) / f"{key}.json"
+
+    def _load_state(self):
+        """Retourne l'URL d'upload sauvegardée si le fichier n'a pas changé depuis"""
+        try:
+            state = json.loads(self.state_file.read_text())
+        except (OSError, ValueError):
+            return None
+        if state.get('size') != self.size or state.get('mtime') != self.mtime:
+            return None
+        return state.get('upload_url')
+
+    def _save_state(self, upload_url, offset):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_file.with_suffix('.tmp')
+        tmp.write_text(json.dumps({
+            'upload_url': upload_url,
+            'storage_path': self.storage_path,
+            'size': self.size,
+            'mtime': self.mtime,
+            'offset': offset
+        }))
+        os.replace(tmp, self.state_file)
+
+    def _clear_state(self):
+        try:
+            self.state_file.unlink()
+        except OSError:
+            pass
+
+    def _create(self):
+        """Crée l'upload côté serveur et retourne son URL"""
+        response = self.http.post(self.endpoint, headers={
+            **self.headers,
+            'Upload-Length': str(self.size),
+            'Upload-Metadata': _encode_metadata({
+                'bucketName': self.bucket,
+                'objectName': self.storage_path,
+                'contentType': 'application/octet-stream'
+            }),
+            'x-upsert': 'true' if self.upsert else 'false'
+        })
+        response.raise_for_status()
+        return response.headers['Location']
+
+    def _server_offset(self, upload_url):
+        """Offset déjà reçu par le serveur, ou None si l'upload a expiré"""
+        response = self.http.head(upload_url, headers=self.headers)
+        if response.status_code in (404, 410):
+            return None
+        response.raise_for_status()
+        return int(response.headers.get('Upload-Offset', 0))
+
+    def run(self):
+        """Envoie (ou reprend) l'upload ; lève une exception en cas d'échec"""
+        upload_url = self._load_state()
+        offset = self._server_offset(upload_url) if upload_url else None
+        if offset is None:
+            upload_url = self._create()
+            offset = 0
+            self._save_state(upload_url, offset)
+        elif offset:
+            print(f"  ↩️  Reprise de {self.storage_path} à {offset / 1024 / 1024:.1f} Mo")
+
+        # Un seul bloc en mémoire à la fois, quelle que soit la taille du fichier
+        with open(self.filepath, 'rb') as f:
+            f.seek(offset)
+            while offset < self.size:
+                chunk = f.read(self.chunk_size)
+                response = self.http.patch(upload_url, content=chunk, timeout=PART_TIMEOUT, headers={
+                    **self.headers,
+                    'Upload-Offset': str(offset),
+                    'Content-Type': 'application/offset+octet-stream'
+                })
+                response.raise_for_status()
+                offset = int(response.headers.get('Upload-Offset', offset + len(chunk)))
+                self._save_state(upload_url, offset)
+
+        self._clear_state()
+        return True
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Lecture du tableau de bord des runs depuis la vue matérialisée run_overview
+(run, sprint, spec, résultat DoD, artefacts, dernière phase) en une seule requête
+
+    python ops/run_overview.py --limit 20 --repo org/repo
+    python ops/run_overview.py --run-id <uuid> --json
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+OVERVIEW_COLUMNS = (
+    'run_id,ci_run_id,started_at,finished_at,result,dod_score,dod_total,'
+    'sprint_id,sprint_label,sprint_state,spec_id,repo,branch,'
+    'artifact_count,artifact_bytes,artifacts_by_kind,last_phase,last_message,last_event_at'
+)
+
+def fetch_overview(supabase: 'Client', limit=20, repo=None, result=None, run_id=None):
+    """Runs les plus récents (index sur started_at, et sur repo si filtré)"""
+    query = supabase.table('run_overview').select(OVERVIEW_COLUMNS)
+    if run_id:
+        query = query.eq('run_id', run_id)
+    if repo:
+        query = query.eq('repo', repo)
+    if result:
+        query = query.eq('result', result)
+    return query.order('started_at', desc=True).limit(limit).execute().data or []
+
+def refresh_overview(supabase: 'Client'):
+    """Rafraîchit la vue (sans bloquer les lectures) ; retourne False en cas d'échec"""
+    try:
+        supabase.rpc('refresh_run_overview').execute()
+    except Exception as e:
+        print(f"⚠️  Rafraîchissement de run_overview impossible: {e}")
+        return False
+    return True
+
+def format_overview(rows):
+    """Lignes de tableau lisibles pour le terminal"""
+    lines = [f"{'Démarré':<17} {'Repo':<28} {'Sprint':<7} {'Résultat':<9} {'DoD':<6} {'Artefacts':>9}  Dernière phase"]
+    for row in rows:
+        started = (row.get('started_at') or '')[:16].replace('T', ' ')
+        dod = f"{row['dod_score']}/{row['dod_total']}" if row.get('dod_total') is not None else '-'
+        lines.append(
+            f"{started:<17} {(row.get('repo') or '-')[:28]:<28} {(row.get('sprint_label') or '-'):<7} "
+            f"{(row.get('result') or 'EN COURS'):<9} {dod:<6} {row.get('artifact_count', 0):>9}  "
+            f"{row.get('last_phase') or '-'}"
+        )
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Tableau de bord des runs (vue run_overview)")
+    parser.add_argument('--limit', type=int, default=20, help="Nombre de runs affichés (défaut: 20)")
+    parser.add_argument('--repo', help="Filtre sur le dépôt (org/repo)")
+    parser.add_argument('--result', choices=['PASSED', 'FAILED'], help="Filtre sur le résultat")
+    parser.add_argument('--run-id', help="Un seul run")
+    parser.add_argument('--refresh', action='store_true', help="Rafraîchit la vue avant la lecture")
+    parser.add_argument('--json', action='store_true', help="Sortie JSON")
+    args = parser.parse_args()
+
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
+    if not supabase_url or not supabase_key:
+        print("❌ Variables SUPABASE_URL ou SUPABASE_SERVICE_KEY manquantes")
+        sys.exit(1)
+
+    from ops_client import get_client
+    supabase = get_client(supabase_url, supabase_key)
+
+    if args.refresh:
+        refresh_overview(supabase)
+    try:
+        rows = fetch_overview(supabase, args.limit, args.repo, args.result, args.run_id)
+    except Exception as e:
+        print(f"❌ Erreur lors de la lecture de run_overview: {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+    else:
+        print('\n'.join(format_overview(rows)))
+
+if __name__ == '__main__':
+    main()
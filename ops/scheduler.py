@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Scheduler multi-projets du control-plane : prend les sprints PLANNED de la table
+sprints (rpc claim_sprints, FOR UPDATE SKIP LOCKED) par priorité puis ancienneté
+et les exécute dans des slots de worker locaux, avec une limite de sprints
+simultanés par repo. Chaque sprint tourne dans son propre worktree du
+control-plane (artefacts isolés) avec sa part des cœurs du runner, et passe à
+DONE/FAILED en fin de job (rpc finish_sprint). Les claims d'un scheduler arrêté
+sans fin propre sont remis en file après SCHEDULER_STALE_SECONDS sans heartbeat,
+ceux des workflows arrêtés avant la DoD gate après SCHEDULER_WORKFLOW_STALE_SECONDS.
+
+    python ops/scheduler.py run --slots 4 --repo-limit org/app=2
+    python ops/scheduler.py run --once       # un passage : claim, exécution, fin
+    python ops/scheduler.py enqueue --spec-id <uuid> --label S2 --priority 10
+    python ops/scheduler.py status
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import subprocess
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+ROOT = Path(__file__).resolve().parent.parent
+WORK_DIR = Path(os.getenv('SCHEDULER_DIR', '~/.cache/ai-cd/scheduler')).expanduser()
+CPU_COUNT = os.cpu_count() or 1
+# Slots de worker : par défaut un sprint par tranche de 4 cœurs
+DEFAULT_SLOTS = int(os.getenv('SCHEDULER_SLOTS', '0')) or max(1, CPU_COUNT // 4)
+# Sprints RUNNING simultanés par repo pour les claims du scheduler (les sprints lancés
+# par le workflow comptent parmi les RUNNING mais ne sont pas limités)
+DEFAULT_REPO_LIMIT = int(os.getenv('SCHEDULER_REPO_LIMIT', '1'))
+POLL_INTERVAL = float(os.getenv('SCHEDULER_POLL_INTERVAL', '10'))
+# Même plafond que le job plan_build_test du workflow
+JOB_TIMEOUT = float(os.getenv('SCHEDULER_JOB_TIMEOUT', '3600'))
+STALE_SECONDS = int(os.getenv('SCHEDULER_STALE_SECONDS', '300'))
+# Sprints lancés par le workflow (sans heartbeat) : libérés au-delà du timeout du job
+WORKFLOW_STALE_SECONDS = int(os.getenv('SCHEDULER_WORKFLOW_STALE_SECONDS', '4500'))
+MAX_ATTEMPTS = int(os.getenv('SCHEDULER_MAX_ATTEMPTS', '3'))
+# Buckets où les fonctions Edge déposent les specs (simple-webhook, ingest_email)
+SPEC_BUCKETS = [b for b in os.getenv('SPEC_BUCKETS', 'specifications,automation').split(',') if b]
+DEFAULT_COMMAND = os.getenv('SCHEDULER_COMMAND', 'bash scripts/run_sprint.sh')
+
+def log(message):
+    """Journal du scheduler (stderr)"""
+    print(message, file=sys.stderr, flush=True)
+
+def worker_id():
+    """Identifiant du worker enregistré dans sprints.claimed_by"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def parse_repo_limits(values):
+    """['org/a=2', 'org/b=1,org/c=3'] -> {'org/a': 2, 'org/b': 1, 'org/c': 3}"""
+    limits = {}
+    for value in values or []:
+        for item in value.split(','):
+            if not item.strip():
+                continue
+            repo, sep, limit = item.partition('=')
+            if not sep:
+                raise ValueError(f"Limite invalide (attendu org/repo=N): {item}")
+            limits[repo.strip()] = int(limit)
+    return limits
+
+def slot_resources(slots, cpu_count=CPU_COUNT):
+    """
+    Part des cœurs d'un slot, transmise à ops/parallel_tests.py (TEST_WORKERS,
+    E2E_SHARDS) pour que les sprints simultanés ne surchargent pas la machine
+    """
+    cores = max(1, cpu_count // max(1, slots))
+    e2e_shards = max(1, cores // 4)
+    return {'TEST_WORKERS': max(1, cores - e2e_shards), 'E2E_SHARDS': e2e_shards}
+
+def job_env(claim, resources, base=None):
+    """Environnement du job : sprint attribué, repo cible et part des cœurs"""
+    env = dict(os.environ if base is None else base)
+    env.update({
+        'SPRINT_ID': claim['sprint_id'],
+        'SPEC_ID': claim.get('spec_id') or '',
+        'SPRINT_LABEL': claim.get('label') or '',
+        'TARGET_REPO': claim['repo'],
+        'TARGET_BRANCH': claim.get('branch') or 'main',
+        'PROJECT_NAME': env.get('PROJECT_NAME') or claim['repo'],
+    })
+    for name, value in resources.items():
+        # Réglage explicite de l'opérateur prioritaire
+        env.setdefault(name, str(value))
+    env.pop('RUN_ID', None)
+    return env
+
+class Job:
+    """Sprint en cours d'exécution dans un slot"""
+
+    def __init__(self, claim, workdir, process, log_path):
+        self.claim = claim
+        self.workdir = workdir
+        self.process = process
+        self.log_path = log_path
+        self.started = time.monotonic()
+
+    @property
+    def sprint_id(self):
+        return self.claim['sprint_id']
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def kill(self):
+        """Arrête le job et ses sous-processus (groupe de processus dédié)"""
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout=30)
+        except ProcessLookupError:
+            pass
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+
+class Scheduler:
+    """Boucle claim → exécution → fin des sprints sur les slots locaux"""
+
+    def __init__(self, supabase: 'Client', slots=DEFAULT_SLOTS, repo_limits=None,
+                 default_repo_limit=DEFAULT_REPO_LIMIT, command=DEFAULT_COMMAND, work_dir=WORK_DIR,
+                 worker=None, job_timeout=JOB_TIMEOUT, stale_seconds=STALE_SECONDS,
+                 max_attempts=MAX_ATTEMPTS, source=ROOT, workflow_stale_seconds=WORKFLOW_STALE_SECONDS):
+        self.supabase = supabase
+        self.slots = slots
+        self.repo_limits = repo_limits or {}
+        self.default_repo_limit = default_repo_limit
+        self.command = command
+        self.work_dir = Path(work_dir)
+        self.worker = worker or worker_id()
+        self.job_timeout = job_timeout
+        self.stale_seconds = stale_seconds
+        self.workflow_stale_seconds = workflow_stale_seconds
+        self.max_attempts = max_attempts
+        self.source = Path(source)
+        self.resources = slot_resources(slots)
+        self.jobs = {}
+        self.stopping = False
+        self.finished = []
+
+    # --- Control-plane ---
+
+    def claim(self, count):
+        """Sprints attribués à ce worker (au plus count, limites par repo respectées)"""
+        if count <= 0:
+            return []
+        result = self.supabase.rpc('claim_sprints', {
+            'p_worker': self.worker,
+            'p_slots': count,
+            'p_default_repo_limit': self.default_repo_limit,
+            'p_repo_limits': self.repo_limits
+        }).execute()
+        return result.data or []
+
+    def finish(self, sprint_id, state):
+        """Fin atomique du sprint ; False s'il n'est plus RUNNING pour ce worker"""
+        result = self.supabase.rpc('finish_sprint', {
+            'p_sprint_id': sprint_id,
+            'p_worker': self.worker,
+            'p_state': state
+        }).execute()
+        return bool(result.data)
+
+    def heartbeat(self):
+        if not self.jobs:
+            return
+        try:
+            self.supabase.rpc('heartbeat_sprints', {
+                'p_worker': self.worker,
+                'p_sprint_ids': list(self.jobs)
+            }).execute()
+        except Exception as e:
+            log(f"⚠️  Heartbeat échoué: {e}")
+
+    def requeue_stale(self):
+        try:
+            result = self.supabase.rpc('requeue_stale_sprints', {
+                'p_stale_seconds': self.stale_seconds,
+                'p_max_attempts': self.max_attempts,
+                'p_workflow_stale_seconds': self.workflow_stale_seconds
+            }).execute()
+        except Exception as e:
+            log(f"⚠️  Reprise des claims orphelins échouée: {e}")
+            return
+        counts = result.data or {}
+        if counts.get('requeued') or counts.get('failed'):
+            log(f"♻️  Claims orphelins: {counts.get('requeued', 0)} remis en file, "
+                f"{counts.get('failed', 0)} en échec")
+
+    def fetch_spec(self, storage_path):
+        """Contenu YAML de la spec depuis le stockage Supabase, ou None"""
+        for bucket in SPEC_BUCKETS:
+            try:
+                return self.supabase.storage.from_(bucket).download(storage_path)
+            except Exception:
+                continue
+        return None
+
+    # --- Slots locaux ---
+
+    def prepare(self, claim):
+        """Worktree détaché du control-plane propre au sprint, avec sa spec.yaml"""
+        workdir = self.work_dir / 'jobs' / claim['sprint_id']
+        if workdir.exists():
+            subprocess.run(['git', 'worktree', 'remove', '--force', str(workdir)],
+                           cwd=self.source, capture_output=True)
+        workdir.parent.mkdir(parents=True, exist_ok=True)
+        subprocess.run(['git', 'worktree', 'add', '--detach', str(workdir), 'HEAD'],
+                       cwd=self.source, check=True, capture_output=True)
+        if claim.get('storage_path'):
+            content = self.fetch_spec(claim['storage_path'])
+            if content is not None:
+                (workdir / 'spec.yaml').write_bytes(content)
+            else:
+                log(f"⚠️  Spec {claim['storage_path']} introuvable, spec par défaut du sprint")
+        return workdir
+
+    def cleanup(self, workdir):
+        subprocess.run(['git', 'worktree', 'remove', '--force', str(workdir)],
+                       cwd=self.source, capture_output=True)
+        subprocess.run(['git', 'worktree', 'prune'], cwd=self.source, capture_output=True)
+
+    def start(self, claim):
+        sprint_id = claim['sprint_id']
+        try:
+            workdir = self.prepare(claim)
+        except Exception as e:
+            log(f"❌ Préparation du sprint {sprint_id} échouée: {e}")
+            try:
+                self.finish(sprint_id, 'PLANNED')
+            except Exception as e:
+                log(f"⚠️  Sprint {sprint_id} non remis en file: {e}")
+            return None
+        log_dir = self.work_dir / 'logs'
+        log_dir.mkdir(parents=True, exist_ok=True)
+        log_path = log_dir / f"{sprint_id}.log"
+        with open(log_path, 'ab') as output:
+            process = subprocess.Popen(
+                self.command, shell=True, cwd=workdir, env=job_env(claim, self.resources),
+                stdout=output, stderr=subprocess.STDOUT, start_new_session=True
+            )
+        job = Job(claim, workdir, process, log_path)
+        self.jobs[sprint_id] = job
+        log(f"🚀 Sprint {claim.get('label', '')} {sprint_id} ({claim['repo']}, priorité "
+            f"{claim.get('priority', 0)}, tentative {claim.get('attempts', 1)}) → {log_path}")
+        return job
+
+    def reap(self):
+        """Clôture les jobs terminés ou hors délai ; retourne les sprints clos"""
+        done = []
+        for sprint_id, job in list(self.jobs.items()):
+            code = job.process.poll()
+            if code is None and job.elapsed() > self.job_timeout:
+                log(f"⏱️  Sprint {sprint_id} au-delà de {self.job_timeout:.0f}s, arrêt")
+                job.kill()
+                code = job.process.wait()
+            if code is None:
+                continue
+            state = 'DONE' if code == 0 else 'FAILED'
+            done.append(self._close(job, state, code))
+        return done
+
+    def _close(self, job, state, code):
+        del self.jobs[job.sprint_id]
+        try:
+            updated = self.finish(job.sprint_id, state)
+        except Exception as e:
+            log(f"⚠️  Fin du sprint {job.sprint_id} non enregistrée: {e}")
+            updated = False
+        self.cleanup(job.workdir)
+        icon = '✅' if state == 'DONE' else ('↩️ ' if state == 'PLANNED' else '❌')
+        suffix = '' if updated else ' (état déjà fixé par la DoD gate)'
+        log(f"{icon} Sprint {job.sprint_id} {state} (code {code}, {job.elapsed():.0f}s){suffix}")
+        record = {'sprint_id': job.sprint_id, 'repo': job.claim['repo'], 'state': state,
+                  'exit_code': code, 'seconds': round(job.elapsed(), 1)}
+        self.finished.append(record)
+        return record
+
+    def release_all(self):
+        """Arrêt forcé : jobs interrompus et sprints remis en file"""
+        for job in list(self.jobs.values()):
+            job.kill()
+            self._close(job, 'PLANNED', job.process.wait())
+
+    def tick(self):
+        """Un passage : fin des jobs, heartbeat, reprise des orphelins, nouveaux claims"""
+        self.reap()
+        self.heartbeat()
+        if self.stopping:
+            return []
+        self.requeue_stale()
+        started = []
+        try:
+            claims = self.claim(self.slots - len(self.jobs))
+        except Exception as e:
+            log(f"⚠️  Claim des sprints échoué: {e}")
+            claims = []
+        for claim in claims:
+            job = self.start(claim)
+            if job is not None:
+                started.append(job)
+        return started
+
+    def run(self, once=False, poll_interval=POLL_INTERVAL):
+        """
+        Boucle principale. SIGTERM/SIGINT : plus de nouveaux claims, les jobs en cours
+        se terminent ; un second signal les interrompt et remet leurs sprints en file.
+        """
+        def stop(signum, frame):
+            if self.stopping:
+                log("🛑 Second signal : interruption des jobs en cours")
+                self.release_all()
+                sys.exit(1)
+            log(f"🛑 Arrêt demandé : fin des {len(self.jobs)} jobs en cours sans nouveau claim")
+            self.stopping = True
+
+        previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        log(f"🗓️  Scheduler {self.worker} : {self.slots} slots, limite par repo "
+            f"{self.default_repo_limit} {self.repo_limits or ''}, "
+            f"{self.resources['TEST_WORKERS']} workers pytest + {self.resources['E2E_SHARDS']} shards E2E par sprint")
+        try:
+            self.tick()
+            if once:
+                self.stopping = True
+            while self.jobs or not self.stopping:
+                time.sleep(poll_interval)
+                self.tick()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        return self.finished
+
+def enqueue(supabase: 'Client', spec_id, label, priority=0, dod=None):
+    """Ajoute un sprint PLANNED à la file du scheduler"""
+    from create_run_record import DEFAULT_DOD
+    result = supabase.table('sprints').insert({
+        'spec_id': spec_id,
+        'label': label,
+        'priority': priority,
+        'dod_json': dod or DEFAULT_DOD
+    }).execute()
+    return result.data[0]
+
+def queue_status(supabase: 'Client'):
+    """Sprints en file et en cours, avec leur repo"""
+    result = (supabase.table('sprints')
+              .select('id, label, state, priority, claimed_by, claimed_at, heartbeat_at, attempts, created_at, specs(repo)')
+              .in_('state', ['PLANNED', 'RUNNING'])
+              .order('priority', desc=True)
+              .order('created_at')
+              .execute())
+    return result.data or []
+
+def _client():
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
+    if not supabase_url or not supabase_key:
+        log("❌ Variables SUPABASE_URL ou SUPABASE_SERVICE_KEY manquantes")
+        sys.exit(1)
+    from ops_client import get_client
+    return get_client(supabase_url, supabase_key)
+
+def cmd_run(args):
+    try:
+        repo_limits = parse_repo_limits([os.getenv('SCHEDULER_REPO_LIMITS', '')] + args.repo_limit)
+    except ValueError as e:
+        log(f"❌ {e}")
+        return 1
+    scheduler = Scheduler(_client(), slots=args.slots, repo_limits=repo_limits,
+                          default_repo_limit=args.default_repo_limit, command=args.command,
+                          job_timeout=args.job_timeout)
+    finished = scheduler.run(once=args.once, poll_interval=args.poll_interval)
+    print(json.dumps(finished))
+    if args.once and any(record['state'] == 'FAILED' for record in finished):
+        return 1
+    return 0
+
+def cmd_enqueue(args):
+    dod = json.loads(args.dod) if args.dod else None
+    sprint = enqueue(_client(), args.spec_id, args.label, args.priority, dod)
+    log(f"📥 Sprint {sprint['label']} en file (priorité {sprint.get('priority', args.priority)})")
+    print(sprint['id'])
+    return 0
+
+def cmd_status(args):
+    rows = queue_status(_client())
+    if not rows:
+        print("📭 Aucun sprint en file ou en cours")
+        return 0
+    for row in rows:
+        repo = (row.get('specs') or {}).get('repo', '?')
+        owner = f"  {row['claimed_by']}" if row.get('claimed_by') else ''
+        print(f"{row['state']:<8} p{row['priority']:<3} {repo:<40} {row['label']:<6} {row['id']}{owner}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler multi-projets des sprints")
+    subparsers = parser.add_subparsers(dest='command_name', required=True)
+
+    run = subparsers.add_parser('run', help="Exécute les sprints PLANNED sur les slots locaux")
+    run.add_argument('--slots', type=int, default=DEFAULT_SLOTS,
+                     help=f"Sprints simultanés sur ce runner (défaut: SCHEDULER_SLOTS ou {DEFAULT_SLOTS})")
+    run.add_argument('--default-repo-limit', type=int, default=DEFAULT_REPO_LIMIT,
+                     help=f"Sprints RUNNING simultanés par repo (défaut: {DEFAULT_REPO_LIMIT})")
+    run.add_argument('--repo-limit', action='append', default=[],
+                     help="Limite propre à un repo, org/repo=N (répétable ; aussi SCHEDULER_REPO_LIMITS)")
+    run.add_argument('--command', default=DEFAULT_COMMAND,
+                     help=f"Commande d'un sprint, lancée dans son worktree (défaut: {DEFAULT_COMMAND})")
+    run.add_argument('--job-timeout', type=float, default=JOB_TIMEOUT,
+                     help=f"Durée maximale d'un sprint en secondes (défaut: {JOB_TIMEOUT:.0f})")
+    run.add_argument('--poll-interval', type=float, default=POLL_INTERVAL,
+                     help=f"Secondes entre deux passages (défaut: {POLL_INTERVAL:g})")
+    run.add_argument('--once', action='store_true',
+                     help="Un seul claim, attend la fin des sprints pris puis s'arrête")
+    run.set_defaults(handler=cmd_run)
+
+    enqueue_parser = subparsers.add_parser('enqueue', help="Ajoute un sprint PLANNED à la file")
+    enqueue_parser.add_argument('--spec-id', required=True)
+    enqueue_parser.add_argument('--label', default='S1')
+    enqueue_parser.add_argument('--priority', type=int, default=0, help="Plus grand = pris en premier")
+    enqueue_parser.add_argument('--dod', help="Critères DoD JSON (défaut: critères par défaut)")
+    enqueue_parser.set_defaults(handler=cmd_enqueue)
+
+    subparsers.add_parser('status', help="Sprints en file et en cours").set_defaults(handler=cmd_status)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Accès au résumé du run (artifacts/summary.json) partagé par les scripts ops :
+le résumé reste compact, le détail par artefact est ajouté ligne à ligne
+dans un fichier JSON Lines séparé
+"""
+
+import os
+import json
+from pathlib import Path
+
+SUMMARY_FILE = Path('artifacts/summary.json')
+DETAILS_FILE = Path('artifacts/artifacts_detail.jsonl')
+
+def load_summary(path=SUMMARY_FILE):
+    """Charge le résumé, ou un dictionnaire vide s'il n'existe pas encore"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_summary(summary, path=SUMMARY_FILE):
+    """Écrit le résumé en JSON compact, de façon atomique"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(summary, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(tmp, path)
+
+def reset_details(path=DETAILS_FILE):
+    """Vide le fichier de détails (début d'un upload complet)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    open(path, 'w').close()
+
+def append_details(records, path=DETAILS_FILE):
+    """Ajoute des enregistrements au fichier de détails, un objet JSON par ligne"""
+    if not records:
+        return
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False))
+            f.write('\n')
+
+def iter_details(path=DETAILS_FILE):
+    """Parcourt le fichier de détails ligne par ligne (mémoire constante)"""
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
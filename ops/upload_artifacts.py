@@ -6,116 +6,528 @@ et enregistrer les métadonnées en base
 
 import os
 import json
-import glob
+import time
+import hashlib
+import argparse
+import threading
+import functools
 from pathlib import Path
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from artifact_index import plan_uploads
+from artifact_archive import stream_zip
+from resumable_upload import RESUMABLE_THRESHOLD, ResumableUpload
+from upload_manifest import UploadManifest
+from summary import load_summary, save_summary, reset_details, append_details, DETAILS_FILE
+from events import emit
 
-def get_file_size(filepath):
-    """Récupère la taille d'un fichier en bytes"""
-    try:
-        return os.path.getsize(filepath)
-    except:
-        return 0
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Nombre de workers d'upload par défaut (1 = mode séquentiel historique)
+DEFAULT_WORKERS = int(os.getenv('UPLOAD_WORKERS', '8'))
+# Nombre de tentatives par fichier avant abandon
+DEFAULT_RETRIES = int(os.getenv('UPLOAD_RETRIES', '3'))
+# Seuils de flush des insertions groupées dans la table artifacts
+DEFAULT_BATCH_SIZE = int(os.getenv('ARTIFACTS_BATCH_SIZE', '500'))
+DEFAULT_BATCH_BYTES = int(os.getenv('ARTIFACTS_BATCH_BYTES', str(512 * 1024)))
+# Stockage adressé par contenu, partagé entre les runs
+BLOB_PREFIX = 'blobs/sha256'
+# Retour (vrai) de upload_file_to_storage quand l'objet existait déjà (exist_ok)
+ALREADY_STORED = 'exists'
+DEDUP_ENABLED = os.getenv('ARTIFACTS_DEDUP', '1') != '0'
+# Types ou dossiers regroupés en une archive zip streamée (ex: htmlcov,playwright-report,logs)
+DEFAULT_PACKS = os.getenv('ARTIFACTS_PACK', '')
+# Timeout des requêtes d'upload volumineuses (archives, blocs résumables)
+UPLOAD_TIMEOUT = float(os.getenv('UPLOAD_TIMEOUT', '300'))
+# Taille de page PostgREST (réponses plafonnées à 1000 lignes par défaut)
+PAGE_SIZE = 1000
+
+def file_sha256(filepath, chunk_size=1024 * 1024):
+    """Calcule le hash SHA-256 d'un fichier par blocs (mémoire constante)"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def blob_path(digest):
+    """Chemin de stockage d'un blob à partir de son hash"""
+    return f"{BLOB_PREFIX}/{digest[:2]}/{digest}"
+
+def _error_payload(error):
+    """Corps d'erreur Storage : StorageException({'statusCode', 'error', 'message'})"""
+    if error.args and isinstance(error.args[0], dict):
+        return error.args[0]
+    return {}
 
-def upload_file_to_storage(supabase: Client, filepath: str, storage_path: str):
-    """Upload un fichier vers Supabase Storage"""
+def error_status(error):
+    """Code HTTP d'une erreur Storage (SDK) ou httpx (upload résumable), ou None"""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        status = _error_payload(error).get('statusCode')
     try:
-        with open(filepath, 'rb') as f:
-            result = supabase.storage.from_('automation').upload(
-                storage_path, f, file_options={'content-type': 'application/octet-stream'}
-            )
-        return True
-    except Exception as e:
-        print(f"❌ Erreur upload {filepath}: {e}")
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+def is_duplicate_error(error):
+    """
+    Détecte l'erreur renvoyée par Storage quand l'objet existe déjà : statut 409
+    ou erreur "Duplicate", jamais une sous-chaîne du message (taille, chemin, hash)
+    """
+    return error_status(error) == 409 or _error_payload(error).get('error') == 'Duplicate'
+
+def upload_file_to_storage(supabase: 'Client', filepath: str, storage_path: str, retries: int = 1,
+                           exist_ok: bool = False, upsert: bool = False):
+    """
+    Upload un fichier vers Supabase Storage (avec retry et backoff exponentiel).
+    Les gros fichiers passent par l'upload résumable : une nouvelle tentative,
+    ou une étape CI relancée, reprend au dernier bloc confirmé.
+    Retourne True, ALREADY_STORED si l'objet existait déjà (exist_ok), ou False.
+    """
+    resumable = os.path.getsize(filepath) >= RESUMABLE_THRESHOLD
+    for attempt in range(1, retries + 1):
+        try:
+            if resumable:
+                ResumableUpload(
+                    supabase.supabase_url, supabase.supabase_key, 'automation',
+                    filepath, storage_path, upsert=upsert
+                ).run()
+                return True
+            with open(filepath, 'rb') as f:
+                supabase.storage.from_('automation').upload(
+                    storage_path, f, file_options={
+                        'content-type': 'application/octet-stream',
+                        'upsert': 'true' if upsert else 'false'
+                    }
+                )
+            return True
+        except Exception as e:
+            if exist_ok and is_duplicate_error(e):
+                return ALREADY_STORED
+            if attempt < retries:
+                delay = 2 ** (attempt - 1)
+                print(f"⚠️  Upload {filepath} échoué (tentative {attempt}/{retries}): {e} - nouvel essai dans {delay}s")
+                time.sleep(delay)
+            else:
+                print(f"❌ Erreur upload {filepath}: {e}")
+    return False
+
+class UploadProgress:
+    """Suivi thread-safe de la progression et du débit des uploads"""
+
+    def __init__(self, total_files, total_bytes):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.done_files = 0
+        self.done_bytes = 0
+        self.failed_files = 0
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, size, ok):
+        with self._lock:
+            self.done_files += 1
+            if ok:
+                self.done_bytes += size
+            else:
+                self.failed_files += 1
+            return self.done_files
+
+    def elapsed(self):
+        return max(time.monotonic() - self.started_at, 1e-6)
+
+    def throughput(self):
+        """Débit moyen en octets par seconde"""
+        return self.done_bytes / self.elapsed()
+
+    def report(self):
+        return (
+            f"{self.done_files}/{self.total_files} fichiers, "
+            f"{self.done_bytes / 1024:.1f}/{self.total_bytes / 1024:.1f} KiB, "
+            f"{self.throughput() / 1024:.1f} KiB/s, "
+            f"{self.elapsed():.1f}s"
+        )
+
+def upload_stream_to_storage(supabase_url: str, supabase_key: str, storage_path: str, make_stream, retries: int = 1):
+    """
+    Upload en flux (transfer-encoding chunked) vers Supabase Storage : le contenu
+    est produit par make_stream() au fil de l'envoi, sans fichier temporaire
+    """
+    url = f"{supabase_url}/storage/v1/object/automation/{storage_path}"
+    headers = {
+        'Authorization': f'Bearer {supabase_key}',
+        'apikey': supabase_key,
+        'Content-Type': 'application/zip',
+        'x-upsert': 'true'
+    }
+    for attempt in range(1, retries + 1):
+        try:
+            from ops_client import get_http
+            response = get_http().post(url, content=make_stream(), headers=headers, timeout=UPLOAD_TIMEOUT)
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            if attempt < retries:
+                delay = 2 ** (attempt - 1)
+                print(f"⚠️  Upload archive {storage_path} échoué (tentative {attempt}/{retries}): {e} - nouvel essai dans {delay}s")
+                time.sleep(delay)
+            else:
+                print(f"❌ Erreur upload archive {storage_path}: {e}")
+    return False
+
+def store_pack(entry: dict, retries: int, stream_upload):
+    """Génère l'archive zip d'un groupe d'artefacts et l'upload en flux"""
+    index = {}
+    sent = [0]
+
+    def make_stream():
+        # Chaque tentative régénère l'archive depuis le début
+        index.clear()
+        sent[0] = 0
+        for chunk in stream_zip(entry['members'], index):
+            sent[0] += len(chunk)
+            yield chunk
+
+    if not stream_upload(entry['storage_path'], make_stream, retries):
         return False
+    entry['index'] = index
+    entry['archive_size'] = sent[0]
+    return True
+
+class BlobStore:
+    """
+    Stockage adressé par contenu : chaque contenu distinct est uploadé une seule fois
+    sous blobs/sha256/<hash>, et les lignes artifacts de tous les runs pointent dessus
+    """
+
+    def __init__(self, supabase: 'Client', retries=1):
+        self.supabase = supabase
+        self.retries = retries
+        self.known = set()
+        self.uploaded_bytes = 0
+        self.skipped_bytes = 0
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _lock_for(self, digest):
+        with self._lock:
+            return self._locks.setdefault(digest, threading.Lock())
+
+    def store(self, filepath, digest, size):
+        """
+        Upload le blob s'il est absent ; retourne True si le blob est disponible.
+        Pas de listing préalable : un blob déjà présent est signalé par le 409 de l'upload
+        """
+        # Un verrou par hash évite d'uploader deux fois un même contenu dans le run
+        with self._lock_for(digest):
+            if digest in self.known:
+                with self._lock:
+                    self.skipped_bytes += size
+                return True
+
+            stored = upload_file_to_storage(self.supabase, filepath, blob_path(digest), self.retries, exist_ok=True)
+            if not stored:
+                return False
+
+            with self._lock:
+                self.known.add(digest)
+                if stored == ALREADY_STORED:
+                    self.skipped_bytes += size
+                else:
+                    self.uploaded_bytes += size
+            return True
+
+def store_artifact(supabase: 'Client', entry: dict, retries: int, blobs: BlobStore = None, stream_upload=None):
+    """
+    Stocke un artefact : archive streamée pour un groupe, blob partagé si la
+    déduplication est active, sinon chemin du run
+    """
+    if 'members' in entry:
+        return store_pack(entry, retries, stream_upload)
+    if blobs is None:
+        # Chemin propre au run : une étape relancée écrase l'objet au lieu d'échouer
+        return upload_file_to_storage(supabase, entry['filepath'], entry['storage_path'], retries, upsert=True)
+
+    digest = file_sha256(entry['filepath'])
+    entry['sha256'] = digest
+    entry['storage_path'] = blob_path(digest)
+    return blobs.store(entry['filepath'], digest, entry['size'])
+
+class ArtifactBatch:
+    """
+    Tampon des lignes de la table artifacts, insérées en requêtes multi-lignes
+    dès qu'un seuil (nombre de lignes ou taille JSON) est atteint
+    """
+
+    def __init__(self, supabase: 'Client', max_rows=DEFAULT_BATCH_SIZE, max_bytes=DEFAULT_BATCH_BYTES, on_flush=None,
+                 retries=DEFAULT_RETRIES):
+        self.supabase = supabase
+        self.on_flush = on_flush
+        self.max_rows = max(1, max_rows)
+        self.max_bytes = max(1, max_bytes)
+        self.retries = max(1, retries)
+        self.rows = []
+        self.pending_bytes = 0
+        self.inserted_count = 0
+        self.failed_rows = []
+        self.requests = 0
+
+    def add(self, row):
+        self.rows.append(row)
+        self.pending_bytes += len(json.dumps(row))
+        if len(self.rows) >= self.max_rows or self.pending_bytes >= self.max_bytes:
+            self.flush()
+
+    def _insert(self, rows):
+        """Insertion multi-lignes avec nouvelles tentatives ; lève la dernière erreur"""
+        for attempt in range(1, self.retries + 1):
+            self.requests += 1
+            try:
+                return self.supabase.table('artifacts').insert(rows).execute().data or []
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = 2 ** (attempt - 1)
+                print(f"⚠️  Insertion de {len(rows)} artefacts échouée (tentative {attempt}/{self.retries}): {e} "
+                      f"- nouvel essai dans {delay}s")
+                time.sleep(delay)
+
+    def flush(self):
+        """
+        Insère les lignes en attente en une seule requête PostgREST. Si le lot échoue
+        malgré les nouvelles tentatives, les lignes sont insérées une à une : seules
+        les lignes refusées sont perdues, et comptées dans failed_rows
+        """
+        if not self.rows:
+            return []
+        rows, self.rows, self.pending_bytes = self.rows, [], 0
+        try:
+            pairs = list(zip(rows, self._insert(rows)))
+        except Exception as e:
+            print(f"❌ Erreur insertion de {len(rows)} artefacts: {e} - insertion ligne par ligne")
+            pairs = []
+            for row in rows:
+                try:
+                    pairs.extend(zip([row], self._insert([row])))
+                except Exception as row_error:
+                    print(f"❌ Métadonnées de {row['name']} non enregistrées: {row_error}")
+                    self.failed_rows.append(row)
+
+        inserted = []
+        for row, data in pairs:
+            artifact = {'id': data['id']}
+            artifact.update({k: v for k, v in row.items() if k != 'run_id'})
+            inserted.append(artifact)
+        self.inserted_count += len(inserted)
+        print(f"  🗂️  {len(inserted)} artefacts enregistrés (requête #{self.requests})")
+        if self.on_flush:
+            self.on_flush(inserted)
+        return inserted
+
+def add_arguments(parser):
+    """Options de l'upload (partagées avec la sous-commande ops.py upload)"""
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"Nombre d'uploads concurrents (défaut: {DEFAULT_WORKERS}, 1 = séquentiel)")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f"Tentatives par fichier (défaut: {DEFAULT_RETRIES})")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Lignes artifacts par insertion groupée (défaut: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--no-dedup', dest='dedup', action='store_false', default=DEDUP_ENABLED,
+                        help="Désactive le stockage adressé par contenu (ARTIFACTS_DEDUP=0)")
+    parser.add_argument('--pack', default=DEFAULT_PACKS,
+                        help="Types ou dossiers à regrouper en archives zip streamées, "
+                             "séparés par des virgules (ex: htmlcov,playwright-report,logs)")
+
+def parse_packs(value):
+    return {p.strip() for p in value.split(',') if p.strip()}
+
+def fetch_existing(supabase: 'Client', run_id):
+    """Lignes déjà enregistrées pour le run (reprise), toutes pages confondues"""
+    rows = []
+    while True:
+        page = (supabase.table('artifacts').select('id, kind, storage_path, size, name').eq('run_id', run_id)
+                .order('id').range(len(rows), len(rows) + PAGE_SIZE - 1).execute().data or [])
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            break
+    return rows
+
+def upload_artifacts(supabase: 'Client', run_id, args):
+    """
+    Upload les artefacts du run et enregistre leurs métadonnées.
+    Retourne le résumé mis à jour, ou None si artifacts/ n'existe pas.
+    """
+    # Répertoire des artefacts
+    artifacts_dir = Path('artifacts')
+    if not artifacts_dir.exists():
+        print("⚠️  Répertoire artifacts/ non trouvé")
+        return None
+
+    # Découverte en un seul parcours : chaque fichier est classé une seule fois,
+    # les groupes demandés sont regroupés en archives (une requête par archive)
+    entries = plan_uploads(artifacts_dir, run_id, parse_packs(args.pack))
+    for entry in entries:
+        if 'members' in entry:
+            print(f"  🗜️  Archive {entry['rel_path']}: {len(entry['members'])} fichiers")
+    stream_upload = functools.partial(upload_stream_to_storage, supabase.supabase_url, supabase.supabase_key)
+
+    # Reprise : lignes déjà enregistrées pour ce run et manifeste local des uploads
+    existing_by_name = {row['name']: row for row in fetch_existing(supabase, run_id) if row.get('name')}
+    existing_ids = {row['id'] for row in existing_by_name.values()}
+    manifest = UploadManifest(run_id)
+
+    reused_artifacts = []
+    pending = []
+    for entry in entries:
+        record = manifest.lookup(entry, existing_ids)
+        if record:
+            reused_artifacts.append({
+                'id': record['artifact_id'],
+                'kind': record['kind'],
+                'storage_path': record['storage_path'],
+                'size': record['size'],
+                'name': entry['rel_path']
+            })
+        else:
+            pending.append(entry)
+    if reused_artifacts:
+        print(f"  ⏭️  {len(reused_artifacts)} artefacts déjà uploadés (manifeste), ignorés")
+    entries = pending
+    entries_by_name = {entry['rel_path']: entry for entry in entries}
+
+    # Le détail par artefact va dans un fichier JSON Lines, summary.json reste compact
+    reset_details()
+    append_details(reused_artifacts)
+    reused_count = len(reused_artifacts)
+
+    def record_flushed(inserted):
+        for artifact in inserted:
+            manifest.record(entries_by_name[artifact['name']], artifact)
+        manifest.save()
+        append_details(inserted)
+
+    workers = max(1, args.workers)
+    retries = max(1, args.retries)
+    progress = UploadProgress(len(entries), sum(e['size'] for e in entries))
+    batch = ArtifactBatch(supabase, max_rows=args.batch_size, on_flush=record_flushed, retries=retries)
+    blobs = BlobStore(supabase, retries) if args.dedup else None
+
+    print(f"📦 Upload des artefacts pour le run {run_id} ({len(entries)} fichiers, {workers} workers)...")
+
+    # Upload concurrent : le temps total dépend de la bande passante, pas du nombre de fichiers.
+    # Les métadonnées sont enregistrées par lots depuis le thread principal.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(store_artifact, supabase, entry, retries, blobs, stream_upload): entry
+            for entry in entries
+        }
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                ok = future.result()
+            except Exception as e:
+                # Fichier disparu ou illisible (hash), erreur inattendue d'un worker :
+                # l'upload des autres fichiers et le flush final continuent
+                print(f"❌ Erreur upload {entry['rel_path']}: {e}")
+                ok = False
+
+            done = progress.record(entry['size'], ok)
+            if ok:
+                print(f"  📤 {entry['rel_path']} -> {entry['storage_path']}")
+                row = {
+                    'run_id': run_id,
+                    'kind': entry['kind'],
+                    'storage_path': entry['storage_path'],
+                    'size': entry['size'],
+                    'name': entry['rel_path']
+                }
+                if 'sha256' in entry:
+                    row['sha256'] = entry['sha256']
+                if 'index' in entry:
+                    # Index des offsets des membres pour une extraction individuelle (requête Range)
+                    row['size'] = entry['archive_size']
+                    row['index_json'] = entry['index']
+
+                previous = existing_by_name.get(entry['rel_path'])
+                if previous:
+                    # Ligne déjà présente pour ce run (manifeste perdu ou fichier modifié) :
+                    # mise à jour si nécessaire, jamais de doublon
+                    if previous['storage_path'] != row['storage_path'] or previous['size'] != row['size']:
+                        supabase.table('artifacts').update(row).eq('id', previous['id']).execute()
+                    artifact = {k: v for k, v in row.items() if k != 'run_id'}
+                    artifact['id'] = previous['id']
+                    reused_count += 1
+                    append_details([artifact])
+                    manifest.record(entry, artifact)
+                else:
+                    batch.add(row)
+            if done % 25 == 0 or done == progress.total_files:
+                print(f"  ⏱️  Progression: {progress.report()}")
+
+    # Flush final des lignes restantes
+    batch.flush()
+    manifest.save()
+    uploaded_count = reused_count + batch.inserted_count
+
+    # Mettre à jour le résumé (le détail reste dans artifacts_detail.jsonl)
+    summary = load_summary()
+    summary.pop('artifacts_detail', None)
+    summary['uploaded_artifacts'] = uploaded_count
+    summary['artifacts_detail_file'] = DETAILS_FILE.name
+    summary['upload_stats'] = {
+        'files': progress.total_files,
+        'failed': progress.failed_files + len(batch.failed_rows),
+        'failed_rows': len(batch.failed_rows),
+        'bytes': progress.done_bytes,
+        'seconds': round(progress.elapsed(), 2),
+        'workers': workers,
+        'insert_requests': batch.requests
+    }
+    if blobs is not None:
+        summary['upload_stats']['dedup_uploaded_bytes'] = blobs.uploaded_bytes
+        summary['upload_stats']['dedup_skipped_bytes'] = blobs.skipped_bytes
+        print(f"♻️  Déduplication: {blobs.skipped_bytes / 1024:.1f} KiB déjà présents, "
+              f"{blobs.uploaded_bytes / 1024:.1f} KiB uploadés")
+
+    # Sauvegarder le résumé mis à jour
+    save_summary(summary)
+
+    print(f"✅ {uploaded_count} artefacts uploadés ({progress.report()})")
+    if progress.failed_files:
+        print(f"⚠️  {progress.failed_files} fichiers en échec")
+    if batch.failed_rows:
+        print(f"❌ {len(batch.failed_rows)} artefacts uploadés sans métadonnées en base")
+
+    # Enregistrer un événement de statut
+    emit(supabase, run_id, 'ARTIFACTS_UPLOADED', f'{uploaded_count} artefacts uploadés')
+
+    return summary
 
 def main():
+    parser = argparse.ArgumentParser(description="Upload des artefacts vers Supabase B")
+    add_arguments(parser)
+    args = parser.parse_args()
+
     # Variables d'environnement
     supabase_url = os.getenv('SUPABASE_URL')
     supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
     run_id = os.getenv('RUN_ID')
-    
+
     if not supabase_url or not supabase_key or not run_id:
         print("❌ Variables SUPABASE_URL, SUPABASE_SERVICE_KEY ou RUN_ID manquantes")
         exit(1)
-    
-    # Connexion Supabase
-    supabase: Client = create_client(supabase_url, supabase_key)
-    
-    # Répertoire des artefacts
-    artifacts_dir = Path('artifacts')
-    if not artifacts_dir.exists():
-        print("⚠️  Répertoire artifacts/ non trouvé")
-        return
-    
-    # Mapping des types d'artefacts
-    artifact_patterns = {
-        'junit': ['**/junit*.xml', '**/test-results.xml', '**/pytest.xml'],
-        'coverage': ['**/coverage*.xml', '**/coverage*.json', '**/htmlcov/**'],
-        'lighthouse': ['**/lighthouse*.json', '**/lh-*.json'],
-        'logs': ['**/logs/**', '**/*.log']
-    }
-    
-    uploaded_artifacts = []
-    
-    print(f"📦 Upload des artefacts pour le run {run_id}...")
-    
-    for artifact_kind, patterns in artifact_patterns.items():
-        for pattern in patterns:
-            files = glob.glob(str(artifacts_dir / pattern), recursive=True)
-            
-            for filepath in files:
-                if os.path.isfile(filepath):
-                    # Chemin relatif depuis artifacts/
-                    rel_path = os.path.relpath(filepath, artifacts_dir)
-                    storage_path = f"reports/{run_id}/{artifact_kind}/{rel_path}"
-                    
-                    print(f"  📤 {rel_path} -> {storage_path}")
-                    
-                    # Upload vers Supabase Storage
-                    if upload_file_to_storage(supabase, filepath, storage_path):
-                        # Enregistrer en base
-                        artifact_data = {
-                            'run_id': run_id,
-                            'kind': artifact_kind,
-                            'storage_path': storage_path,
-                            'size': get_file_size(filepath)
-                        }
-                        
-                        result = supabase.table('artifacts').insert(artifact_data).execute()
-                        if result.data:
-                            artifact_id = result.data[0]['id']
-                            uploaded_artifacts.append({
-                                'id': artifact_id,
-                                'kind': artifact_kind,
-                                'storage_path': storage_path,
-                                'size': get_file_size(filepath)
-                            })
-                            print(f"    ✅ Enregistré: {artifact_id}")
-    
-    # Mettre à jour le résumé
-    summary_file = artifacts_dir / 'summary.json'
-    if summary_file.exists():
-        with open(summary_file, 'r') as f:
-            summary = json.load(f)
-    else:
-        summary = {}
-    
-    summary['uploaded_artifacts'] = len(uploaded_artifacts)
-    summary['artifacts_detail'] = uploaded_artifacts
-    
-    # Sauvegarder le résumé mis à jour
-    with open(summary_file, 'w') as f:
-        json.dump(summary, f, indent=2)
-    
-    print(f"✅ {len(uploaded_artifacts)} artefacts uploadés")
-    
-    # Enregistrer un événement de statut
-    supabase.table('status_events').insert({
-        'run_id': run_id,
-        'phase': 'ARTIFACTS_UPLOADED',
-        'message': f'{len(uploaded_artifacts)} artefacts uploadés'
-    }).execute()
+
+    # Connexion Supabase (session partagée keep-alive, retry sur 429/5xx)
+    from ops_client import get_client
+    supabase = get_client(supabase_url, supabase_key)
+
+    summary = upload_artifacts(supabase, run_id, args)
+    # Artefacts stockés mais absents de la table artifacts : run incomplet
+    if summary is not None and summary['upload_stats']['failed_rows']:
+        exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
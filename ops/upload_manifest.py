@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Manifeste local des uploads : garde trace, pour le run courant, des artefacts
+déjà stockés et enregistrés afin qu'une étape relancée ne refasse que le travail manquant
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+MANIFEST_FILE = Path('artifacts/.upload_manifest.json')
+
+def fingerprint(entry):
+    """
+    Empreinte rapide d'une entrée du manifeste d'artefacts (taille + mtime) ;
+    pour une archive, empreinte combinée de tous ses membres
+    """
+    if 'members' in entry:
+        digest = hashlib.sha1()
+        for member in entry['members']:
+            digest.update(f"{member['rel_path']}:{fingerprint(member)}\n".encode())
+        return digest.hexdigest()
+    return f"{entry['size']}:{entry.get('mtime', 0)}"
+
+class UploadManifest:
+    """Enregistrements par chemin relatif : empreinte, hash, chemin de stockage, id artifacts"""
+
+    def __init__(self, run_id, path=MANIFEST_FILE):
+        self.run_id = run_id
+        self.path = Path(path)
+        self.records = {}
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        # Un manifeste d'un autre run ne sert à rien (les lignes artifacts sont par run)
+        if data.get('run_id') == self.run_id:
+            self.records = data.get('artifacts', {})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'run_id': self.run_id, 'artifacts': self.records}))
+        os.replace(tmp, self.path)
+
+    def lookup(self, entry, existing_ids):
+        """Retourne l'enregistrement si l'artefact est inchangé et sa ligne toujours en base"""
+        record = self.records.get(entry['rel_path'])
+        if not record or record.get('fingerprint') != fingerprint(entry):
+            return None
+        if record.get('artifact_id') not in existing_ids:
+            return None
+        return record
+
+    def record(self, entry, artifact):
+        self.records[entry['rel_path']] = {
+            'fingerprint': fingerprint(entry),
+            'size': entry['size'],
+            'mtime': entry.get('mtime'),
+            'sha256': entry.get('sha256'),
+            'storage_path': artifact['storage_path'],
+            'artifact_id': artifact['id'],
+            'kind': artifact['kind']
+        }
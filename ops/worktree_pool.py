@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Pool persistant de dépôts cibles sur le runner : un miroir bare partiel par repo
+(git fetch --filter=blob:none, contenus chargés à la demande) et des
+worktrees « chauds » réutilisés d'un sprint à l'autre. Un sprint obtient un
+worktree propre sur la branche cible à jour (checkout -B + clean) au lieu d'un
+git clone complet ; les miroirs inutilisés et les worktrees en surplus sont
+supprimés par gc.
+
+    WORK_DIR=$(python ops/worktree_pool.py acquire org/repo --branch main --new-branch feature/x)
+    python ops/worktree_pool.py release "$WORK_DIR"
+    python ops/worktree_pool.py gc
+
+Le jeton GITHUB_TOKEN éventuel est passé à chaque commande git (en-tête HTTP),
+jamais écrit dans la configuration des miroirs.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import fcntl
+import shutil
+import argparse
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+POOL_DIR = Path(os.getenv('WORKTREE_POOL_DIR', '~/.cache/ai-cd/worktrees')).expanduser()
+# Worktrees libres conservés par repo
+WARM_WORKTREES = int(os.getenv('WORKTREE_POOL_WARM', '2'))
+# Pas de nouveau fetch si le miroir a été rafraîchi il y a moins de N secondes
+FETCH_TTL_SECONDS = int(os.getenv('WORKTREE_POOL_FETCH_TTL', '0'))
+# Miroir supprimé après N jours sans sprint
+MAX_IDLE_DAYS = float(os.getenv('WORKTREE_POOL_MAX_IDLE_DAYS', '14'))
+# Bail d'un worktree jamais rendu (job interrompu) expiré après N heures
+LEASE_HOURS = float(os.getenv('WORKTREE_POOL_LEASE_HOURS', '6'))
+
+LAST_USED = 'ai-cd-last-used'
+LAST_FETCH = 'ai-cd-last-fetch'
+
+def log(message):
+    # stdout est réservé au chemin du worktree (lu par cc_plan_and_code.sh)
+    print(message, file=sys.stderr)
+
+def repo_slug(repo):
+    """'org/repo' -> 'org__repo' (nom de répertoire)"""
+    return repo.strip('/').removesuffix('.git').replace('/', '__')
+
+def default_url(repo):
+    return f'https://github.com/{repo.strip("/").removesuffix(".git")}.git'
+
+def _auth_args():
+    token = os.getenv('GITHUB_TOKEN')
+    if not token:
+        return []
+    basic = base64.b64encode(f'x-access-token:{token}'.encode()).decode()
+    return ['-c', f'http.https://github.com/.extraheader=AUTHORIZATION: basic {basic}']
+
+def git(*args, cwd=None, check=True):
+    """git avec authentification éventuelle, sans invite interactive"""
+    result = subprocess.run(['git', *_auth_args(), *map(str, args)], cwd=cwd, capture_output=True, text=True,
+                            env={**os.environ, 'GIT_TERMINAL_PROMPT': '0'})
+    if check and result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(map(str, args))}: {result.stderr.strip()}")
+    return result
+
+class Pool:
+    """Miroirs, worktrees et baux d'un répertoire de pool"""
+
+    def __init__(self, root=None):
+        self.root = Path(root or POOL_DIR)
+
+    def mirror(self, slug):
+        return self.root / 'mirrors' / f'{slug}.git'
+
+    def worktrees(self, slug):
+        return self.root / 'worktrees' / slug
+
+    def lease_file(self, worktree):
+        worktree = Path(worktree)
+        return self.root / 'leases' / worktree.parent.name / f'{worktree.name}.json'
+
+    @contextmanager
+    def locked(self, slug):
+        """Verrou par repo : acquisitions, retours et gc concurrents sérialisés"""
+        path = self.root / 'locks' / f'{slug}.lock'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def ensure_mirror(self, slug, url):
+        """
+        Miroir bare partiel ; les branches distantes vont dans refs/remotes/origin
+        pour que fetch --prune ne touche pas aux branches locales des sprints
+        """
+        mirror = self.mirror(slug)
+        if (mirror / LAST_FETCH).exists():
+            return mirror, False
+        if mirror.exists():
+            shutil.rmtree(mirror)  # création interrompue avant le premier fetch
+        mirror.parent.mkdir(parents=True, exist_ok=True)
+        # Équivalent de clone --bare --filter=blob:none, avec la refspec d'un clone classique
+        git('init', '--quiet', '--bare', mirror)
+        git('remote', 'add', 'origin', url, cwd=mirror)
+        git('config', 'remote.origin.promisor', 'true', cwd=mirror)
+        git('config', 'remote.origin.partialclonefilter', 'blob:none', cwd=mirror)
+        return mirror, True
+
+    def fetch(self, mirror, ttl=FETCH_TTL_SECONDS, now=None):
+        """Rafraîchit le miroir (contenus toujours à la demande), sauf fetch récent"""
+        stamp = mirror / LAST_FETCH
+        now = now or time.time()
+        if ttl and stamp.exists() and now - stamp.stat().st_mtime < ttl:
+            return False
+        git('fetch', '--filter=blob:none', '--prune', '--no-tags', 'origin', cwd=mirror)
+        stamp.touch()
+        return True
+
+    def lease(self, worktree):
+        try:
+            return json.loads(self.lease_file(worktree).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def is_leased(self, worktree, now=None):
+        lease = self.lease(worktree)
+        if lease is None:
+            return False
+        return (now or time.time()) - lease.get('acquired_at', 0) < LEASE_HOURS * 3600
+
+    def free_worktrees(self, slug, now=None):
+        base = self.worktrees(slug)
+        if not base.is_dir():
+            return []
+        return sorted(wt for wt in base.iterdir()
+                      if wt.is_dir() and (wt / '.git').exists() and not self.is_leased(wt, now))
+
+    def _new_worktree_path(self, slug):
+        base = self.worktrees(slug)
+        base.mkdir(parents=True, exist_ok=True)
+        index = 0
+        while (base / f'wt-{index}').exists():
+            index += 1
+        return base / f'wt-{index}'
+
+    def acquire(self, repo, branch='main', new_branch=None, url=None, run_id=None, ttl=FETCH_TTL_SECONDS):
+        """
+        Worktree propre sur origin/<branch> à jour, sur la branche new_branch si
+        fournie (tête détachée sinon). Réutilise un worktree libre si possible
+        """
+        slug = repo_slug(repo)
+        with self.locked(slug):
+            mirror, created = self.ensure_mirror(slug, url or default_url(repo))
+            self.fetch(mirror, 0 if created else ttl)
+            (mirror / LAST_USED).touch()
+            start = f'refs/remotes/origin/{branch}'
+
+            free = self.free_worktrees(slug)
+            if free:
+                worktree = free[0]
+                previous = self.lease(worktree)
+                if new_branch:
+                    git('checkout', '--force', '-B', new_branch, start, cwd=worktree)
+                else:
+                    git('checkout', '--force', '--detach', start, cwd=worktree)
+                git('clean', '-ffdxq', cwd=worktree)
+                if previous and previous.get('branch') and previous['branch'] != new_branch:
+                    git('branch', '-D', previous['branch'], cwd=mirror, check=False)
+                reused = True
+            else:
+                git('worktree', 'prune', cwd=mirror)
+                worktree = self._new_worktree_path(slug)
+                if new_branch:
+                    git('worktree', 'add', '--force', '-B', new_branch, worktree, start, cwd=mirror)
+                else:
+                    git('worktree', 'add', '--detach', worktree, start, cwd=mirror)
+                reused = False
+
+            lease_file = self.lease_file(worktree)
+            lease_file.parent.mkdir(parents=True, exist_ok=True)
+            lease_file.write_text(json.dumps({
+                'repo': repo, 'branch': new_branch, 'base': branch, 'run_id': run_id,
+                'acquired_at': time.time(),
+            }))
+        return worktree, reused
+
+    def release(self, worktree):
+        """Rend le worktree au pool (bail supprimé, contenu nettoyé au prochain usage)"""
+        worktree = Path(worktree).resolve()
+        slug = worktree.parent.name
+        with self.locked(slug):
+            lease_file = self.lease_file(worktree)
+            lease = self.lease(worktree) or {}
+            if worktree.exists():
+                # La branche du sprint (déjà poussée) n'est plus référencée par le worktree
+                git('checkout', '--force', '--detach', cwd=worktree, check=False)
+                if lease.get('branch'):
+                    git('branch', '-D', lease['branch'], cwd=worktree, check=False)
+            lease_file.unlink(missing_ok=True)
+
+    def gc(self, warm=WARM_WORKTREES, max_idle_days=MAX_IDLE_DAYS, now=None):
+        """
+        Supprime les miroirs inutilisés depuis max_idle_days (sans bail actif) et,
+        pour les autres, les worktrees libres au-delà de warm ; expire les baux
+        abandonnés. Retourne {'mirrors': [...], 'worktrees': [...]} supprimés
+        """
+        now = now or time.time()
+        removed = {'mirrors': [], 'worktrees': []}
+        mirrors = self.root / 'mirrors'
+        if not mirrors.is_dir():
+            return removed
+        for mirror in sorted(mirrors.glob('*.git')):
+            slug = mirror.name[:-len('.git')]
+            with self.locked(slug):
+                base = self.worktrees(slug)
+                worktrees = sorted(wt for wt in base.iterdir() if wt.is_dir()) if base.is_dir() else []
+                busy = [wt for wt in worktrees if self.is_leased(wt, now)]
+                stamp = mirror / LAST_USED
+                last_used = stamp.stat().st_mtime if stamp.exists() else mirror.stat().st_mtime
+                if not busy and now - last_used > max_idle_days * 86400:
+                    shutil.rmtree(base, ignore_errors=True)
+                    shutil.rmtree(self.root / 'leases' / slug, ignore_errors=True)
+                    shutil.rmtree(mirror, ignore_errors=True)
+                    removed['mirrors'].append(slug)
+                    continue
+
+                for worktree in worktrees:
+                    if worktree not in busy:
+                        self.lease_file(worktree).unlink(missing_ok=True)  # bail expiré
+                for worktree in [wt for wt in worktrees if wt not in busy][warm:]:
+                    git('worktree', 'remove', '--force', worktree, cwd=mirror, check=False)
+                    shutil.rmtree(worktree, ignore_errors=True)
+                    removed['worktrees'].append(str(worktree))
+                git('worktree', 'prune', cwd=mirror, check=False)
+                git('gc', '--auto', '--quiet', cwd=mirror, check=False)
+        return removed
+
+    def status(self):
+        """Miroirs avec dernière utilisation, worktrees et baux"""
+        rows = []
+        for mirror in sorted((self.root / 'mirrors').glob('*.git')):
+            slug = mirror.name[:-len('.git')]
+            stamp = mirror / LAST_USED
+            base = self.worktrees(slug)
+            worktrees = sorted(wt for wt in base.iterdir() if wt.is_dir()) if base.is_dir() else []
+            rows.append({
+                'repo': slug.replace('__', '/'),
+                'last_used': stamp.stat().st_mtime if stamp.exists() else None,
+                'worktrees': len(worktrees),
+                'leased': sum(self.is_leased(wt) for wt in worktrees),
+            })
+        return rows
+
+def cmd_acquire(args):
+    started = time.monotonic()
+    try:
+        worktree, reused = Pool().acquire(args.repo, args.branch, args.new_branch, args.url,
+                                          os.getenv('RUN_ID'), args.fetch_ttl)
+    except RuntimeError as e:
+        log(f"❌ Worktree non obtenu pour {args.repo}: {e}")
+        return 1
+    log(f"🌳 Worktree {'réutilisé' if reused else 'créé'} pour {args.repo} ({args.branch}) "
+        f"en {time.monotonic() - started:.2f}s : {worktree}")
+    print(worktree)
+    return 0
+
+def cmd_release(args):
+    Pool().release(args.worktree)
+    log(f"↩️  Worktree rendu au pool : {args.worktree}")
+    return 0
+
+def cmd_gc(args):
+    removed = Pool().gc(args.warm, args.max_idle_days)
+    for slug in removed['mirrors']:
+        log(f"🧹 Miroir inutilisé supprimé : {slug.replace('__', '/')}")
+    if removed['worktrees']:
+        log(f"🧹 {len(removed['worktrees'])} worktrees en surplus supprimés")
+    return 0
+
+def cmd_status(args):
+    rows = Pool().status()
+    print(f"🌳 {POOL_DIR} : {len(rows)} miroirs")
+    for row in rows:
+        used = (datetime.fromtimestamp(row['last_used'], timezone.utc).strftime('%Y-%m-%d %H:%M')
+                if row['last_used'] else '-')
+        print(f"   {row['repo']:<40} {used}  {row['worktrees']} worktrees ({row['leased']} en cours)")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Pool de miroirs et worktrees des dépôts cibles")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    acquire = subparsers.add_parser('acquire', help="Worktree propre sur la branche cible (affiche son chemin)")
+    acquire.add_argument('repo', help="Dépôt cible (org/repo)")
+    acquire.add_argument('--branch', default='main', help="Branche cible (défaut: main)")
+    acquire.add_argument('--new-branch', help="Branche de travail créée depuis la branche cible")
+    acquire.add_argument('--url', help="URL de clone (défaut: https://github.com/<repo>.git)")
+    acquire.add_argument('--fetch-ttl', type=int, default=FETCH_TTL_SECONDS,
+                         help=f"Pas de fetch si le miroir a moins de N secondes (défaut: {FETCH_TTL_SECONDS})")
+    acquire.set_defaults(handler=cmd_acquire)
+
+    release = subparsers.add_parser('release', help="Rend un worktree au pool")
+    release.add_argument('worktree')
+    release.set_defaults(handler=cmd_release)
+
+    gc = subparsers.add_parser('gc', help="Supprime les miroirs inutilisés et les worktrees en surplus")
+    gc.add_argument('--warm', type=int, default=WARM_WORKTREES,
+                    help=f"Worktrees libres conservés par repo (défaut: {WARM_WORKTREES})")
+    gc.add_argument('--max-idle-days', type=float, default=MAX_IDLE_DAYS,
+                    help=f"Jours sans sprint avant suppression d'un miroir (défaut: {MAX_IDLE_DAYS:g})")
+    gc.set_defaults(handler=cmd_gc)
+
+    subparsers.add_parser('status', help="État du pool").set_defaults(handler=cmd_status)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+if __name__ == '__main__':
+    main()
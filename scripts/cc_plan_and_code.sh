@@ -57,15 +57,30 @@ echo "✅ Archon MCP Server accessible"
 if [[ "$TARGET_REPO" != "${GITHUB_REPOSITORY:-}" ]] && [[ "$TARGET_REPO" != "$(basename $(git config --get remote.origin.url 2>/dev/null || echo '') .git)" ]]; then
     echo "🔄 Configuration pour repository externe: $TARGET_REPO"
     
-    # Create workspace for target project
-    WORK_DIR="/tmp/workspace-$(basename $TARGET_REPO)-$$"
-    mkdir -p "$WORK_DIR"
+    SPRINT_BRANCH="feature/ai-cd-$(date +%s)"
+    WORKTREE_POOL=${WORKTREE_POOL:-1}
+    POOLED_WORKTREE=false
     
-    echo "📥 Clonage du repository cible..."
-    if [[ -n "${GITHUB_TOKEN:-}" ]]; then
-        git clone "https://$GITHUB_TOKEN@github.com/$TARGET_REPO.git" "$WORK_DIR"
+    # Worktree chaud depuis le miroir partiel du pool, clone complet en secours
+    if [[ "$WORKTREE_POOL" == "1" ]] && WORK_DIR=$(python3 "$ORIGINAL_WORKSPACE/ops/worktree_pool.py" acquire "$TARGET_REPO" --branch "$TARGET_BRANCH" --new-branch "$SPRINT_BRANCH"); then
+        POOLED_WORKTREE=true
+        release_worktree() {
+            cd "$ORIGINAL_WORKSPACE"
+            python3 ops/worktree_pool.py release "$WORK_DIR" || true
+            python3 ops/worktree_pool.py gc || true
+        }
+        trap release_worktree EXIT
     else
-        git clone "https://github.com/$TARGET_REPO.git" "$WORK_DIR"
+        # Create workspace for target project
+        WORK_DIR="/tmp/workspace-$(basename $TARGET_REPO)-$$"
+        mkdir -p "$WORK_DIR"
+        
+        echo "📥 Clonage du repository cible..."
+        if [[ -n "${GITHUB_TOKEN:-}" ]]; then
+            git clone "https://$GITHUB_TOKEN@github.com/$TARGET_REPO.git" "$WORK_DIR"
+        else
+            git clone "https://github.com/$TARGET_REPO.git" "$WORK_DIR"
+        fi
     fi
     
     # Change to target repository workspace
@@ -78,8 +93,10 @@ if [[ "$TARGET_REPO" != "${GITHUB_REPOSITORY:-}" ]] && [[ "$TARGET_REPO" != "$(b
     git config user.name "AI Continuous Delivery"
     git config user.email "ai-cd@github-actions.noreply.com"
     
-    # Create or checkout target branch
-    git checkout -b "feature/ai-cd-$(date +%s)" "$TARGET_BRANCH" 2>/dev/null || git checkout "$TARGET_BRANCH"
+    # Create or checkout target branch (déjà fait par le pool)
+    if [[ "$POOLED_WORKTREE" != "true" ]]; then
+        git checkout -b "$SPRINT_BRANCH" "$TARGET_BRANCH" 2>/dev/null || git checkout "$TARGET_BRANCH"
+    fi
     
     echo "✅ Repository cible configuré dans $WORK_DIR"
     echo "🌿 Branche courante: $(git branch --show-current)"
@@ -391,7 +408,12 @@ Co-Authored-By: Claude <noreply@anthropic.com>" || echo "⚠️ Commit échoué"
     
     # Push to target repository
     CURRENT_BRANCH=$(git branch --show-current)
-    git push origin "$CURRENT_BRANCH" && echo "✅ Changements pushés vers $TARGET_REPO" || echo "❌ Push échoué vers $TARGET_REPO"
+    PUSH_REMOTE=origin
+    if [[ "$POOLED_WORKTREE" == "true" ]] && [[ -n "${GITHUB_TOKEN:-}" ]]; then
+        # Le miroir du pool ne conserve pas le token
+        PUSH_REMOTE="https://$GITHUB_TOKEN@github.com/$TARGET_REPO.git"
+    fi
+    git push "$PUSH_REMOTE" "$CURRENT_BRANCH" && echo "✅ Changements pushés vers $TARGET_REPO" || echo "❌ Push échoué vers $TARGET_REPO"
     
     # Copy artifacts back to original workspace for GitHub Actions
     mkdir -p "$ORIGINAL_WORKSPACE/artifacts"
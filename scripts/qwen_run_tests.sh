@@ -11,8 +11,9 @@ RUN_ID=${RUN_ID:-""}
 ANTHROPIC_BASE_URL=${ANTHROPIC_BASE_URL:-""}
 ANTHROPIC_AUTH_TOKEN=${ANTHROPIC_AUTH_TOKEN:-""}
 
-# Créer les répertoires nécessaires
+# Créer les répertoires nécessaires (résumé repris de zéro à chaque run)
 mkdir -p artifacts logs
+rm -f artifacts/summary.json
 
 # Fonction de logging avec timestamp
 log() {
@@ -35,40 +36,195 @@ fi
 
 # Installation des dépendances si nécessaire
 log "📦 Installation des dépendances..."
+OPS_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../ops" && pwd)"
+PARALLEL_TESTS=${PARALLEL_TESTS:-1}
+
+# Cache local des environnements (ops/env_cache.py) : venv, node_modules et navigateurs
+# réutilisés tant que requirements.txt, package-lock.json et Playwright ne changent pas ;
+# ENV_CACHE=0 pour tout réinstaller
+ENV_CACHE_VENV=off
+ENV_CACHE_NODE=off
+ENV_CACHE_BROWSERS=off
+if [[ "${ENV_CACHE:-1}" != "0" ]]; then
+    CACHE_ARGS=()
+    if [[ "$PARALLEL_TESTS" != "0" ]]; then
+        # Navigateurs installés pendant pytest (ops/parallel_tests.py), validés en fin de run
+        CACHE_ARGS=(--defer browsers)
+    fi
+    CACHE_EXPORTS=$(python3 "$OPS_DIR/env_cache.py" setup "${CACHE_ARGS[@]}" 2>>logs/qwen_tests.log) || CACHE_EXPORTS=""
+    eval "$CACHE_EXPORTS"
+    log "💾 Cache: venv=$ENV_CACHE_VENV node=$ENV_CACHE_NODE navigateurs=$ENV_CACHE_BROWSERS"
+fi
+cached() {
+    [[ "$1" == "hit" || "$1" == "built" ]]
+}
 
 # Python
-if [[ -f "requirements.txt" ]]; then
-    pip install -r requirements.txt
-elif [[ -f "pyproject.toml" ]]; then
-    pip install -e . || log "⚠️ Installation Python partiellement échouée"
-fi
+if ! cached "$ENV_CACHE_VENV"; then
+    if [[ -f "requirements.txt" ]]; then
+        pip install -r requirements.txt
+    elif [[ -f "pyproject.toml" ]]; then
+        pip install -e . || log "⚠️ Installation Python partiellement échouée"
+    fi
 
-# Dépendances de test Python essentielles
-pip install pytest pytest-cov pytest-html pytest-xvfb || log "⚠️ Installation pytest partiellement échouée"
+    # Dépendances de test Python essentielles
+    pip install pytest pytest-cov pytest-html pytest-xvfb || log "⚠️ Installation pytest partiellement échouée"
+fi
 
 # Node.js / Playwright
-if [[ -f "package.json" ]]; then
+if [[ -f "package.json" ]] && ! cached "$ENV_CACHE_NODE"; then
     npm ci || npm install || log "⚠️ Installation npm partiellement échouée"
 fi
 
-# Playwright
-if command -v npx &> /dev/null; then
-    npx playwright install --with-deps || log "⚠️ Installation Playwright partiellement échouée"
+# Playwright (en mode parallèle, installé pendant les tests unitaires par ops/parallel_tests.py)
+# PLAYWRIGHT_INSTALLED : false (à installer), true (cache ou installation réussie),
+# failed (installation en échec : pas de nouvel essai, navigateurs jamais mis en cache)
+PLAYWRIGHT_INSTALLED=false
+if cached "$ENV_CACHE_BROWSERS"; then
+    PLAYWRIGHT_INSTALLED=true
+fi
+install_playwright() {
+    if [[ "$PLAYWRIGHT_INSTALLED" == "false" ]] && command -v npx &> /dev/null; then
+        if npx playwright install --with-deps; then
+            PLAYWRIGHT_INSTALLED=true
+        else
+            log "⚠️ Installation Playwright partiellement échouée"
+            PLAYWRIGHT_INSTALLED=failed
+        fi
+    fi
+}
+if [[ "$PARALLEL_TESTS" == "0" ]]; then
+    install_playwright
 fi
 
+# Sélection des tests impactés par le diff de la branche (ops/impacted_tests.py) :
+# full = run complet (carte absente/périmée, planifié), impacted = tests listés, none = aucun
+IMPACT_BASE="origin/${TARGET_BRANCH:-main}"
+IMPACT_MODE=$(python3 "$OPS_DIR/impacted_tests.py" select --base "$IMPACT_BASE" --fetch 2>>logs/qwen_tests.log || echo "full")
+log "🎯 Sélection des tests: $IMPACT_MODE (base: $IMPACT_BASE)"
+
+# Exécution parallèle (ops/parallel_tests.py) : shards pytest équilibrés par durée
+# historique et shards Playwright simultanés ; PARALLEL_TESTS=0 pour le mode séquentiel
+E2E_PRESENT=false
+if [[ -d "e2e" ]] && find e2e -name "*.spec.*" | grep -q .; then
+    E2E_PRESENT=true
+fi
+E2E_ARGS=()
+if [[ "$IMPACT_MODE" != "full" ]] && [[ "$E2E_PRESENT" == "true" ]] \
+    && npx playwright test --help 2>/dev/null | grep -q -- "--only-changed"; then
+    E2E_ARGS=(--only-changed="$IMPACT_BASE")
+fi
+
+# Application testée en E2E : démarrée par l'orchestrateur pendant pytest en mode
+# parallèle, sinon juste avant Playwright ; prête quand elle répond en HTTP
+APP_CMD=""
+APP_PID=""
+if [[ "$E2E_PRESENT" == "true" ]] && [[ -f "pyproject.toml" ]] && grep -q "fastapi" pyproject.toml; then
+    APP_CMD="python -m uvicorn src.main:app --port 8000"
+    export APP_URL="http://localhost:8000"
+fi
+start_app() {
+    log "🌐 Démarrage FastAPI pour les tests E2E..."
+    $APP_CMD &
+    APP_PID=$!
+    # Sonde HTTP avec backoff exponentiel (APP_READY_TIMEOUT, 60 s par défaut)
+    python3 -c "
+import sys
+sys.path.insert(0, sys.argv[1])
+from parallel_tests import wait_ready
+sys.exit(0 if wait_ready(sys.argv[2]) else 1)
+" "$OPS_DIR" "$APP_URL" || log "⚠️ Application non disponible sur $APP_URL"
+}
+
 # Étape 1: Tests unitaires Python
 log "🐍 Exécution des tests unitaires Python..."
 
 PYTHON_TEST_EXIT=0
+E2E_TEST_EXIT=0
+E2E_DONE=false
+UNIT_START=$SECONDS
 if [[ -d "tests" ]] && find tests -name "*.py" | grep -q .; then
     log "Tests Python détectés, exécution..."
     
-    python -m pytest tests/ \
-        --cov=src \
-        --cov-report=xml:artifacts/coverage.xml \
-        --cov-report=html:artifacts/htmlcov \
-        --junit-xml=artifacts/junit.xml \
-        -v || PYTHON_TEST_EXIT=$?
+    if [[ "$PARALLEL_TESTS" != "0" ]] && [[ "$IMPACT_MODE" != "none" ]]; then
+        PARALLEL_ARGS=(--cov src --fetch)
+        if [[ "$IMPACT_MODE" == "full" ]]; then
+            PARALLEL_ARGS+=(--cov-context)
+        else
+            PARALLEL_ARGS+=(--tests-file artifacts/test_impact_tests.txt)
+        fi
+        if [[ "$E2E_PRESENT" == "true" ]]; then
+            log "🎭 Tests E2E Playwright exécutés en parallèle des tests unitaires"
+            for arg in "${E2E_ARGS[@]}"; do
+                PARALLEL_ARGS+=("--e2e-arg=$arg")
+            done
+            if [[ -n "$APP_CMD" ]]; then
+                PARALLEL_ARGS+=(--app-cmd "$APP_CMD" --app-url "$APP_URL")
+            fi
+            if [[ "$PLAYWRIGHT_INSTALLED" == "false" ]]; then
+                PARALLEL_ARGS+=(--install-browsers)
+                PLAYWRIGHT_INSTALLED=pending
+            fi
+            E2E_DONE=true
+        else
+            PARALLEL_ARGS+=(--no-e2e)
+        fi
+        python3 "$OPS_DIR/parallel_tests.py" "${PARALLEL_ARGS[@]}" 2>&1 | tee -a logs/qwen_tests.log || true
+        # Codes de sortie et durées fusionnés par l'orchestrateur dans summary.json
+        read -r PYTHON_TEST_EXIT PARALLEL_E2E_EXIT UNIT_DURATION PARALLEL_E2E_DURATION < <(python3 -c "
+import json
+try:
+    s = json.load(open('artifacts/summary.json'))
+    print(s['exit_codes']['python_tests'], s['exit_codes']['e2e_tests'],
+          round(s['durations']['unit_s']), round(s['durations']['e2e_s']))
+except Exception:
+    print(1, 1, 0, 0)
+")
+        if [[ "$PLAYWRIGHT_INSTALLED" == "pending" ]]; then
+            # Installation lancée par l'orchestrateur : réussie seulement si elle a renvoyé 0
+            BROWSERS_INSTALL_EXIT=$(python3 -c "
+import json
+try:
+    print(json.load(open('artifacts/summary.json'))['parallel']['browsers_install_exit'])
+except Exception:
+    print(1)
+")
+            if [[ "$BROWSERS_INSTALL_EXIT" == "0" ]]; then
+                PLAYWRIGHT_INSTALLED=true
+            else
+                PLAYWRIGHT_INSTALLED=failed
+            fi
+        fi
+        if [[ "$E2E_DONE" == "true" ]]; then
+            E2E_TEST_EXIT=$PARALLEL_E2E_EXIT
+            E2E_DURATION=$PARALLEL_E2E_DURATION
+        fi
+        if [[ "$IMPACT_MODE" == "full" ]]; then
+            python3 "$OPS_DIR/impacted_tests.py" build --publish 2>>logs/qwen_tests.log \
+                || log "⚠️ Carte d'impact non mise à jour"
+        fi
+    elif [[ "$IMPACT_MODE" == "full" ]]; then
+        # Run complet : contextes coverage par test pour reconstruire la carte d'impact
+        python -m pytest tests/ \
+            --cov=src \
+            --cov-context=test \
+            --cov-report=xml:artifacts/coverage.xml \
+            --cov-report=html:artifacts/htmlcov \
+            --junit-xml=artifacts/junit.xml \
+            -v || PYTHON_TEST_EXIT=$?
+        python3 "$OPS_DIR/impacted_tests.py" build --publish 2>>logs/qwen_tests.log \
+            || log "⚠️ Carte d'impact non mise à jour"
+    elif [[ "$IMPACT_MODE" == "impacted" ]]; then
+        mapfile -t IMPACTED_TESTS < artifacts/test_impact_tests.txt
+        log "Exécution de ${#IMPACTED_TESTS[@]} tests impactés..."
+        python -m pytest "${IMPACTED_TESTS[@]}" \
+            --cov=src \
+            --cov-report=xml:artifacts/coverage.xml \
+            --junit-xml=artifacts/junit.xml \
+            -v || PYTHON_TEST_EXIT=$?
+    else
+        log "Aucun test Python impacté par le diff"
+    fi
     
     log "Tests Python terminés (code: $PYTHON_TEST_EXIT)"
 else
@@ -96,31 +252,24 @@ EOF
         -v || PYTHON_TEST_EXIT=$?
 fi
 
+UNIT_DURATION=${UNIT_DURATION:-$((SECONDS - UNIT_START))}
+
 # Étape 2: Tests E2E avec Playwright
 log "🎭 Exécution des tests E2E Playwright..."
 
-E2E_TEST_EXIT=0
-if [[ -d "e2e" ]] && find e2e -name "*.spec.*" | grep -q .; then
+E2E_START=$SECONDS
+if [[ "$E2E_DONE" == "true" ]]; then
+    log "Tests E2E déjà exécutés en parallèle (code: $E2E_TEST_EXIT)"
+elif [[ "$E2E_PRESENT" == "true" ]]; then
     log "Tests E2E détectés, exécution..."
     
-    # Démarrer l'application en arrière-plan si possible
-    APP_PID=""
-    if [[ -f "pyproject.toml" ]] && grep -q "fastapi" pyproject.toml; then
-        log "🌐 Démarrage FastAPI pour les tests E2E..."
-        python -m uvicorn src.main:app --port 8000 &
-        APP_PID=$!
-        sleep 5  # Attendre que l'app démarre
-        
-        export APP_URL="http://localhost:8000"
+    install_playwright
+    if [[ -n "$APP_CMD" ]]; then
+        start_app
     fi
     
-    # Exécuter Playwright
-    npx playwright test --reporter=json:artifacts/playwright-results.json || E2E_TEST_EXIT=$?
-    
-    # Arrêter l'application
-    if [[ -n "$APP_PID" ]]; then
-        kill $APP_PID 2>/dev/null || true
-    fi
+    # Exécuter Playwright (hors run complet : specs touchées par le diff, via leurs imports)
+    npx playwright test "${E2E_ARGS[@]}" --reporter=json:artifacts/playwright-results.json || E2E_TEST_EXIT=$?
     
     log "Tests E2E terminés (code: $E2E_TEST_EXIT)"
     
@@ -152,9 +301,17 @@ EOF
         npm install
     fi
     
+    install_playwright
     npx playwright test || E2E_TEST_EXIT=$?
 fi
 
+# Arrêter l'application
+if [[ -n "$APP_PID" ]]; then
+    kill $APP_PID 2>/dev/null || true
+fi
+
+E2E_DURATION=${E2E_DURATION:-$((SECONDS - E2E_START))}
+
 # Étape 3: Lighthouse (si applicable)
 log "🔍 Audit Lighthouse (si applicable)..."
 
@@ -208,8 +365,30 @@ except:
 " 2>/dev/null || echo "0.0")
 fi
 
-# Créer le résumé JSON
-cat > artifacts/summary.json << EOF
+# Coverage du dernier run complet (carte d'impact), reportée à part : jamais utilisée
+# comme coverage de ce run (un DoD avec coverage_min force d'ailleurs un run complet)
+BASELINE_COVERAGE=$(python3 -c "
+import json
+value = json.load(open('artifacts/test_impact.json')).get('baseline_coverage')
+print('null' if value is None else float(value))
+" 2>/dev/null || echo "null")
+
+# Benchmarks (pytest-benchmark --benchmark-json=artifacts/benchmark.json) : médiane par test
+BENCHMARKS="{}"
+if [[ -f "artifacts/benchmark.json" ]]; then
+    BENCHMARKS=$(python3 -c "
+import json
+try:
+    with open('artifacts/benchmark.json') as f:
+        data = json.load(f)
+    print(json.dumps({b['name']: b['stats']['median'] for b in data.get('benchmarks', [])}))
+except Exception:
+    print('{}')
+")
+fi
+
+# Créer le résumé JSON (fusionné avec les détails déjà écrits par ops/parallel_tests.py)
+SUMMARY_JSON=$(cat << EOF
 {
   "run_id": "$RUN_ID",
   "timestamp": "$(date -Iseconds)",
@@ -217,6 +396,13 @@ cat > artifacts/summary.json << EOF
   "unit_pass": $([ $PYTHON_TEST_EXIT -eq 0 ] && echo "true" || echo "false"),
   "e2e_pass": $([ $E2E_TEST_EXIT -eq 0 ] && echo "true" || echo "false"),
   "lighthouse": $LIGHTHOUSE_SCORE,
+  "baseline_coverage": $BASELINE_COVERAGE,
+  "test_selection": "$IMPACT_MODE",
+  "durations": {
+    "unit_s": $UNIT_DURATION,
+    "e2e_s": $E2E_DURATION
+  },
+  "benchmarks": $BENCHMARKS,
   "result": "$([ $PYTHON_TEST_EXIT -eq 0 ] && [ $E2E_TEST_EXIT -eq 0 ] && echo "PASSED" || echo "FAILED")",
   "notes": "Tests exécutés automatiquement par Claude via z.ai API",
   "exit_codes": {
@@ -225,6 +411,21 @@ cat > artifacts/summary.json << EOF
   }
 }
 EOF
+)
+python3 - "$SUMMARY_JSON" << EOF
+import sys, json
+sys.path.insert(0, '$OPS_DIR')
+from summary import load_summary, save_summary
+summary = load_summary()
+summary.update(json.loads(sys.argv[1]))
+save_summary(summary)
+EOF
+
+# Navigateurs installés pendant ce run (installation terminée avec le code 0) : enregistrés
+# dans le cache pour les suivants, après vérification des marqueurs de Playwright
+if [[ "$ENV_CACHE_BROWSERS" == "pending" ]] && [[ "$PLAYWRIGHT_INSTALLED" == "true" ]]; then
+    python3 "$OPS_DIR/env_cache.py" commit browsers 2>>logs/qwen_tests.log || true
+fi
 
 # Copier les logs vers artifacts
 cp logs/qwen_tests.log artifacts/ || true
@@ -0,0 +1,30 @@
+#!/bin/bash
+set -euo pipefail
+
+# Exécution locale d'un sprint attribué par ops/scheduler.py
+# Reprend les étapes du workflow Sprint Runner (run, planification, tests, DoD gate)
+# dans le répertoire de travail isolé du sprint ; spec.yaml y est déjà déposé
+
+echo "🏃 Sprint ${SPRINT_ID:-?} sur ${TARGET_REPO:-?} (${TARGET_BRANCH:-main})"
+
+if [[ -z "${SPRINT_ID:-}" ]]; then
+    echo "❌ SPRINT_ID manquant (script lancé par ops/scheduler.py)"
+    exit 1
+fi
+
+mkdir -p artifacts
+
+# Création du run sur le sprint attribué (SPRINT_ID)
+python3 ops/ops.py create-run
+RUN_ID=$(jq -r '.run_id' artifacts/run_context.json)
+export RUN_ID
+
+# Planification, tests puis upload + DoD gate + rapport ; rapport de secours si une étape échoue avant
+if bash scripts/cc_plan_and_code.sh && bash scripts/qwen_run_tests.sh; then
+    python3 ops/ops.py all
+else
+    STATUS=$?
+    echo "❌ Sprint interrompu avant la DoD gate (code $STATUS)"
+    python3 ops/ops.py notify || true
+    exit "$STATUS"
+fi
@@ -19,6 +19,12 @@ create table sprints (
   label text not null,      -- e.g. "S1"
   dod_json jsonb not null,  -- critères exécutables
   state text not null default 'PLANNED', -- PLANNED/RUNNING/DONE/FAILED
+  priority int not null default 0,         -- ordre de prise en charge par ops/scheduler.py (plus grand d'abord)
+  claimed_by text,          -- worker du scheduler (hôte:pid) qui exécute le sprint
+  claimed_at timestamptz,
+  heartbeat_at timestamptz, -- dernier signe de vie du worker (claims orphelins remis en file)
+  finished_at timestamptz,
+  attempts int not null default 0,
   created_at timestamptz default now()
 );
 
@@ -38,26 +44,70 @@ create table artifacts (
   id uuid primary key default gen_random_uuid(),
   run_id uuid references runs(id) on delete cascade,
   kind text,                -- junit|coverage|lighthouse|logs
-  storage_path text not null,
+  storage_path text not null, -- reports/<run>/... ou blob partagé blobs/sha256/<hash>
   size bigint,
+  name text,                -- chemin relatif d'origine dans artifacts/
+  sha256 text,              -- hash du contenu (déduplication entre runs)
+  index_json jsonb,         -- archives: offsets des membres (extraction par requête Range)
   created_at timestamptz default now()
 );
 
--- Table des événements de statut
+-- Table des événements de statut (append-only, partitionnée par mois sur ts)
 create table status_events (
-  id bigserial primary key,
+  id bigserial,
   run_id uuid,
   phase text,               -- SPEC_RECEIVED|PLANNING|BUILD|TESTS_PASSED|FAILED|MERGED
   message text,
-  ts timestamptz default now()
+  ts timestamptz not null default now(),
+  primary key (id, ts)
+) partition by range (ts);
+
+-- Partition par défaut : événements hors des mois déjà créés
+create table status_events_default partition of status_events default;
+
+-- Table des résultats par test (ops/ingest_test_timings.py : JUnit et Playwright)
+create table test_results (
+  id bigserial primary key,
+  run_id uuid references runs(id) on delete cascade,
+  source text not null,     -- junit|playwright
+  suite text,
+  name text not null,
+  file text,
+  status text not null,     -- passed|failed|error|skipped|flaky
+  duration_ms integer,
+  retries smallint not null default 0,
+  created_at timestamptz default now()
 );
 
+-- Carte d'impact des tests par repo : fichier source -> tests (ops/impacted_tests.py)
+create table test_impact_maps (
+  repo text primary key,
+  commit_sha text,          -- commit du run complet qui a produit la carte
+  map_json jsonb not null,  -- {files: {chemin: [tests]}, tests: [...], coverage, created_at}
+  updated_at timestamptz default now()
+);
+
+-- Index des chemins d'accès des scripts ops et des fonctions Edge
+create index if not exists idx_specs_created_at on specs (created_at desc);          -- dernière spec
+create index if not exists idx_sprints_spec_id on sprints (spec_id, created_at);     -- sprints d'une spec
+create index if not exists idx_sprints_planned on sprints (priority desc, created_at) where state = 'PLANNED'; -- file du scheduler
+create index if not exists idx_sprints_running on sprints (heartbeat_at) where state = 'RUNNING'; -- sprints en cours
+create index if not exists idx_runs_sprint_started on runs (sprint_id, started_at desc); -- runs d'un sprint
+create index if not exists idx_artifacts_run_kind on artifacts (run_id, kind);       -- artefacts d'un run
+create index if not exists idx_status_events_run_ts on status_events (run_id, ts);   -- timeline d'un run
+create index if not exists idx_status_events_ts_brin on status_events using brin (ts); -- plages de temps (append-only)
+create index if not exists idx_test_results_run on test_results (run_id);            -- résultats d'un run
+create index if not exists idx_test_results_test on test_results (suite, name, created_at desc); -- historique d'un test
+create index if not exists idx_test_results_created_brin on test_results using brin (created_at); -- fenêtres récentes
+
 -- Activation RLS (Row Level Security)
 alter table specs enable row level security;
 alter table sprints enable row level security;
 alter table runs enable row level security;
 alter table artifacts enable row level security;
 alter table status_events enable row level security;
+alter table test_results enable row level security;
+alter table test_impact_maps enable row level security;
 
 -- Politique RLS : autoriser insert/select seulement via service role
 create policy "Service role can manage specs" on specs
@@ -73,4 +123,444 @@ create policy "Service role can manage artifacts" on artifacts
   for all using (auth.role() = 'service_role');
 
 create policy "Service role can manage status_events" on status_events
-  for all using (auth.role() = 'service_role');
\ No newline at end of file
+  for all using (auth.role() = 'service_role');
+
+create policy "Service role can manage test_results" on test_results
+  for all using (auth.role() = 'service_role');
+
+create policy "Service role can manage test_impact_maps" on test_impact_maps
+  for all using (auth.role() = 'service_role');
+
+-- Tests les plus lents et les plus instables sur les 30 derniers jours
+create or replace view test_stats with (security_invoker = true) as
+select
+  source,
+  suite,
+  name,
+  count(*) as runs,
+  round(avg(duration_ms)) as avg_ms,
+  percentile_cont(0.95) within group (order by duration_ms) as p95_ms,
+  max(duration_ms) as max_ms,
+  count(*) filter (where status in ('failed', 'error')) as failures,
+  count(*) filter (where status = 'flaky' or retries > 0) as flaky_runs,
+  round((count(*) filter (where status = 'flaky' or retries > 0))::numeric / count(*), 3) as flaky_rate,
+  max(created_at) as last_seen_at
+from test_results
+where created_at > now() - interval '30 days'
+group by source, suite, name;
+
+-- Création atomique d'un run (appelée via rpc('create_run') par ops/create_run_record.py) :
+-- get-or-create spec et sprint, insertion du run et de l'événement PLANNING en une
+-- seule transaction et un seul aller-retour. Les verrous consultatifs sérialisent
+-- les runs concurrents d'une même spec (plus de sprints en double).
+create or replace function create_run(
+  p_ci_run_id text,
+  p_spec_id uuid default null,
+  p_default_spec jsonb default '{}'::jsonb,
+  p_default_dod jsonb default '{"coverage_min": 0.80, "e2e_pass": true, "lighthouse_min": 85}'::jsonb,
+  p_sprint_id uuid default null
+) returns jsonb
+language plpgsql
+as $$
+declare
+  v_spec_id uuid := p_spec_id;
+  v_sprint sprints%rowtype;
+  v_run_id uuid;
+begin
+  -- Sprint attribué par le scheduler (claim_sprints) : déjà RUNNING
+  if p_sprint_id is not null then
+    select * into v_sprint from sprints s where s.id = p_sprint_id;
+    if not found then
+      raise exception 'Sprint % introuvable', p_sprint_id;
+    end if;
+    v_spec_id := v_sprint.spec_id;
+  end if;
+
+  if v_spec_id is null then
+    perform pg_advisory_xact_lock(hashtext('create_run:default_spec'));
+    select s.id into v_spec_id from specs s order by s.created_at desc limit 1;
+    if v_spec_id is null then
+      insert into specs (repo, branch, storage_path, created_by)
+      values (
+        coalesce(p_default_spec->>'repo', 'ljniox/ai-continuous-delivery'),
+        coalesce(p_default_spec->>'branch', 'main'),
+        coalesce(p_default_spec->>'storage_path', 'specs/default-test.yaml'),
+        coalesce(p_default_spec->>'created_by', 'github-actions-test')
+      )
+      returning id into v_spec_id;
+    end if;
+  end if;
+
+  if p_sprint_id is null then
+    perform pg_advisory_xact_lock(hashtext('create_run:sprint:' || v_spec_id::text));
+    select * into v_sprint from sprints s where s.spec_id = v_spec_id order by s.created_at limit 1;
+    -- Sprint lancé hors scheduler (workflow) : retiré de la file des PLANNED et marqué
+    -- 'workflow:<ci_run_id>' pour que requeue_stale_sprints le libère si le run s'arrête
+    -- avant la DoD gate (le workflow n'envoie pas de heartbeat)
+    if not found then
+      insert into sprints (spec_id, label, dod_json, state, claimed_by, claimed_at, heartbeat_at, attempts)
+      values (v_spec_id, 'S1', p_default_dod, 'RUNNING', 'workflow:' || p_ci_run_id, now(), now(), 1)
+      returning * into v_sprint;
+    else
+      update sprints
+      set state = 'RUNNING', claimed_by = 'workflow:' || p_ci_run_id, claimed_at = now(),
+          heartbeat_at = now(), finished_at = null, attempts = attempts + 1
+      where id = v_sprint.id and state = 'PLANNED';
+    end if;
+  end if;
+
+  insert into runs (sprint_id, ci_run_id, started_at, result, summary_json)
+  values (v_sprint.id, p_ci_run_id, now(), null, '{"status": "STARTED"}'::jsonb)
+  returning id into v_run_id;
+
+  insert into status_events (run_id, phase, message)
+  values (v_run_id, 'PLANNING', 'Démarrage du run ' || p_ci_run_id);
+
+  return jsonb_build_object(
+    'run_id', v_run_id,
+    'sprint_id', v_sprint.id,
+    'spec_id', v_spec_id,
+    'sprint_label', v_sprint.label,
+    'dod_json', v_sprint.dod_json
+  );
+end;
+$$;
+
+-- Scheduler multi-projets (ops/scheduler.py) : prise en charge des sprints PLANNED
+-- par priorité puis ancienneté, jusqu'à p_slots sprints, sans dépasser la limite de
+-- sprints RUNNING par repo (p_repo_limits {"org/repo": n}, sinon p_default_repo_limit).
+-- FOR UPDATE SKIP LOCKED : plusieurs schedulers ne se bloquent pas et ne prennent
+-- jamais le même sprint ; le verrou consultatif par repo sérialise le comptage des
+-- RUNNING pour que deux claims concurrents ne dépassent pas la limite. Verrou pris
+-- sans attente (pg_try_advisory_xact_lock) : un repo en cours de claim par un autre
+-- scheduler est sauté jusqu'au prochain tick, plutôt que d'attendre des verrous pris
+-- dans un ordre différent (interblocage 40P01).
+-- Les sprints lancés par le workflow (create_run) comptent parmi les RUNNING mais
+-- ne sont pas soumis à la limite : le workflow démarre sur événement GitHub.
+create or replace function claim_sprints(
+  p_worker text,
+  p_slots int default 1,
+  p_default_repo_limit int default 1,
+  p_repo_limits jsonb default '{}'::jsonb
+) returns setof jsonb
+language plpgsql
+as $$
+declare
+  v_candidate record;
+  v_limit int;
+  v_running int;
+  v_claimed int := 0;
+  v_full text[] := '{}';
+begin
+  if p_slots <= 0 then
+    return;
+  end if;
+
+  for v_candidate in
+    select sp.id, s.repo
+    from sprints sp
+    join specs s on s.id = sp.spec_id
+    where sp.state = 'PLANNED'
+    order by sp.priority desc, sp.created_at
+    for update of sp skip locked
+  loop
+    continue when v_candidate.repo = any(v_full);
+
+    if not pg_try_advisory_xact_lock(hashtext('claim_sprints:' || v_candidate.repo)) then
+      v_full := v_full || v_candidate.repo;
+      continue;
+    end if;
+    v_limit := coalesce((p_repo_limits->>v_candidate.repo)::int, p_default_repo_limit);
+    select count(*) into v_running
+    from sprints sp
+    join specs s on s.id = sp.spec_id
+    where sp.state = 'RUNNING' and s.repo = v_candidate.repo;
+    if v_running >= v_limit then
+      v_full := v_full || v_candidate.repo;
+      continue;
+    end if;
+
+    update sprints
+    set state = 'RUNNING', claimed_by = p_worker, claimed_at = now(), heartbeat_at = now(),
+        finished_at = null, attempts = attempts + 1
+    where id = v_candidate.id;
+
+    return next (
+      select jsonb_build_object(
+        'sprint_id', sp.id,
+        'spec_id', sp.spec_id,
+        'label', sp.label,
+        'priority', sp.priority,
+        'attempts', sp.attempts,
+        'dod_json', sp.dod_json,
+        'repo', s.repo,
+        'branch', s.branch,
+        'storage_path', s.storage_path
+      )
+      from sprints sp
+      join specs s on s.id = sp.spec_id
+      where sp.id = v_candidate.id
+    );
+
+    v_claimed := v_claimed + 1;
+    exit when v_claimed >= p_slots;
+  end loop;
+end;
+$$;
+
+-- Signe de vie des sprints en cours d'un worker ; retourne le nombre de sprints encore à lui
+create or replace function heartbeat_sprints(p_worker text, p_sprint_ids uuid[])
+returns int
+language plpgsql
+as $$
+declare
+  v_count int;
+begin
+  update sprints set heartbeat_at = now()
+  where id = any(p_sprint_ids) and state = 'RUNNING' and claimed_by = p_worker;
+  get diagnostics v_count = row_count;
+  return v_count;
+end;
+$$;
+
+-- Fin d'un sprint (DONE/FAILED) ou remise en file (PLANNED), seulement par le worker qui
+-- le détient : un worker déclaré mort puis revenu ne peut pas écraser un nouveau claim.
+-- Retourne false si le sprint n'est plus RUNNING pour ce worker (ex. déjà clos par la DoD gate).
+create or replace function finish_sprint(p_sprint_id uuid, p_worker text, p_state text)
+returns boolean
+language plpgsql
+as $$
+begin
+  if p_state not in ('DONE', 'FAILED', 'PLANNED') then
+    raise exception 'État de fin invalide: %', p_state;
+  end if;
+  update sprints
+  set state = p_state,
+      finished_at = case when p_state = 'PLANNED' then null else now() end,
+      claimed_by = case when p_state = 'PLANNED' then null else claimed_by end
+  where id = p_sprint_id and state = 'RUNNING' and claimed_by = p_worker;
+  return found;
+end;
+$$;
+
+-- Claims orphelins (worker arrêté sans finish_sprint) : remis en file, ou FAILED
+-- après p_max_attempts tentatives. Les sprints des workflows ('workflow:<ci_run_id>',
+-- ou claimed_by null pour les lignes antérieures) n'ont pas de heartbeat : ils sont
+-- libérés après p_workflow_stale_seconds, au-delà du timeout du job (60 min).
+create or replace function requeue_stale_sprints(
+  p_stale_seconds int default 300,
+  p_max_attempts int default 3,
+  p_workflow_stale_seconds int default 4500
+) returns jsonb
+language plpgsql
+as $$
+declare
+  v_requeued int := 0;
+  v_failed int := 0;
+  v_sprint record;
+begin
+  for v_sprint in
+    select id, attempts
+    from sprints
+    where state = 'RUNNING'
+      and case
+        when claimed_by is null or claimed_by like 'workflow:%' then
+          coalesce(heartbeat_at, claimed_at, created_at) < now() - make_interval(secs => p_workflow_stale_seconds)
+        else
+          heartbeat_at < now() - make_interval(secs => p_stale_seconds)
+      end
+    for update skip locked
+  loop
+    if v_sprint.attempts >= p_max_attempts then
+      update sprints set state = 'FAILED', finished_at = now() where id = v_sprint.id;
+      v_failed := v_failed + 1;
+    else
+      update sprints set state = 'PLANNED', claimed_by = null where id = v_sprint.id;
+      v_requeued := v_requeued + 1;
+    end if;
+  end loop;
+  return jsonb_build_object('requeued', v_requeued, 'failed', v_failed);
+end;
+$$;
+
+-- Partitions mensuelles de status_events : status_events_pAAAA_MM.
+-- Crée les partitions du mois précédent jusqu'à p_months_ahead mois à venir.
+-- Postgres refuse de créer une partition dont le mois a déjà des lignes dans la
+-- partition par défaut (maintenance manquée, événements rejoués depuis le spool avec
+-- un ts ancien) : la partition est alors créée à part, les lignes du mois y sont
+-- déplacées, puis elle est attachée, le tout dans la transaction de la fonction.
+create or replace function ensure_status_events_partitions(p_months_ahead int default 3)
+returns int
+language plpgsql
+as $$
+declare
+  v_month date;
+  v_next date;
+  v_created int := 0;
+  v_name text;
+begin
+  for i in -1..p_months_ahead loop
+    v_month := (date_trunc('month', now()) + make_interval(months => i))::date;
+    v_next := (v_month + interval '1 month')::date;
+    v_name := 'status_events_p' || to_char(v_month, 'YYYY_MM');
+    if to_regclass(v_name) is not null then
+      continue;
+    end if;
+
+    if exists (select 1 from status_events_default where ts >= v_month and ts < v_next) then
+      execute format('create table %I (like status_events including defaults including constraints)', v_name);
+      execute format(
+        'with moved as (delete from status_events_default where ts >= %L and ts < %L returning *) '
+        'insert into %I (id, run_id, phase, message, ts) select id, run_id, phase, message, ts from moved',
+        v_month, v_next, v_name
+      );
+      execute format(
+        'alter table status_events attach partition %I for values from (%L) to (%L)',
+        v_name, v_month, v_next
+      );
+    else
+      execute format(
+        'create table %I partition of status_events for values from (%L) to (%L)',
+        v_name, v_month, v_next
+      );
+    end if;
+    v_created := v_created + 1;
+  end loop;
+  return v_created;
+end;
+$$;
+
+-- Rétention : supprime les partitions mensuelles plus anciennes que p_keep_months mois
+create or replace function drop_old_status_events_partitions(p_keep_months int default 12)
+returns int
+language plpgsql
+as $$
+declare
+  v_cutoff date := (date_trunc('month', now()) - make_interval(months => p_keep_months))::date;
+  v_dropped int := 0;
+  v_partition record;
+begin
+  for v_partition in
+    select c.relname
+    from pg_inherits i
+    join pg_class c on c.oid = i.inhrelid
+    where i.inhparent = 'status_events'::regclass
+      and c.relname ~ '^status_events_p[0-9]{4}_[0-9]{2}$'
+  loop
+    if to_date(substring(v_partition.relname from '([0-9]{4}_[0-9]{2})$'), 'YYYY_MM') < v_cutoff then
+      execute format('drop table %I', v_partition.relname);
+      v_dropped := v_dropped + 1;
+    end if;
+  end loop;
+  return v_dropped;
+end;
+$$;
+
+-- Job de maintenance (création anticipée + rétention), appelable via rpc('maintain_status_events')
+create or replace function maintain_status_events(p_keep_months int default 12, p_months_ahead int default 3)
+returns jsonb
+language plpgsql
+as $$
+begin
+  return jsonb_build_object(
+    'created', ensure_status_events_partitions(p_months_ahead),
+    'dropped', drop_old_status_events_partitions(p_keep_months)
+  );
+end;
+$$;
+
+select ensure_status_events_partitions(3);
+
+-- Planification quotidienne si l'extension pg_cron est active (rétention configurable ici
+-- ou via `python ops/ops.py maintain-events --keep-months N`)
+do $$
+begin
+  if exists (select 1 from pg_extension where extname = 'pg_cron') then
+    perform cron.schedule(
+      'status-events-maintenance', '15 3 * * *',
+      'select maintain_status_events(12, 3)'
+    );
+  end if;
+end;
+$$;
+
+-- Vue matérialisée du tableau de bord des runs (page de statut, ops/run_overview.py) :
+-- run, sprint, spec, résultat DoD, comptes d'artefacts et dernière phase en une lecture
+create materialized view if not exists run_overview as
+select
+  r.id as run_id,
+  r.ci_run_id,
+  r.started_at,
+  r.finished_at,
+  r.result,
+  (r.summary_json->'dod_evaluation'->>'score')::int as dod_score,
+  (r.summary_json->'dod_evaluation'->>'total_criteria')::int as dod_total,
+  sp.id as sprint_id,
+  sp.label as sprint_label,
+  sp.state as sprint_state,
+  s.id as spec_id,
+  s.repo,
+  s.branch,
+  coalesce(a.artifact_count, 0) as artifact_count,
+  coalesce(a.artifact_bytes, 0) as artifact_bytes,
+  coalesce(a.artifacts_by_kind, '{}'::jsonb) as artifacts_by_kind,
+  e.phase as last_phase,
+  e.message as last_message,
+  e.ts as last_event_at
+from runs r
+join sprints sp on sp.id = r.sprint_id
+join specs s on s.id = sp.spec_id
+left join (
+  select run_id,
+         sum(n)::int as artifact_count,
+         sum(bytes)::bigint as artifact_bytes,
+         jsonb_object_agg(kind, n) as artifacts_by_kind
+  from (
+    select run_id, coalesce(kind, 'other') as kind, count(*) as n, coalesce(sum(size), 0) as bytes
+    from artifacts
+    group by 1, 2
+  ) k
+  group by run_id
+) a on a.run_id = r.id
+left join lateral (
+  select ev.phase, ev.message, ev.ts
+  from status_events ev
+  where ev.run_id = r.id
+  order by ev.ts desc
+  limit 1
+) e on true;
+
+-- Index unique requis par refresh ... concurrently ; listes récentes globales et par repo
+create unique index if not exists idx_run_overview_run_id on run_overview (run_id);
+create index if not exists idx_run_overview_started on run_overview (started_at desc);
+create index if not exists idx_run_overview_repo_started on run_overview (repo, started_at desc);
+
+-- Vue matérialisée : pas de RLS, lecture réservée à service_role comme les tables sources
+revoke all on run_overview from public, anon, authenticated;
+grant select on run_overview to service_role;
+
+-- Rafraîchissement sans bloquer les lectures : job pg_cron ci-dessous, ou à la demande
+-- via rpc (`python ops/ops.py overview --refresh`), jamais sur le chemin critique d'un run
+create or replace function refresh_run_overview()
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  refresh materialized view concurrently run_overview;
+end;
+$$;
+
+-- security definer : exécution réservée à service_role (EXECUTE accordé à PUBLIC par défaut)
+revoke execute on function refresh_run_overview() from public, anon, authenticated;
+grant execute on function refresh_run_overview() to service_role;
+
+-- Rafraîchissement planifié si pg_cron est actif (sinon cron du runner : ops.py overview --refresh)
+do $$
+begin
+  if exists (select 1 from pg_extension where extname = 'pg_cron') then
+    perform cron.schedule('run-overview-refresh', '*/5 * * * *', 'select refresh_run_overview()');
+  end if;
+end;
+$$;
@@ -0,0 +1,48 @@
+"""Configuration pytest : rend les modules de ops/ importables dans les tests"""
+
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ops'))
+
+@pytest.fixture
+def pg():
+    """
+    Schéma control-plane chargé dans un schéma jetable d'un Postgres local
+    (DATABASE_URL, comme ops/bench_schema.py) ; retourne une fabrique de connexions
+    sur ce schéma. Test ignoré sans psycopg ou sans base joignable.
+    """
+    psycopg = pytest.importorskip('psycopg')
+    from bench_schema import load_schema
+
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        pytest.skip('DATABASE_URL non défini')
+    try:
+        admin = psycopg.connect(database_url, autocommit=True)
+    except psycopg.OperationalError as e:
+        pytest.skip(f'Postgres indisponible: {e}')
+
+    schema = f'test_{uuid.uuid4().hex[:12]}'
+    connections = []
+
+    def connect(autocommit=True):
+        conn = psycopg.connect(database_url, autocommit=autocommit, options=f'-c search_path={schema},public')
+        connections.append(conn)
+        return conn
+
+    admin.execute(f'create schema {schema}')
+    try:
+        base, indexes = load_schema()
+        with connect() as conn:
+            for statement in base + indexes:
+                conn.execute(statement)
+        yield connect
+    finally:
+        for conn in connections:
+            conn.close()
+        admin.execute(f'drop schema {schema} cascade')
+        admin.close()
@@ -0,0 +1,34 @@
+"""Tests des archives d'artefacts streamées"""
+
+import io
+import zipfile
+
+from artifact_archive import extract_member, pack_name_for, stream_zip
+
+def _entry(path, rel_path, kind):
+    return {'filepath': str(path), 'rel_path': rel_path, 'kind': kind, 'size': path.stat().st_size}
+
+def test_stream_zip_index_allows_single_member_extraction(tmp_path):
+    """L'index des offsets permet d'extraire un membre sans lire toute l'archive"""
+    (tmp_path / 'index.html').write_text('<html>' + 'a' * 5000 + '</html>')
+    (tmp_path / 'style.css').write_text('body { color: red; }')
+    entries = [
+        _entry(tmp_path / 'index.html', 'htmlcov/index.html', 'coverage'),
+        _entry(tmp_path / 'style.css', 'htmlcov/style.css', 'coverage'),
+    ]
+
+    index = {}
+    archive = b''.join(stream_zip(entries, index))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert zf.read('htmlcov/style.css') == b'body { color: red; }'
+
+    content = extract_member(lambda start, end: archive[start:end + 1], index['htmlcov/style.css'])
+    assert content == b'body { color: red; }'
+    assert index['htmlcov/index.html']['size'] == 5013
+
+def test_pack_name_for_kind_or_directory():
+    packs = {'htmlcov', 'logs'}
+    assert pack_name_for({'kind': 'coverage', 'rel_path': 'htmlcov/a.html'}, packs) == 'htmlcov'
+    assert pack_name_for({'kind': 'logs', 'rel_path': 'qwen_tests.log'}, packs) == 'logs'
+    assert pack_name_for({'kind': 'coverage', 'rel_path': 'coverage.xml'}, packs) is None
@@ -0,0 +1,32 @@
+"""Tests de la découverte des artefacts en un seul parcours"""
+
+from artifact_index import ArtifactMatcher, scan_artifacts
+
+def test_classify_priority():
+    """Un fichier qui correspond à plusieurs motifs n'a qu'un seul type"""
+    matcher = ArtifactMatcher()
+    assert matcher.classify('junit.xml') == 'junit'
+    assert matcher.classify('reports/junit-unit.xml') == 'junit'
+    assert matcher.classify('coverage.xml') == 'coverage'
+    assert matcher.classify('htmlcov/index.html') == 'coverage'
+    assert matcher.classify('logs/run.log') == 'logs'
+    assert matcher.classify('qwen_tests.log') == 'logs'
+    assert matcher.classify('summary.json') is None
+
+def test_scan_artifacts_single_entry_per_file(tmp_path):
+    """Chaque fichier apparaît une seule fois dans le manifeste"""
+    (tmp_path / 'logs').mkdir()
+    (tmp_path / 'logs' / 'app.log').write_text('x' * 10)
+    (tmp_path / 'htmlcov').mkdir()
+    (tmp_path / 'htmlcov' / 'style.css').write_text('body{}')
+    (tmp_path / 'junit.xml').write_text('<testsuite/>')
+    (tmp_path / 'summary.json').write_text('{}')
+
+    manifest = scan_artifacts(tmp_path)
+
+    assert [(e['rel_path'], e['kind']) for e in manifest] == [
+        ('htmlcov/style.css', 'coverage'),
+        ('junit.xml', 'junit'),
+        ('logs/app.log', 'logs'),
+    ]
+    assert manifest[2]['size'] == 10
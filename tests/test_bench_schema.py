@@ -0,0 +1,42 @@
+"""Tests du schéma SQL (découpage pour le benchmark, partitions de status_events)"""
+
+from bench_schema import load_schema, split_statements
+
+def test_split_statements_handles_comments_quotes_and_functions():
+    sql = """
+    -- commentaire avec l'apostrophe ; et un point-virgule
+    create table t (a text default 'x;y');
+    create function f() returns int language plpgsql as $$
+    begin
+      return 1;
+    end;
+    $$;
+    """
+    statements = split_statements(sql)
+    assert len(statements) == 2
+    assert statements[0] == "create table t (a text default 'x;y')"
+    assert statements[1].startswith('create function f()') and statements[1].endswith('$$')
+
+def test_load_schema_separates_indexes_and_skips_rls():
+    base, indexes = load_schema()
+    assert any(s.startswith('create table runs') for s in base)
+    assert indexes and all('index' in s for s in indexes)
+    assert not any('policy' in s.lower() or 'row level security' in s.lower() for s in base)
+
+def test_partition_creation_moves_rows_out_of_the_default_partition(pg):
+    """Un mois déjà présent dans la partition par défaut est déplacé avant l'attachement"""
+    conn = pg()
+    month = conn.execute("select to_char(now(), 'YYYY_MM')").fetchone()[0]
+    conn.execute(f"drop table status_events_p{month}")  # maintenance manquée pour le mois courant
+    conn.execute("insert into status_events (phase, message, ts) "
+                 "select 'BUILD', 'événement ' || i, date_trunc('month', now()) + make_interval(hours => i) "
+                 "from generate_series(1, 5) i")
+    conn.execute("insert into status_events (phase, message, ts) values ('BUILD', 'ancien', now() - interval '2 years')")
+
+    assert conn.execute("select ensure_status_events_partitions(3)").fetchone()[0] == 1
+    assert conn.execute(f"select count(*) from status_events_p{month}").fetchone()[0] == 5
+    assert conn.execute("select message from status_events_default").fetchall() == [('ancien',)]
+    assert conn.execute("select count(*) from status_events").fetchone()[0] == 6
+    parent = conn.execute("select inhparent::regclass::text from pg_inherits "
+                          "where inhrelid = %s::regclass", [f'status_events_p{month}']).fetchone()[0]
+    assert parent == 'status_events'
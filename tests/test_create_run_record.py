@@ -0,0 +1,118 @@
+"""Tests de la création du run (fonction SQL create_run, repli sans la fonction)"""
+
+import json
+
+import pytest
+
+import create_run_record
+from create_run_record import DEFAULT_DOD, DEFAULT_SPEC, create_run, load_context, write_context
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = {}
+        self.rows = None
+        self.one = False
+
+    def select(self, *args):
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    def insert(self, row):
+        self.rows = row
+        return self
+
+    def execute(self):
+        if self.rows is not None:
+            row = {'id': f'{self.table}-{len(self.client.inserted) + 1}', **self.rows}
+            self.client.inserted.append((self.table, row))
+            return type('Result', (), {'data': [row]})
+        rows = [r for r in self.client.tables[self.table]
+                if all(r.get(k) == v for k, v in self.filters.items())]
+        return type('Result', (), {'data': rows[0] if self.one else rows})
+
+class FakeRpc:
+    def __init__(self, client, params):
+        self.client = client
+        self.params = params
+
+    def execute(self):
+        self.client.rpc_params = self.params
+        if self.client.rpc_error:
+            raise self.client.rpc_error
+        return type('Result', (), {'data': self.client.rpc_result})
+
+class FakeClient:
+    def __init__(self, rpc_result=None, rpc_error=None):
+        self.rpc_result = rpc_result
+        self.rpc_error = rpc_error
+        self.rpc_params = None
+        self.tables = {'specs': [], 'sprints': [], 'runs': []}
+        self.inserted = []
+
+    def rpc(self, name, params):
+        assert name == 'create_run'
+        return FakeRpc(self, params)
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+@pytest.fixture
+def events(monkeypatch):
+    emitted = []
+    monkeypatch.setattr(create_run_record, 'emit', lambda client, run_id, status, message: emitted.append((run_id, status)))
+    return emitted
+
+def test_create_run_uses_the_rpc(events):
+    result = {'run_id': 'r1', 'sprint_id': 's1', 'spec_id': 'spec1', 'sprint_label': 'S1', 'dod_json': DEFAULT_DOD}
+    client = FakeClient(rpc_result=result)
+    context = create_run(client, github_run_id='42', sprint_id='s1')
+
+    assert client.rpc_params == {'p_ci_run_id': '42', 'p_spec_id': None, 'p_default_spec': DEFAULT_SPEC,
+                                 'p_default_dod': DEFAULT_DOD, 'p_sprint_id': 's1'}
+    assert context == {**result, 'ci_run_id': '42'}
+    assert not client.inserted and not events  # événement PLANNING émis par la fonction SQL
+
+def test_missing_function_falls_back_to_legacy_path(tmp_path, monkeypatch, events):
+    client = FakeClient(rpc_error=Exception({'code': 'PGRST202', 'message': 'Could not find the function create_run'}))
+    context = create_run(client, github_run_id='42')
+
+    assert 'p_sprint_id' not in client.rpc_params
+    assert [table for table, row in client.inserted] == ['specs', 'sprints', 'runs']
+    assert context['run_id'] == 'runs-3' and context['sprint_id'] == 'sprints-2' and context['spec_id'] == 'specs-1'
+    assert context['sprint_label'] == 'S1' and context['dod_json'] == DEFAULT_DOD
+    assert events == [('runs-3', 'PLANNING')]
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('GITHUB_OUTPUT', raising=False)
+    write_context(context)
+    assert json.loads((tmp_path / 'artifacts' / 'run_context.json').read_text()) == context
+    assert load_context() == context
+
+def test_legacy_path_uses_the_assigned_sprint(events):
+    client = FakeClient(rpc_error=Exception('PGRST202'))
+    client.tables['sprints'] = [{'id': 's7', 'spec_id': 'spec3', 'label': 'S2', 'dod_json': {'coverage_min': 0.9}}]
+    context = create_run(client, github_run_id='42', sprint_id='s7')
+
+    assert [table for table, row in client.inserted] == ['runs']
+    assert context['spec_id'] == 'spec3' and context['sprint_label'] == 'S2'
+
+def test_other_rpc_errors_are_raised(events):
+    client = FakeClient(rpc_error=RuntimeError('permission denied for function create_run'))
+    with pytest.raises(RuntimeError):
+        create_run(client, github_run_id='42')
+    assert not client.inserted
@@ -0,0 +1,56 @@
+"""Tests de la réévaluation de la DoD en lot"""
+
+import pytest
+
+pytest.importorskip('pandas')
+
+from dod_gate import evaluate_dod
+from dod_batch import build_frame, evaluate_frame, pass_rates, changed_runs
+
+SUMMARIES = [
+    {'coverage': 0.9, 'e2e_pass': True, 'unit_pass': True, 'lighthouse': 92},
+    {'coverage': 0.82, 'e2e_pass': True, 'unit_pass': True, 'lighthouse': 88},
+    {'coverage': 0.95, 'e2e_pass': False, 'unit_pass': True},
+    {'unit_pass': False},
+    {},
+]
+DODS = [
+    {'coverage_min': 0.8, 'e2e_pass': True, 'lighthouse_min': 85},
+    {'lighthouse_max': 90, 'unit_pass': False},
+    {'rules': [{'metric': 'lighthouse', 'between': [80, 90]}]},
+    {'coverage_min': 0.85},
+    {'e2e_pass': False},
+    {},
+]
+
+def make_runs(dod):
+    return [
+        {'run_id': f'r{i}', 'result': 'PASSED', 'summary': summary, 'dod': dod}
+        for i, summary in enumerate(SUMMARIES)
+    ]
+
+@pytest.mark.parametrize('dod', DODS)
+def test_batch_matches_evaluate_dod(dod):
+    """Même verdict et même score que l'évaluation run par run"""
+    frame = evaluate_frame(build_frame(make_runs(dod)))
+    for summary, row in zip(SUMMARIES, frame.itertuples()):
+        expected = evaluate_dod(dict(summary), dod)
+        assert row.passed == expected['passed']
+        assert row.score == expected['score']
+        assert row.total_criteria == expected['total_criteria']
+
+def test_mixed_dods_are_evaluated_per_group():
+    """Runs de sprints différents : chaque groupe garde ses propres critères"""
+    runs = make_runs({'coverage_min': 0.85})[:2] + make_runs({'unit_pass': False})[2:]
+    frame = evaluate_frame(build_frame(runs))
+    assert list(frame['passed']) == [True, False, True, True, True]
+    assert pass_rates(frame)['coverage_min']['runs'] == 2
+
+def test_override_reports_rates_and_changed_runs():
+    """Un seuil plus strict fait basculer les runs concernés"""
+    frame = evaluate_frame(build_frame(make_runs({}), {'coverage_min': 0.85}))
+    rates = pass_rates(frame)
+    assert rates['coverage_min']['runs'] == 5
+    assert rates['coverage_min']['pass_rate'] == pytest.approx(0.4)
+    assert 'e2e_pass' not in rates
+    assert [run['run_id'] for run in changed_runs(frame)] == ['r1', 'r3', 'r4']
@@ -0,0 +1,67 @@
+"""Tests du moteur de règles de la DoD"""
+
+import pytest
+
+from dod_gate import evaluate_dod
+from dod_rules import compile_dod, percentile, register_aggregation, unknown_keys
+
+SUMMARY = {
+    'coverage': 0.9,
+    'unit_pass': True,
+    'bundle_kb': 240,
+    'perf': {'latency_ms': [120, 180, 200, 250, 900]},
+    'memory_mb': 700,
+    'test_durations_s': [1.5, 2.5, 4.0],
+}
+
+def test_unknown_metrics_use_key_conventions():
+    """_min / _max / _pass s'appliquent à n'importe quelle métrique du résumé"""
+    result = evaluate_dod(SUMMARY, {'bundle_kb_max': 250, 'coverage_min': 0.8, 'missing_min': 1})
+    assert result['total_criteria'] == 4  # + unit_pass requis par défaut
+    assert result['score'] == 3
+    assert "✅ bundle_kb: 240 <= 250" in result['details']
+    assert "❌ missing: absente" in result['details']
+
+def test_unknown_keys_are_reported():
+    """Une clé sans suffixe reconnu ne crée aucune règle : signalée, jamais ignorée en silence"""
+    dod = {'lighthouse_minimum': 90, 'coverage_min': 0.8, 'regression': {'mode': 'warn'}, 'rules': []}
+    assert unknown_keys(dod) == ['lighthouse_minimum']
+    result = evaluate_dod(SUMMARY, dod)
+    assert result['warnings'] == ['Clé DoD inconnue ignorée: lighthouse_minimum (suffixes attendus: _min, _max, _pass)']
+    assert result['details'][-1].startswith('⚠️  Clé DoD inconnue ignorée: lighthouse_minimum')
+    assert result['total_criteria'] == 2 and result['passed']
+    assert 'warnings' not in evaluate_dod(SUMMARY, {'coverage_min': 0.8})
+
+def test_explicit_rules_with_aggregations_and_ranges():
+    """Percentiles, sommes et intervalles sur des métriques imbriquées ou listes"""
+    dod = {'unit_pass': False, 'rules': [
+        {'metric': 'perf.latency_ms', 'agg': 'p95', 'op': '<=', 'value': 300},
+        {'metric': 'perf.latency_ms', 'agg': 'median', 'max': 250},
+        {'metric': 'test_durations_s', 'agg': 'sum', 'max': 10},
+        {'metric': 'memory_mb', 'between': [64, 512]},
+    ]}
+    result = evaluate_dod(SUMMARY, dod)
+    assert result['total_criteria'] == 4
+    assert [d[0] for d in result['details']] == ['❌', '✅', '✅', '❌']
+    assert result['details'][3] == "❌ memory_mb: 700 hors de [64, 512]"
+
+def test_unit_pass_is_required_unless_disabled():
+    assert not evaluate_dod({}, {})['passed']
+    assert evaluate_dod({}, {'unit_pass': False}) == {
+        'passed': True, 'details': [], 'score': 0, 'total_criteria': 0
+    }
+
+def test_rules_are_compiled_once_and_validated():
+    dod = {'coverage_min': 0.8, 'rules': [{'metric': 'x', 'agg': 'p99', 'max': 1}]}
+    assert compile_dod(dod) is compile_dod(dict(dod))
+    with pytest.raises(ValueError):
+        compile_dod({'rules': [{'metric': 'x', 'agg': 'unknown', 'max': 1}]})
+    with pytest.raises(ValueError):
+        compile_dod({'rules': [{'metric': 'x'}]})
+
+def test_percentile_and_registered_aggregation():
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([10], 95) == 10
+    register_aggregation('spread', lambda values: max(values) - min(values))
+    dod = {'unit_pass': False, 'rules': [{'metric': 'test_durations_s', 'agg': 'spread', 'max': 3}]}
+    assert evaluate_dod(SUMMARY, dod)['passed']
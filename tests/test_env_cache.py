@@ -0,0 +1,106 @@
+"""Tests du cache local des environnements de test"""
+
+import os
+
+import env_cache
+from env_cache import commit, ensure, evict, exports, list_entries, mark_complete, restore_node_modules, venv_key
+
+def test_venv_key_follows_requirements(tmp_path):
+    (tmp_path / 'requirements.txt').write_text('pytest\n')
+    key = venv_key(tmp_path)
+    assert key == venv_key(tmp_path)
+    (tmp_path / 'requirements.txt').write_text('pytest\nrequests\n')
+    assert venv_key(tmp_path) != key
+
+def test_venv_key_absent_without_dependencies(tmp_path):
+    assert venv_key(tmp_path) is None
+
+def test_ensure_builds_once_then_hits(tmp_path, monkeypatch):
+    (tmp_path / 'requirements.txt').write_text('pytest\n')
+    builds = []
+
+    def fake_build(entry, root):
+        builds.append(entry)
+        (entry / 'bin').mkdir(parents=True)
+        (entry / 'bin' / 'python').write_text('#!')
+        return True
+
+    monkeypatch.setitem(env_cache.BUILDERS, 'venv', fake_build)
+    cache = tmp_path / 'cache'
+    status, entry = ensure('venv', tmp_path, cache)
+    assert status == 'built' and (entry / '.complete').exists()
+    assert ensure('venv', tmp_path, cache) == ('hit', entry)
+    assert len(builds) == 1
+
+def test_failed_build_leaves_no_entry(tmp_path, monkeypatch):
+    (tmp_path / 'requirements.txt').write_text('pytest\n')
+
+    def broken_build(entry, root):
+        entry.mkdir(parents=True)
+        return False
+
+    monkeypatch.setitem(env_cache.BUILDERS, 'venv', broken_build)
+    assert ensure('venv', tmp_path, tmp_path / 'cache') == ('failed', None)
+    assert list_entries(tmp_path / 'cache') == []
+
+def test_deferred_browsers_need_commit(tmp_path, monkeypatch):
+    monkeypatch.setattr(env_cache, 'playwright_version', lambda root: '1.48.0')
+    monkeypatch.setattr(env_cache, 'CACHE_DIR', tmp_path / 'cache')
+    status, entry = ensure('browsers', tmp_path, defer=True)
+    assert status == 'pending'
+    assert not commit('browsers', tmp_path)  # rien d'installé
+    (entry / 'chromium-1140').mkdir()
+    (entry / 'chromium-1140' / 'INSTALLATION_COMPLETE').write_text('')
+    (entry / 'ffmpeg-1010').mkdir()  # téléchargement interrompu : pas de marqueur
+    assert not commit('browsers', tmp_path)
+    assert ensure('browsers', tmp_path, defer=True)[0] == 'pending'
+    (entry / 'ffmpeg-1010' / 'INSTALLATION_COMPLETE').write_text('')
+    assert commit('browsers', tmp_path)
+    assert ensure('browsers', tmp_path)[0] == 'hit'
+
+def _entry(cache, component, key, size, last_used):
+    entry = cache / component / key
+    entry.mkdir(parents=True)
+    (entry / 'payload').write_bytes(b'x' * size)
+    mark_complete(entry)
+    os.utime(entry / '.complete', (last_used, last_used))
+    return entry
+
+def test_evict_removes_least_recently_used_first(tmp_path):
+    cache = tmp_path / 'cache'
+    old = _entry(cache, 'venv', 'old', 600, 1000)
+    mid = _entry(cache, 'node', 'mid', 600, 2000)
+    new = _entry(cache, 'browsers', 'new', 600, 3000)
+    removed = evict(1300, cache, now=10_000, grace=0)
+    assert [e['key'] for e in removed] == ['old']
+    assert not old.exists() and mid.exists() and new.exists()
+
+def test_evict_spares_recently_used_entries(tmp_path):
+    cache = tmp_path / 'cache'
+    _entry(cache, 'venv', 'busy', 600, 9_900)
+    assert evict(0, cache, now=10_000, grace=3600) == []
+
+def test_restore_node_modules_links_and_skips_when_current(tmp_path):
+    entry = tmp_path / 'cache' / 'node' / 'abc'
+    (entry / 'node_modules' / 'pkg').mkdir(parents=True)
+    (entry / 'node_modules' / 'pkg' / 'index.js').write_text('module.exports = 1')
+    workspace = tmp_path / 'ws'
+    (workspace / 'node_modules' / 'stale').mkdir(parents=True)
+    restore_node_modules(entry, workspace)
+    restored = workspace / 'node_modules' / 'pkg' / 'index.js'
+    assert restored.read_text() == 'module.exports = 1'
+    assert not (workspace / 'node_modules' / 'stale').exists()
+    assert os.path.samefile(restored, entry / 'node_modules' / 'pkg' / 'index.js')
+    restored.unlink()
+    restore_node_modules(entry, workspace)  # déjà restauré depuis cette entrée
+    assert not restored.exists()
+
+def test_exports_only_usable_entries(tmp_path):
+    variables, paths = exports({
+        'venv': ('hit', tmp_path / 'venv'),
+        'node': ('failed', None),
+        'browsers': ('pending', tmp_path / 'browsers'),
+    })
+    assert variables['ENV_CACHE_VENV'] == 'hit' and variables['ENV_CACHE_NODE'] == 'failed'
+    assert variables['PLAYWRIGHT_BROWSERS_PATH'] == str(tmp_path / 'browsers')
+    assert paths == [str(tmp_path / 'venv' / 'bin')]
@@ -0,0 +1,52 @@
+"""Tests de l'émetteur d'événements de statut"""
+
+from events import EventEmitter
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+
+    def insert(self, rows):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        if self.client.fail:
+            raise ConnectionError('réseau indisponible')
+        self.client.batches.append(self.rows)
+
+class FakeClient:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def table(self, name):
+        assert name == 'status_events'
+        return FakeTable(self)
+
+def test_events_are_batched_and_spool_cleared(tmp_path):
+    """Les événements partent en un seul lot à la fermeture et le spool est supprimé"""
+    spool = tmp_path / '.events_spool.jsonl'
+    client = FakeClient()
+    emitter = EventEmitter(client, spool, flush_interval=60, batch_size=10)
+    emitter.emit('r1', 'PLANNING', 'début')
+    emitter.emit('r1', 'ARTIFACTS_UPLOADED', '3 artefacts')
+    assert spool.exists() and client.batches == []
+
+    assert emitter.close()
+    assert [e['phase'] for e in client.batches[0]] == ['PLANNING', 'ARTIFACTS_UPLOADED']
+    assert all(e['ts'] for e in client.batches[0])
+    assert not spool.exists()
+
+def test_undelivered_events_are_replayed(tmp_path):
+    """Un événement non livré reste dans le spool et repart avec le processus suivant"""
+    spool = tmp_path / '.events_spool.jsonl'
+    emitter = EventEmitter(FakeClient(fail=True), spool, flush_interval=60)
+    emitter.emit('r1', 'TESTS_PASSED', 'DoD PASSED')
+    assert not emitter.close(timeout=1)
+    assert spool.exists()
+
+    client = FakeClient()
+    assert EventEmitter(client, spool, flush_interval=60).close()
+    assert [e['phase'] for e in client.batches[0]] == ['TESTS_PASSED']
+    assert not spool.exists()
@@ -0,0 +1,64 @@
+"""Tests de la sélection des tests impactés"""
+
+from datetime import datetime, timedelta, timezone
+
+from impacted_tests import select_tests, context_test_id
+
+NOW = datetime(2025, 3, 1, tzinfo=timezone.utc)
+IMPACT_MAP = {
+    'created_at': (NOW - timedelta(days=1)).isoformat(),
+    'commit': 'abc',
+    'coverage': 0.87,
+    'files': {
+        'src/api.py': ['tests/test_api.py::test_get', 'tests/test_api.py::test_post'],
+        'src/db.py': ['tests/test_api.py::test_post', 'tests/test_db.py::test_query'],
+    },
+    'import_only': ['src/settings.py'],
+    'tests': ['tests/test_api.py::test_get', 'tests/test_api.py::test_post', 'tests/test_db.py::test_query'],
+}
+
+def test_test_id_strips_coverage_phase():
+    assert context_test_id('tests/test_api.py::test_get|run') == 'tests/test_api.py::test_get'
+    assert context_test_id('') is None
+
+def test_selects_tests_covering_changed_files():
+    decision = select_tests(IMPACT_MAP, ['src/db.py', 'README.md'], 3, now=NOW)
+    assert decision['mode'] == 'impacted'
+    assert decision['tests'] == ['tests/test_api.py::test_post', 'tests/test_db.py::test_query']
+    assert decision['unmapped'] == []
+    assert decision['baseline_coverage'] == 0.87
+
+def test_new_source_file_without_mapped_tests_runs_everything():
+    """Un module absent de la carte n'est jamais exécuté par une sélection : run complet"""
+    decision = select_tests(IMPACT_MAP, ['src/new.py'], 3, now=NOW)
+    assert decision['mode'] == 'full' and 'src/new.py' in decision['reason']
+    assert decision['unmapped'] == ['src/new.py']
+    assert select_tests(IMPACT_MAP, ['src/db.py', 'scripts/tool.py'], 3, now=NOW)['mode'] == 'full'
+
+def test_unmapped_non_python_files_run_everything():
+    """Templates, fixtures ou SQL lus par le code : jamais ignorés silencieusement"""
+    decision = select_tests(IMPACT_MAP, ['src/templates/page.html'], 3, now=NOW)
+    assert decision['mode'] == 'full' and decision['unmapped'] == ['src/templates/page.html']
+    assert select_tests(IMPACT_MAP, ['src/api.py', 'fixtures/users.yaml'], 3, now=NOW)['mode'] == 'full'
+
+def test_coverage_gate_forces_a_full_run():
+    """Le seuil coverage_min porte sur la coverage mesurée du diff, pas sur une ligne de base"""
+    decision = select_tests(IMPACT_MAP, ['src/db.py'], 3, now=NOW, dod={'coverage_min': 0.8, 'e2e_pass': True})
+    assert decision['mode'] == 'full' and 'coverage_min' in decision['reason']
+    assert select_tests(IMPACT_MAP, ['src/db.py'], 3, now=NOW, dod={'e2e_pass': True})['mode'] == 'impacted'
+
+def test_changed_test_files_select_their_tests():
+    decision = select_tests(IMPACT_MAP, ['tests/test_db.py'], 3, now=NOW)
+    assert decision['tests'] == ['tests/test_db.py::test_query']
+
+def test_docs_only_diff_selects_nothing():
+    assert select_tests(IMPACT_MAP, ['docs/guide.md'], 3, now=NOW)['mode'] == 'none'
+
+def test_full_run_triggers():
+    assert select_tests(None, ['src/api.py'], now=NOW)['mode'] == 'full'
+    assert select_tests(IMPACT_MAP, ['requirements.txt', 'src/api.py'], 3, now=NOW)['mode'] == 'full'
+    assert select_tests(IMPACT_MAP, ['tests/conftest.py'], 3, now=NOW)['mode'] == 'full'
+    assert select_tests(IMPACT_MAP, ['src/settings.py'], 3, now=NOW)['mode'] == 'full'
+    assert select_tests(IMPACT_MAP, ['src/api.py'], None, now=NOW)['mode'] == 'full'
+    assert select_tests(IMPACT_MAP, ['src/api.py'], 3, now=NOW + timedelta(days=30))['mode'] == 'full'
+    assert select_tests(IMPACT_MAP, ['src/api.py'], 3, force_full='planifié', now=NOW)['reason'] == 'planifié'
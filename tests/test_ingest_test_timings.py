@@ -0,0 +1,82 @@
+"""Tests de l'ingestion des durées par test"""
+
+import json
+
+from ingest_test_timings import ingest, parse_junit, parse_playwright
+
+JUNIT = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" tests="4">
+  <testcase classname="tests.test_api" name="test_ok" time="0.120"/>
+  <testcase classname="tests.test_api" name="test_ko" time="1.5"><failure message="boom"/></testcase>
+  <testcase classname="tests.test_api" name="test_retry" time="0.3"><rerunFailure message="x"/></testcase>
+  <testcase classname="tests.test_db" name="test_skip" time="0"><skipped/></testcase>
+</testsuite></testsuites>"""
+
+PLAYWRIGHT = {
+    'suites': [{
+        'title': 'home.spec.js', 'file': 'home.spec.js', 'specs': [],
+        'suites': [{
+            'title': 'Accueil', 'specs': [{
+                'title': 'affiche le titre', 'file': 'home.spec.js',
+                'tests': [{'projectName': 'chromium', 'status': 'flaky', 'results': [
+                    {'status': 'failed', 'duration': 800, 'retry': 0},
+                    {'status': 'passed', 'duration': 400, 'retry': 1},
+                ]}]
+            }]
+        }]
+    }]
+}
+
+def test_parse_junit_statuses_and_reruns(tmp_path):
+    path = tmp_path / 'junit.xml'
+    path.write_text(JUNIT)
+    results = {r['name']: r for r in parse_junit(str(path))}
+    assert results['test_ok']['duration_ms'] == 120
+    assert results['test_ok']['suite'] == 'tests.test_api'
+    assert results['test_ko']['status'] == 'failed'
+    assert results['test_retry']['status'] == 'flaky' and results['test_retry']['retries'] == 1
+    assert results['test_skip']['status'] == 'skipped'
+
+def test_parse_playwright_nested_suites(tmp_path):
+    path = tmp_path / 'results.json'
+    path.write_text(json.dumps(PLAYWRIGHT))
+    [result] = list(parse_playwright(str(path)))
+    assert result['suite'] == '[chromium] Accueil'
+    assert result['status'] == 'flaky'
+    assert result['duration_ms'] == 1200 and result['retries'] == 1
+
+class FakeQuery:
+    def __init__(self, client, rows=None):
+        self.client = client
+        self.rows = rows
+
+    def delete(self):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def insert(self, rows, returning=None):
+        return FakeQuery(self.client, list(rows))
+
+    def execute(self):
+        if self.rows is not None:
+            self.client.batches.append(self.rows)
+
+class FakeClient:
+    def __init__(self):
+        self.batches = []
+
+    def table(self, name):
+        assert name == 'test_results'
+        return FakeQuery(self)
+
+def test_ingest_batches_rows_and_reports_slowest(tmp_path):
+    path = tmp_path / 'junit.xml'
+    path.write_text(JUNIT)
+    client = FakeClient()
+    stats = ingest(client, 'r1', parse_junit(str(path)), batch_size=3)
+    assert [len(b) for b in client.batches] == [3, 1]
+    assert all(row['run_id'] == 'r1' for row in client.batches[0])
+    assert stats['tests'] == 4 and stats['failed'] == 1 and stats['flaky'] == 1
+    assert stats['slowest'][0]['name'] == 'test_ko'
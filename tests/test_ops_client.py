@@ -0,0 +1,66 @@
+"""Tests de la politique de nouvelles tentatives du client HTTP partagé"""
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+import ops_client
+from ops_client import RetryTransport
+
+@pytest.fixture
+def server(monkeypatch):
+    """Réponses scriptées servies à la place du réseau ; requêtes reçues enregistrées"""
+    state = {'statuses': [], 'requests': [], 'bodies': [], 'delays': []}
+
+    def handler(request):
+        state['bodies'].append(b''.join(request.stream))
+        state['requests'].append(request)
+        statuses = state['statuses']
+        status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        return httpx.Response(status, headers={'Retry-After': '0'} if status == 429 else None)
+
+    # Pas de httpx.MockTransport : il met le corps en mémoire (request.read()) avant le
+    # handler, ce qui masquerait les corps streamés que le transport réseau envoie tels quels
+    monkeypatch.setattr(httpx.HTTPTransport, 'handle_request', lambda self, request: handler(request))
+    monkeypatch.setattr(ops_client.time, 'sleep', state['delays'].append)
+    return state
+
+def _client(max_retries=3):
+    return httpx.Client(transport=RetryTransport(max_retries=max_retries))
+
+def test_get_is_retried_on_server_errors(server):
+    server['statuses'] = [503, 502, 200]
+    assert _client().get('https://example.supabase.co/rest/v1/runs').status_code == 200
+    assert len(server['requests']) == 3
+    assert len(server['delays']) == 2
+
+def test_retries_stop_after_max_retries(server):
+    server['statuses'] = [503]
+    assert _client(max_retries=2).get('https://example.supabase.co/rest/v1/runs').status_code == 503
+    assert len(server['requests']) == 3
+
+def test_post_is_not_retried_on_server_errors(server):
+    server['statuses'] = [500, 201]
+    response = _client().post('https://example.supabase.co/rest/v1/runs', json={'id': 'r1'})
+    assert response.status_code == 500
+    assert len(server['requests']) == 1
+
+def test_post_and_patch_are_retried_on_429(server):
+    server['statuses'] = [429, 201]
+    assert _client().post('https://example.supabase.co/rest/v1/runs', json={'id': 'r1'}).status_code == 201
+    server['statuses'] = [429, 204]
+    assert _client().patch('https://example.supabase.co/upload/1', content=b'bloc').status_code == 204
+    assert [r.method for r in server['requests']] == ['POST', 'POST', 'PATCH', 'PATCH']
+    assert server['bodies'][3] == b'bloc'  # corps rejoué à l'identique
+    assert server['delays'] == [0.0, 0.0]  # Retry-After respecté
+
+def test_streamed_bodies_are_never_replayed(server):
+    server['statuses'] = [503, 200]
+
+    def chunks():
+        yield b'partie 1'
+        yield b'partie 2'
+
+    response = _client().put('https://example.supabase.co/storage/v1/object/a', content=chunks())
+    assert response.status_code == 503
+    assert server['bodies'] == [b'partie 1partie 2']
@@ -0,0 +1,82 @@
+"""Tests de l'orchestrateur de tests parallèles"""
+
+import sys
+import json
+import threading
+import subprocess
+import xml.etree.ElementTree as ET
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from parallel_tests import junit_node_id, lpt_shards, merge_junit, merge_playwright, plan_units, wait_ready
+
+def test_lpt_balances_by_longest_first():
+    weights = {'a': 5, 'b': 4, 'c': 3, 'd': 3, 'e': 2, 'f': 1}
+    shards = lpt_shards(weights, 3)
+    assert sorted(load for load, _ in shards) == [6, 6, 6]
+    assert sorted(unit for _, units in shards for unit in units) == sorted(weights)
+
+def test_lpt_never_creates_empty_shards():
+    assert len(lpt_shards({'a': 1, 'b': 1}, 8)) == 2
+
+def test_junit_node_id_resolves_file_and_classes():
+    exists = {'tests/test_api.py'}.__contains__
+    assert junit_node_id('tests.test_api.TestUsers', 'test_get[1]', exists) == 'tests/test_api.py::TestUsers::test_get[1]'
+    assert junit_node_id('tests.test_gone', 'test_x', exists) is None
+
+def test_plan_units_weights_files_and_falls_back_to_median():
+    durations = {'tests/test_a.py::test_1': 2.0, 'tests/test_a.py::test_2': 1.0, 'tests/test_b.py::test_1': 5.0}
+    units = plan_units(['tests/test_a.py', 'tests/test_b.py', 'tests/test_new.py'], durations=durations)
+    assert units['tests/test_a.py'] == (['tests/test_a.py'], 3.0)
+    assert units['tests/test_new.py'][1] == 4.0  # médiane de 3 et 5
+
+def test_plan_units_groups_selected_ids_by_file():
+    durations = {'tests/test_a.py::test_1': 2.0, 'tests/test_a.py::test_2': 1.0}
+    units = plan_units(test_ids=['tests/test_a.py::test_1', 'tests/test_b.py::test_3'], durations=durations)
+    assert units['tests/test_a.py'] == (['tests/test_a.py::test_1'], 2.0)
+    assert units['tests/test_b.py'] == (['tests/test_b.py::test_3'], 2.0)
+
+def test_merge_junit_sums_shard_totals(tmp_path):
+    for index, (tests, failures) in enumerate([(3, 1), (2, 0)]):
+        (tmp_path / f'junit-{index}.xml').write_text(
+            f'<testsuites><testsuite name="pytest" tests="{tests}" failures="{failures}" errors="0" '
+            f'skipped="0" time="1.5"><testcase classname="tests.test_{index}" name="t" time="1.5"/>'
+            '</testsuite></testsuites>')
+    output = tmp_path / 'junit.xml'
+    totals = merge_junit([tmp_path / 'junit-0.xml', tmp_path / 'junit-1.xml', tmp_path / 'absent.xml'], output)
+    assert totals == {'tests': 5, 'errors': 0, 'failures': 1, 'skipped': 0}
+    root = ET.parse(output).getroot()
+    assert root.tag == 'testsuites' and len(root) == 2 and root.get('tests') == '5'
+
+def test_merge_playwright_concatenates_suites(tmp_path):
+    for index in (1, 2):
+        (tmp_path / f'pw-{index}.json').write_text(json.dumps({
+            'config': {}, 'suites': [{'title': f'spec{index}'}], 'errors': [],
+            'stats': {'startTime': f'2026-01-01T00:00:0{index}Z', 'duration': 1000 * index,
+                      'expected': 2, 'unexpected': index - 1, 'flaky': 0, 'skipped': 0},
+        }))
+    merged = merge_playwright([tmp_path / 'pw-1.json', tmp_path / 'pw-2.json'], tmp_path / 'out.json')
+    assert [s['title'] for s in merged['suites']] == ['spec1', 'spec2']
+    assert merged['stats']['expected'] == 4 and merged['stats']['unexpected'] == 1
+    assert merged['stats']['duration'] == 2000
+    assert merged['stats']['startTime'] == '2026-01-01T00:00:01Z'
+
+class NotFound(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(404)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def test_wait_ready_accepts_any_non_server_error():
+    server = HTTPServer(('127.0.0.1', 0), NotFound)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert wait_ready(f'http://127.0.0.1:{server.server_port}/', timeout=5)
+    finally:
+        server.shutdown()
+
+def test_wait_ready_stops_when_app_exits():
+    process = subprocess.Popen([sys.executable, '-c', 'raise SystemExit(1)'])
+    process.wait()
+    assert not wait_ready('http://127.0.0.1:9/', timeout=30, process=process)
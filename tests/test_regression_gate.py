@@ -0,0 +1,94 @@
+"""Tests de la gate de régression (médiane / MAD)"""
+
+import pytest
+
+from regression_gate import (baseline_bands, check_regressions, comparable_history, comparable_metrics,
+                             compare, metric_values, regression_config)
+
+def make_history():
+    return [
+        {'coverage': 0.85 + i * 0.001, 'lighthouse': 90,
+         'durations': {'unit_s': 60 + i, 'e2e_s': 120},
+         'benchmarks': {'test_parse': 0.010 + i * 0.0001}}
+        for i in range(10)
+    ]
+
+def test_metric_values_flattens_wildcards():
+    values = metric_values(make_history()[0])
+    assert values['durations.unit_s'] == (60.0, 'lower')
+    assert values['benchmarks.test_parse'][1] == 'lower'
+    assert values['coverage'][1] == 'higher'
+    assert 'unit_pass' not in metric_values({'unit_pass': True, 'coverage': 'n/a'})
+
+def test_regressions_beyond_the_noise_band():
+    bands = baseline_bands(make_history(), k=3, min_runs=5)
+    assert bands['durations.unit_s']['median'] == pytest.approx(64.5)
+    # Valeur constante : MAD nulle, la bande minimale relative s'applique
+    assert bands['lighthouse']['limit'] == pytest.approx(90 * 0.98)
+
+    current = {'coverage': 0.80, 'lighthouse': 89,
+               'durations': {'unit_s': 66, 'e2e_s': 150},
+               'benchmarks': {'test_parse': 0.0105, 'test_new': 1.0}}
+    results = {r['metric']: r['regressed'] for r in compare(current, bands)}
+    assert results == {
+        'benchmarks.test_parse': False,
+        'coverage': True,
+        'durations.e2e_s': True,
+        'durations.unit_s': False,
+        'lighthouse': False,
+    }
+
+def test_short_history_and_config():
+    assert baseline_bands(make_history()[:3], min_runs=5) == {}
+    config = regression_config({'coverage_min': 0.8, 'regression': {'mode': 'fail', 'window': 5}})
+    assert config['mode'] == 'fail' and config['window'] == 5
+    with pytest.raises(ValueError):
+        regression_config({'regression': {'mode': 'strict'}})
+
+class FakeQuery:
+    """Chaîne de requête PostgREST : enregistre les filtres, renvoie toutes les lignes"""
+
+    def __init__(self, rows, filters):
+        self.rows = rows
+        self.filters = filters
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            self.filters.append((name, args))
+            return self
+        return method
+
+    def execute(self):
+        return type('Result', (), {'data': self.rows})
+
+class FakeClient:
+    def __init__(self, summaries):
+        self.rows = [{'id': f'r{i}', 'summary_json': summary} for i, summary in enumerate(summaries)]
+        self.filters = []
+
+    def table(self, name):
+        assert name == 'runs'
+        return FakeQuery(self.rows, self.filters)
+
+def _subset_runs():
+    return [dict(run, test_selection='impacted', durations={'unit_s': 5, 'e2e_s': 10}) for run in make_history()]
+
+def test_full_run_is_not_compared_to_subset_durations():
+    """Un run complet après des runs partiels n'est pas une régression de durée"""
+    client = FakeClient(_subset_runs() + make_history()[:2])
+    current = {'coverage': 0.86, 'durations': {'unit_s': 65, 'e2e_s': 120}, 'test_selection': 'full'}
+    report = check_regressions(client, 'current', current, {'id': 's1', 'dod_json': {'regression': {'mode': 'fail'}}})
+    assert report['regressions'] == [] and report['baseline_runs'] == 2
+    assert ('or_', ('summary_json->>test_selection.is.null,summary_json->>test_selection.eq.full',)) in client.filters
+
+def test_partial_runs_skip_durations_and_coverage():
+    history = make_history() + _subset_runs()
+    assert len(comparable_history(history, 'full')) == 10  # runs sans sélection : complets
+    assert len(comparable_history(history, 'impacted')) == 10
+    metrics = comparable_metrics(regression_config({})['metrics'], 'impacted')
+    assert 'coverage' not in metrics and not any(path.startswith('durations.') for path in metrics)
+    client = FakeClient(_subset_runs())
+    current = {'coverage': 0.20, 'lighthouse': 90, 'durations': {'unit_s': 60, 'e2e_s': 10}, 'test_selection': 'impacted'}
+    report = check_regressions(client, 'current', current, {'id': 's1', 'dod_json': {}})
+    # coverage d'un sous-ensemble et unit_s 60 s contre 5 s : ignorés
+    assert [m['metric'] for m in report['metrics']] == ['lighthouse']
@@ -0,0 +1,103 @@
+"""Tests de l'upload résumable TUS (reprise à l'offset, état de reprise expiré)"""
+
+import json
+
+from resumable_upload import ResumableUpload
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f'HTTP {self.status_code}')
+
+class FakeTus:
+    """Serveur TUS minimal : uploads connus avec leur contenu reçu"""
+
+    def __init__(self):
+        self.uploads = {}
+        self.calls = []
+
+    def post(self, url, headers):
+        self.calls.append(('POST', url))
+        location = f'https://tus.example/upload/{len(self.uploads) + 1}'
+        self.uploads[location] = b''
+        return FakeResponse(201, {'Location': location})
+
+    def head(self, url, headers):
+        self.calls.append(('HEAD', url))
+        if url not in self.uploads:
+            return FakeResponse(404)
+        return FakeResponse(200, {'Upload-Offset': str(len(self.uploads[url]))})
+
+    def patch(self, url, content, timeout, headers):
+        self.calls.append(('PATCH', url, int(headers['Upload-Offset'])))
+        assert int(headers['Upload-Offset']) == len(self.uploads[url])
+        self.uploads[url] += content
+        return FakeResponse(204, {'Upload-Offset': str(len(self.uploads[url]))})
+
+def _upload(tmp_path, http, data=b'0123456789'):
+    path = tmp_path / 'trace.zip'
+    if not path.exists():
+        path.write_bytes(data)
+    return ResumableUpload('https://example.supabase.co', 'key', 'artifacts', path, 'run-1/trace.zip',
+                           chunk_size=4, state_dir=tmp_path / '.uploads', http=http)
+
+def test_upload_resumes_from_server_offset(tmp_path):
+    http = FakeTus()
+    http.uploads['https://tus.example/upload/1'] = b'0123'  # premier bloc reçu avant l'interruption
+    upload = _upload(tmp_path, http)
+    upload._save_state('https://tus.example/upload/1', 4)
+
+    assert upload.run()
+    assert http.uploads['https://tus.example/upload/1'] == b'0123456789'
+    assert ('POST', upload.endpoint) not in http.calls
+    assert [c[2] for c in http.calls if c[0] == 'PATCH'] == [4, 8]
+    assert not upload.state_file.exists()
+
+def test_expired_upload_state_is_discarded(tmp_path):
+    http = FakeTus()
+    upload = _upload(tmp_path, http)
+    upload._save_state('https://tus.example/upload/expired', 4)  # inconnu du serveur : 404
+
+    assert upload.run()
+    assert http.calls[:2] == [('HEAD', 'https://tus.example/upload/expired'), ('POST', upload.endpoint)]
+    assert http.uploads['https://tus.example/upload/1'] == b'0123456789'
+    assert [c[2] for c in http.calls if c[0] == 'PATCH'] == [0, 4, 8]
+
+def test_state_of_a_modified_file_is_ignored(tmp_path):
+    http = FakeTus()
+    http.uploads['https://tus.example/upload/old'] = b'0123'
+    upload = _upload(tmp_path, http)
+    upload._save_state('https://tus.example/upload/old', 4)
+    state = json.loads(upload.state_file.read_text())
+    state['size'] += 1  # fichier réécrit depuis la sauvegarde
+    upload.state_file.write_text(json.dumps(state))
+
+    assert upload.run()
+    assert ('HEAD', 'https://tus.example/upload/old') not in http.calls
+    assert http.uploads['https://tus.example/upload/old'] == b'0123'
+    assert http.uploads['https://tus.example/upload/2'] == b'0123456789'
+
+def test_failed_chunk_keeps_state_for_the_next_attempt(tmp_path):
+    class FlakyTus(FakeTus):
+        def patch(self, url, content, timeout, headers):
+            if headers['Upload-Offset'] == '4':
+                raise ConnectionError('coupure réseau')
+            return super().patch(url, content, timeout, headers)
+
+    http = FlakyTus()
+    upload = _upload(tmp_path, http)
+    try:
+        upload.run()
+    except ConnectionError:
+        pass
+    assert json.loads(upload.state_file.read_text())['offset'] == 4
+
+    retry_http = FakeTus()
+    retry_http.uploads = http.uploads
+    assert _upload(tmp_path, retry_http).run()
+    assert http.uploads['https://tus.example/upload/1'] == b'0123456789'
+    assert [c[2] for c in retry_http.calls if c[0] == 'PATCH'] == [4, 8]
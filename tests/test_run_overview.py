@@ -0,0 +1,17 @@
+"""Tests de l'affichage du tableau de bord des runs"""
+
+from run_overview import format_overview
+
+def test_format_overview_rows():
+    """Une ligne par run, avec les valeurs par défaut des runs en cours"""
+    rows = [
+        {'started_at': '2025-01-02T10:30:00+00:00', 'repo': 'org/app', 'sprint_label': 'S1',
+         'result': 'PASSED', 'dod_score': 4, 'dod_total': 4, 'artifact_count': 12,
+         'last_phase': 'TESTS_PASSED'},
+        {'started_at': '2025-01-02T11:00:00+00:00', 'repo': 'org/app', 'sprint_label': 'S2',
+         'result': None, 'dod_total': None, 'artifact_count': 0, 'last_phase': 'PLANNING'},
+    ]
+    lines = format_overview(rows)
+    assert len(lines) == 3
+    assert lines[1].startswith('2025-01-02 10:30') and '4/4' in lines[1] and lines[1].endswith('TESTS_PASSED')
+    assert 'EN COURS' in lines[2] and lines[2].endswith('PLANNING')
@@ -0,0 +1,174 @@
+"""Tests du scheduler multi-projets (slots locaux, fin des sprints)"""
+
+import subprocess
+
+import pytest
+
+from scheduler import Scheduler, job_env, parse_repo_limits, slot_resources
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.client.calls.append((self.name, self.params))
+        if self.name == 'claim_sprints':
+            count = self.params['p_slots']
+            claims, self.client.queue = self.client.queue[:count], self.client.queue[count:]
+            return type('Result', (), {'data': claims})
+        if self.name == 'finish_sprint':
+            return type('Result', (), {'data': True})
+        if self.name == 'requeue_stale_sprints':
+            return type('Result', (), {'data': {'requeued': 0, 'failed': 0}})
+        return type('Result', (), {'data': {}})
+
+class FakeClient:
+    """File de claims déjà triée : priorités et limites par repo testées sur Postgres"""
+
+    def __init__(self, queue):
+        self.queue = list(queue)
+        self.calls = []
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
+
+    def finished(self):
+        return {p['p_sprint_id']: p['p_state'] for name, p in self.calls if name == 'finish_sprint'}
+
+def _claim(sprint_id, repo):
+    return {'sprint_id': sprint_id, 'spec_id': 'spec', 'label': 'S1', 'repo': repo, 'branch': 'main'}
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path / 'control-plane'
+    source.mkdir()
+    git = ['git', '-c', 'user.name=ci', '-c', 'user.email=ci@example.com']
+    subprocess.run(git + ['init', '-q'], cwd=source, check=True)
+    (source / 'README.md').write_text('control-plane\n')
+    subprocess.run(git + ['add', '.'], cwd=source, check=True)
+    subprocess.run(git + ['commit', '-q', '-m', 'init'], cwd=source, check=True)
+    return source
+
+def test_parse_repo_limits():
+    assert parse_repo_limits(['org/a=2', 'org/b=1, org/c=3', '']) == {'org/a': 2, 'org/b': 1, 'org/c': 3}
+    with pytest.raises(ValueError):
+        parse_repo_limits(['org/a'])
+
+def test_slot_resources_split_cores():
+    assert slot_resources(2, cpu_count=16) == {'TEST_WORKERS': 6, 'E2E_SHARDS': 2}
+    assert slot_resources(8, cpu_count=4) == {'TEST_WORKERS': 1, 'E2E_SHARDS': 1}
+
+def test_job_env_keeps_operator_settings():
+    env = job_env(_claim('s1', 'org/a'), {'TEST_WORKERS': 3, 'E2E_SHARDS': 1},
+                  base={'TEST_WORKERS': '8', 'RUN_ID': 'ancien'})
+    assert env['SPRINT_ID'] == 's1' and env['TARGET_REPO'] == 'org/a'
+    assert env['TEST_WORKERS'] == '8' and env['E2E_SHARDS'] == '1'
+    assert 'RUN_ID' not in env
+
+def test_run_once_executes_claims_in_isolated_worktrees(tmp_path, source):
+    client = FakeClient([_claim('s1', 'org/a'), _claim('s2', 'org/b'), _claim('s3', 'org/c')])
+    command = 'test -f README.md && echo "$SPRINT_ID $TEST_WORKERS" > marker && test "$TARGET_REPO" = org/a'
+    scheduler = Scheduler(client, slots=2, command=command, work_dir=tmp_path / 'sched',
+                          worker='w1', source=source)
+    finished = scheduler.run(once=True, poll_interval=0.05)
+
+    assert client.finished() == {'s1': 'DONE', 's2': 'FAILED'}  # deux slots : s3 reste en file
+    assert [c for c in client.calls if c[0] == 'claim_sprints'][0][1]['p_slots'] == 2
+    assert {r['sprint_id'] for r in finished} == {'s1', 's2'}
+    assert not (tmp_path / 'sched' / 'jobs' / 's1').exists()
+    assert (tmp_path / 'sched' / 'logs' / 's1.log').exists()
+    worktrees = subprocess.run(['git', 'worktree', 'list'], cwd=source, capture_output=True, text=True)
+    assert len(worktrees.stdout.splitlines()) == 1
+
+def test_job_timeout_fails_the_sprint(tmp_path, source):
+    client = FakeClient([_claim('s1', 'org/a')])
+    scheduler = Scheduler(client, slots=1, command='sleep 30', work_dir=tmp_path / 'sched',
+                          worker='w1', job_timeout=0.2, source=source)
+    finished = scheduler.run(once=True, poll_interval=0.05)
+    assert client.finished() == {'s1': 'FAILED'}
+    assert finished[0]['seconds'] < 10
+
+def test_requeue_passes_the_workflow_threshold(tmp_path, source):
+    """Les sprints de workflow ont leur propre seuil, au-delà du timeout d'un job"""
+    client = FakeClient([])
+    scheduler = Scheduler(client, slots=1, command='true', work_dir=tmp_path / 'sched', worker='w1',
+                          source=source, stale_seconds=300, workflow_stale_seconds=4500)
+    scheduler.run(once=True, poll_interval=0.05)
+    params = [p for name, p in client.calls if name == 'requeue_stale_sprints'][0]
+    assert params['p_stale_seconds'] == 300 and params['p_workflow_stale_seconds'] == 4500
+    assert params['p_workflow_stale_seconds'] > scheduler.job_timeout
+
+# Fonctions SQL du scheduler exécutées sur Postgres (fixture pg, DATABASE_URL)
+
+def _sprint(conn, repo, label, priority=0, state='PLANNED', claimed_by=None, age=0, attempts=0):
+    spec_id = conn.execute("insert into specs (repo, branch, storage_path) values (%s, 'main', 'specs/s.yaml') "
+                           "returning id", [repo]).fetchone()[0]
+    return str(conn.execute(
+        "insert into sprints (spec_id, label, dod_json, state, priority, claimed_by, claimed_at, heartbeat_at, attempts) "
+        "values (%s, %s, '{}', %s, %s, %s, now() - make_interval(secs => %s), now() - make_interval(secs => %s), %s) "
+        "returning id",
+        [spec_id, label, state, priority, claimed_by, age, age, attempts]
+    ).fetchone()[0])
+
+def _claim_sql(conn, worker, slots, repo_limits='{}'):
+    rows = conn.execute("select claim_sprints(%s, %s, 1, %s::jsonb)", [worker, slots, repo_limits]).fetchall()
+    return [row[0]['label'] for row in rows]
+
+def _states(conn):
+    return dict(conn.execute("select label, state from sprints").fetchall())
+
+def test_claim_sprints_follows_priority_and_repo_limits(pg):
+    conn = pg()
+    _sprint(conn, 'org/a', 'a-running', state='RUNNING', claimed_by='workflow:1')
+    _sprint(conn, 'org/a', 'a-urgent', priority=10)
+    _sprint(conn, 'org/b', 'b-old')
+    _sprint(conn, 'org/b', 'b-urgent', priority=5)
+    _sprint(conn, 'org/b', 'b-third')
+    _sprint(conn, 'org/c', 'c-low', priority=-1)
+
+    # org/a plein (sprint de workflow en cours), org/b limité à 2, org/c à 1 par défaut
+    assert _claim_sql(conn, 'w1', 10, '{"org/b": 2}') == ['b-urgent', 'b-old', 'c-low']
+    assert _states(conn)['a-urgent'] == 'PLANNED' and _states(conn)['b-third'] == 'PLANNED'
+    assert _claim_sql(conn, 'w2', 10, '{"org/b": 2}') == []
+
+def test_concurrent_claims_skip_a_repo_being_claimed(pg):
+    """Un repo en cours de claim par un autre scheduler est sauté, sans attente ni interblocage"""
+    conn = pg()
+    _sprint(conn, 'org/a', 'a1', priority=10)
+    _sprint(conn, 'org/b', 'b1')
+    other = pg(autocommit=False)
+    other.execute("select pg_advisory_xact_lock(hashtext('claim_sprints:org/a'))")  # claim concurrent en cours
+    conn.execute("set lock_timeout = '2s'")
+
+    assert _claim_sql(conn, 'w1', 10) == ['b1']
+    other.commit()
+    assert _claim_sql(conn, 'w1', 10) == ['a1']
+
+def test_requeue_uses_heartbeats_for_workers_and_age_for_workflows(pg):
+    conn = pg()
+    _sprint(conn, 'org/a', 'worker-dead', state='RUNNING', claimed_by='host:1', age=400, attempts=1)
+    _sprint(conn, 'org/b', 'worker-alive', state='RUNNING', claimed_by='host:2', age=30, attempts=1)
+    _sprint(conn, 'org/c', 'workflow-stuck', state='RUNNING', claimed_by='workflow:123', age=5000, attempts=1)
+    _sprint(conn, 'org/d', 'workflow-busy', state='RUNNING', claimed_by='workflow:456', age=600, attempts=1)
+    _sprint(conn, 'org/e', 'worker-exhausted', state='RUNNING', claimed_by='host:3', age=400, attempts=3)
+
+    result = conn.execute("select requeue_stale_sprints(300, 3, 4500)").fetchone()[0]
+    assert result == {'requeued': 2, 'failed': 1}
+    assert _states(conn) == {'worker-dead': 'PLANNED', 'worker-alive': 'RUNNING', 'workflow-stuck': 'PLANNED',
+                             'workflow-busy': 'RUNNING', 'worker-exhausted': 'FAILED'}
+
+def test_stuck_workflow_sprint_is_requeued_and_claimed(pg):
+    """Un workflow arrêté avant la DoD gate ne bloque pas son repo indéfiniment"""
+    conn = pg()
+    spec_id = conn.execute("insert into specs (repo, branch, storage_path) values ('org/a', 'main', 'specs/s.yaml') "
+                           "returning id").fetchone()[0]
+    conn.execute("insert into sprints (spec_id, label, dod_json) values (%s, 'S1', '{}')", [spec_id])
+    conn.execute("select create_run('123', %s)", [spec_id])
+    assert conn.execute("select state, claimed_by from sprints").fetchone() == ('RUNNING', 'workflow:123')
+    assert _claim_sql(conn, 'w1', 1) == []  # repo occupé par le workflow
+
+    conn.execute("update sprints set heartbeat_at = now() - interval '2 hours'")
+    assert conn.execute("select requeue_stale_sprints(300, 3, 4500)").fetchone()[0] == {'requeued': 1, 'failed': 0}
+    assert _claim_sql(conn, 'w1', 1) == ['S1']
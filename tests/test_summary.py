@@ -0,0 +1,22 @@
+"""Tests du résumé compact et du fichier de détails JSON Lines"""
+
+from summary import append_details, iter_details, load_summary, reset_details, save_summary
+
+def test_summary_roundtrip_is_compact(tmp_path):
+    path = tmp_path / 'summary.json'
+    assert load_summary(path) == {}
+
+    save_summary({'coverage': 0.8, 'result': 'PASSED'}, path)
+
+    assert load_summary(path) == {'coverage': 0.8, 'result': 'PASSED'}
+    assert '\n' not in path.read_text() and ', ' not in path.read_text()
+
+def test_details_are_appended_line_by_line(tmp_path):
+    path = tmp_path / 'artifacts_detail.jsonl'
+    reset_details(path)
+    append_details([{'id': 'a1'}], path)
+    append_details([{'id': 'a2'}, {'id': 'a3'}], path)
+
+    assert [d['id'] for d in iter_details(path)] == ['a1', 'a2', 'a3']
+    reset_details(path)
+    assert list(iter_details(path)) == []
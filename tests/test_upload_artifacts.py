@@ -0,0 +1,175 @@
+"""Tests de l'upload des artefacts (erreurs des workers, insertions groupées)"""
+
+import argparse
+
+import upload_artifacts
+from upload_artifacts import BlobStore, is_duplicate_error, upload_artifacts as run_upload
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+        self.rows = None
+        self.page = None
+        self.updated = None
+
+    def select(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def order(self, *args):
+        return self
+
+    def range(self, start, end):
+        self.page = (start, end)
+        return self
+
+    def insert(self, rows):
+        self.rows = rows
+        return self
+
+    def update(self, row):
+        self.updated = row
+        return self
+
+    def execute(self):
+        if self.updated is not None:
+            self.client.updated.append(self.updated)
+            return type('Result', (), {'data': [self.updated]})
+        if self.rows is None:
+            start, end = self.page
+            self.client.pages += 1
+            return type('Result', (), {'data': self.client.existing[start:end + 1]})
+        if self.client.rejects(self.rows):
+            raise RuntimeError('500 insert failed')
+        self.client.inserted.extend(self.rows)
+        data = [{'id': f'a{len(self.client.inserted) - i}'} for i in range(len(self.rows))]
+        return type('Result', (), {'data': data})
+
+class FakeClient:
+    supabase_url = 'https://example.supabase.co'
+    supabase_key = 'key'
+
+    def __init__(self, existing=()):
+        self.existing = list(existing)
+        self.inserted = []
+        self.updated = []
+        self.pages = 0
+
+    def rejects(self, rows):
+        return False
+
+    def table(self, name):
+        assert name == 'artifacts'
+        return FakeTable(self)
+
+def _args():
+    return argparse.Namespace(pack='', workers=2, retries=1, batch_size=500, dedup=False)
+
+def _artifacts(tmp_path, monkeypatch, names):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(upload_artifacts, 'emit', lambda *args: None)
+    (tmp_path / 'artifacts').mkdir()
+    for name in names:
+        (tmp_path / 'artifacts' / name).write_text(name)
+
+def test_worker_exception_counts_as_failure(tmp_path, monkeypatch):
+    """Un fichier illisible n'interrompt pas l'upload : les autres sont enregistrés"""
+    _artifacts(tmp_path, monkeypatch, ['junit.xml', 'coverage.xml'])
+
+    def store(supabase, entry, *args):
+        if entry['rel_path'] == 'coverage.xml':
+            raise OSError('fichier disparu')
+        return True
+
+    monkeypatch.setattr(upload_artifacts, 'store_artifact', store)
+    client = FakeClient()
+    summary = run_upload(client, 'run-1', _args())
+    assert [row['name'] for row in client.inserted] == ['junit.xml']
+    assert summary['uploaded_artifacts'] == 1
+    assert summary['upload_stats']['failed'] == 1
+
+class FlakyInsertClient(FakeClient):
+    """Insertions multi-lignes refusées ; une ligne précise toujours refusée"""
+
+    def __init__(self, rejected):
+        super().__init__()
+        self.rejected = rejected
+
+    def rejects(self, rows):
+        return len(rows) > 1 or rows[0]['name'] == self.rejected
+
+def test_failed_batch_falls_back_to_row_inserts(tmp_path, monkeypatch):
+    """Lot refusé : insertion ligne par ligne, lignes perdues comptées en échec"""
+    _artifacts(tmp_path, monkeypatch, ['a.log', 'b.log', 'c.log'])
+    monkeypatch.setattr(upload_artifacts, 'store_artifact', lambda *args: True)
+    client = FlakyInsertClient(rejected='b.log')
+    summary = run_upload(client, 'run-1', _args())
+    assert sorted(row['name'] for row in client.inserted) == ['a.log', 'c.log']
+    assert summary['uploaded_artifacts'] == 2
+    assert summary['upload_stats']['failed_rows'] == 1 and summary['upload_stats']['failed'] == 1
+
+def test_resumed_run_reads_every_page_of_existing_rows(tmp_path, monkeypatch):
+    """Reprise d'un run de plus d'une page d'artefacts : aucune ligne dupliquée"""
+    names = [f'{i}.log' for i in range(5)]
+    _artifacts(tmp_path, monkeypatch, names)
+    monkeypatch.setattr(upload_artifacts, 'PAGE_SIZE', 2)
+    monkeypatch.setattr(upload_artifacts, 'store_artifact', lambda *args: True)
+    existing = [{'id': f'old{i}', 'kind': 'logs', 'storage_path': f'reports/run-1/{name}', 'size': 5, 'name': name}
+                for i, name in enumerate(names[:4])]
+    client = FakeClient(existing)
+    summary = run_upload(client, 'run-1', _args())
+    assert client.pages == 3
+    assert [row['name'] for row in client.inserted] == ['4.log']
+    assert summary['uploaded_artifacts'] == 5
+
+def test_duplicate_error_uses_the_status_code():
+    class StorageException(Exception):
+        pass
+
+    class Response:
+        status_code = 409
+
+    class HTTPStatusError(Exception):
+        response = Response()
+
+    assert is_duplicate_error(StorageException({'statusCode': '409', 'error': 'Duplicate', 'message': 'exists'}))
+    assert is_duplicate_error(StorageException({'statusCode': 400, 'error': 'Duplicate'}))
+    assert is_duplicate_error(HTTPStatusError('Conflict'))
+    # Message contenant 409 (taille, chemin, hash) : vraie erreur
+    assert not is_duplicate_error(StorageException({'statusCode': 500, 'error': 'Internal', 'message': 'blob 4096409 failed'}))
+    assert not is_duplicate_error(OSError('blobs/sha256/40/409abc introuvable'))
+
+class StorageException(Exception):
+    pass
+
+class FakeBucket:
+    """Bucket Storage : un objet existant renvoie le 409 Duplicate de Supabase"""
+
+    def __init__(self, objects):
+        self.objects = set(objects)
+        self.uploads = []
+
+    def upload(self, path, file, file_options):
+        self.uploads.append(path)
+        if path in self.objects:
+            raise StorageException({'statusCode': 409, 'error': 'Duplicate', 'message': 'The resource already exists'})
+        self.objects.add(path)
+
+    def list(self, *args):
+        raise AssertionError('listing préalable inutile')
+
+def test_blob_store_relies_on_the_conflict_status(tmp_path):
+    """Une requête Storage par blob : pas de listing avant l'upload"""
+    blob = tmp_path / 'junit.xml'
+    blob.write_text('<testsuite/>')
+    bucket = FakeBucket({upload_artifacts.blob_path('b' * 64)})
+    client = FakeClient()
+    client.storage = type('Storage', (), {'from_': lambda self, name: bucket})()
+    blobs = BlobStore(client)
+
+    assert blobs.store(blob, 'a' * 64, 100) and blobs.store(blob, 'b' * 64, 40)
+    assert blobs.store(blob, 'a' * 64, 100)  # déjà uploadé dans ce run : aucune requête
+    assert len(bucket.uploads) == 2
+    assert blobs.uploaded_bytes == 100 and blobs.skipped_bytes == 140
@@ -0,0 +1,20 @@
+"""Tests du manifeste local des uploads"""
+
+from upload_manifest import UploadManifest
+
+def test_manifest_skips_unchanged_artifacts(tmp_path):
+    """Un artefact inchangé dont la ligne existe est reconnu après rechargement"""
+    path = tmp_path / '.upload_manifest.json'
+    entry = {'rel_path': 'junit.xml', 'kind': 'junit', 'size': 12, 'mtime': 1}
+    artifact = {'id': 'a1', 'kind': 'junit', 'storage_path': 'reports/r1/junit/junit.xml'}
+
+    manifest = UploadManifest('r1', path)
+    manifest.record(entry, artifact)
+    manifest.save()
+
+    reloaded = UploadManifest('r1', path)
+    assert reloaded.lookup(entry, {'a1'})['storage_path'] == artifact['storage_path']
+    # Ligne supprimée en base, fichier modifié ou autre run : à refaire
+    assert reloaded.lookup(entry, set()) is None
+    assert reloaded.lookup(dict(entry, size=13), {'a1'}) is None
+    assert UploadManifest('r2', path).lookup(entry, {'a1'}) is None
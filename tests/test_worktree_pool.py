@@ -0,0 +1,83 @@
+"""Tests du pool de miroirs et worktrees"""
+
+import os
+import time
+import subprocess
+
+import pytest
+
+from worktree_pool import Pool, repo_slug
+
+def _git(cwd, *args):
+    subprocess.run(['git', '-c', 'user.name=ci', '-c', 'user.email=ci@example.com', *args],
+                   cwd=cwd, check=True, capture_output=True)
+
+def _commit(origin, name, content):
+    (origin / name).write_text(content)
+    _git(origin, 'add', name)
+    _git(origin, 'commit', '-q', '-m', name)
+
+@pytest.fixture
+def origin(tmp_path):
+    origin = tmp_path / 'origin'
+    origin.mkdir()
+    _git(origin, 'init', '-q', '-b', 'main')
+    _git(origin, 'config', 'uploadpack.allowFilter', 'true')
+    _commit(origin, 'app.py', 'print(1)\n')
+    return origin
+
+def _acquire(pool, origin, **kwargs):
+    return pool.acquire('org/app', 'main', url=f'file://{origin}', **kwargs)
+
+def test_repo_slug():
+    assert repo_slug('org/app.git') == 'org__app'
+
+def test_acquire_creates_then_reuses_clean_worktrees(tmp_path, origin):
+    pool = Pool(tmp_path / 'pool')
+    first, reused = _acquire(pool, origin, new_branch='feature/a')
+    assert not reused and (first / 'app.py').read_text() == 'print(1)\n'
+
+    second, _ = _acquire(pool, origin, new_branch='feature/b')
+    assert second != first  # premier worktree encore loué
+
+    (first / 'scratch.txt').write_text('reste du sprint précédent')
+    pool.release(first)
+    _commit(origin, 'app.py', 'print(2)\n')
+
+    third, reused = _acquire(pool, origin, new_branch='feature/c')
+    assert reused and third == first
+    assert (third / 'app.py').read_text() == 'print(2)\n'
+    assert not (third / 'scratch.txt').exists()
+    head = subprocess.run(['git', 'branch', '--show-current'], cwd=third, capture_output=True, text=True)
+    assert head.stdout.strip() == 'feature/c'
+
+def test_sprint_branches_survive_fetch(tmp_path, origin):
+    pool = Pool(tmp_path / 'pool')
+    worktree, _ = _acquire(pool, origin, new_branch='feature/a')
+    _acquire(pool, origin, new_branch='feature/b')
+    branches = subprocess.run(['git', 'branch', '--list', 'feature/*'], cwd=worktree,
+                              capture_output=True, text=True).stdout
+    assert 'feature/a' in branches and 'feature/b' in branches
+
+def test_gc_trims_free_worktrees_and_idle_mirrors(tmp_path, origin):
+    pool = Pool(tmp_path / 'pool')
+    worktrees = [_acquire(pool, origin)[0] for _ in range(3)]
+    for worktree in worktrees:
+        pool.release(worktree)
+
+    removed = pool.gc(warm=1)
+    assert len(removed['worktrees']) == 2 and removed['mirrors'] == []
+
+    stamp = pool.mirror('org__app') / 'ai-cd-last-used'
+    old = time.time() - 30 * 86400
+    os.utime(stamp, (old, old))
+    assert pool.gc(max_idle_days=14)['mirrors'] == ['org__app']
+    assert not pool.mirror('org__app').exists()
+
+def test_gc_keeps_mirrors_with_active_leases(tmp_path, origin):
+    pool = Pool(tmp_path / 'pool')
+    _acquire(pool, origin)
+    stamp = pool.mirror('org__app') / 'ai-cd-last-used'
+    old = time.time() - 30 * 86400
+    os.utime(stamp, (old, old))
+    assert pool.gc(max_idle_days=14)['mirrors'] == []